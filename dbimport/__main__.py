@@ -1,3 +1,4 @@
+import argparse
 import sys
 
 from PySide2.QtWidgets import QApplication
@@ -12,12 +13,20 @@ def exception_hook(exc_type, value, traceback):
 
 
 def gui_main(argv):
+    parser = argparse.ArgumentParser(prog="dbimport")
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="profile each update and save the results to a directory",
+    )
+    args, qt_args = parser.parse_known_args(argv[1:])
+
     ec = 1
     try:
         sys.excepthook = exception_hook
 
-        app = QApplication(argv)
-        window = Window()
+        app = QApplication(argv[:1] + qt_args)
+        window = Window(profile_dir=args.profile)
         window.show()
 
         ec = app.exec_()
@@ -26,4 +35,5 @@ def gui_main(argv):
     return ec
 
 
-sys.exit(gui_main(sys.argv))
+if __name__ == "__main__":
+    sys.exit(gui_main(sys.argv))
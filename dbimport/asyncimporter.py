@@ -0,0 +1,164 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .importer import Importer, ImporterError
+
+_DONE = object()
+
+
+class ImportCancelled(ImporterError):
+    pass
+
+
+class ImportJob:
+    """Import running in an executor of `AsyncImporter`.
+
+    Iterate over the job to receive `importer.ProgressEvent`s or await it
+    to get the importer statistics, either way a failed import raises its
+    exception. Cancelling the task that iterates over or awaits the job
+    cancels the import.
+    """
+
+    def __init__(self, executor, connect, run_kwargs, importer_kwargs):
+        self._executor = executor
+        self._connect = connect
+        self._run_kwargs = run_kwargs
+        self._importer_kwargs = importer_kwargs
+
+        self._cancelled = threading.Event()
+        self._started = False
+        self._stats = None
+
+    @property
+    def stats(self):
+        """Return statistics of the completed import, see
+        `Importer.stats`."""
+        return self._stats
+
+    def cancel(self):
+        """Abort the import after the chunk being sent. Once the target table
+        is being changed, the import is completed regardless."""
+        self._cancelled.set()
+
+    def _check_cancelled(self):
+        if self._cancelled.is_set():
+            raise ImportCancelled("import was cancelled")
+
+    def _run(self, emit):
+        # the connection is created, used and closed in the same worker
+        # thread, as database drivers don't share connections across threads
+        self._check_cancelled()
+        conn = self._connect()
+        try:
+            importer = Importer(connection=conn, **self._importer_kwargs)
+
+            changing = False
+
+            def progress(event):
+                nonlocal changing
+                # once the table is being changed, the import is completed
+                if not changing:
+                    self._check_cancelled()
+                    changing = event.phase in ("update", "insert")
+                emit(event)
+
+            importer.run(progress=progress, **self._run_kwargs)
+            return importer.stats
+        finally:
+            conn.close()
+
+    async def _events(self):
+        if self._started:
+            raise ImporterError("import job can only be run once")
+        self._started = True
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        def emit(event):
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+        future = loop.run_in_executor(self._executor, self._run, emit)
+        future.add_done_callback(lambda _: emit(_DONE))
+        try:
+            while True:
+                event = await queue.get()
+                if event is _DONE:
+                    break
+                yield event
+            self._stats = await future
+        finally:
+            if not future.done():
+                self.cancel()
+                future.cancel()
+                # retrieve the exception of the abandoned import
+                future.add_done_callback(
+                    lambda f: f.cancelled() or f.exception()
+                )
+
+    def __aiter__(self):
+        return self._events()
+
+    async def wait(self):
+        """Wait for the import to complete and return its statistics."""
+        async for _ in self:
+            pass
+        return self._stats
+
+    def __await__(self):
+        return self.wait().__await__()
+
+
+class AsyncImporter:
+    """Runs imports in a thread pool, so they don't block the event loop.
+
+    At most `max_workers` imports are run concurrently, others wait for a
+    free worker. Use as an async context manager or call `shutdown`.
+    """
+
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="dbimport"
+        )
+
+    def submit(
+        self,
+        connect,
+        update=True,
+        insert=False,
+        journal=False,
+        changed_only=False,
+        delta=None,
+        collect_unmatched=False,
+        **importer_kwargs,
+    ):
+        """Return an `ImportJob` importing data into a table.
+
+        `connect` is a function returning a new database connection, which
+        is closed when the import is done. Other arguments are passed to
+        `Importer` and `Importer.run`. The import starts when the job is
+        iterated over or awaited.
+        """
+        return ImportJob(
+            self._executor,
+            connect,
+            dict(
+                update=update,
+                insert=insert,
+                journal=journal,
+                changed_only=changed_only,
+                delta=delta,
+                collect_unmatched=collect_unmatched,
+            ),
+            importer_kwargs,
+        )
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
@@ -0,0 +1,134 @@
+import queue
+import threading
+from typing import Iterable, Iterator, Optional
+
+_DONE = object()
+
+
+def estimate_chunk_size(
+    row_bytes: float,
+    target_bytes: int = 4 * 1024**2,
+    minimum: int = 100,
+    maximum: int = 100000,
+) -> int:
+    """Return number of rows of about `target_bytes` per chunk, rows taking
+    `row_bytes` each."""
+    size = int(target_bytes // max(row_bytes, 1))
+    return max(minimum, min(maximum, size))
+
+
+class ChunkSizer:
+    """Tunes the number of rows per chunk by observed throughput.
+
+    The size grows by `factor` while the throughput in rows per second
+    keeps improving and turns back once it drops by more than `tolerance`,
+    settling around the size with the best throughput. The size stays
+    within `minimum` and `maximum`.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        minimum: int = 100,
+        maximum: Optional[int] = None,
+        factor: float = 1.5,
+        tolerance: float = 0.05,
+    ):
+        self._minimum = minimum
+        self._maximum = maximum
+        self._factor = factor
+        self._tolerance = tolerance
+        self._size = self._clamp(size)
+        self._initial = self._size
+        self._direction = 1
+        self._last_rate = None
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def initial_size(self) -> int:
+        return self._initial
+
+    def _clamp(self, size):
+        size = max(self._minimum, int(size))
+        if self._maximum is not None:
+            size = min(self._maximum, size)
+        return max(size, 1)
+
+    def record(
+        self, rows: int, seconds: float, size: Optional[int] = None
+    ) -> None:
+        """Record time taken to send a chunk of rows and pick the size of
+        the next chunk.
+
+        `size` is the size the chunk was cut at, the current size if None.
+        """
+        if rows < (size or self._size) or seconds <= 0:
+            # partial last chunks don't tell much about the throughput
+            return
+
+        rate = rows / seconds
+        if self._last_rate is not None and rate < self._last_rate * (
+            1 - self._tolerance
+        ):
+            self._direction = -self._direction
+        self._last_rate = rate
+
+        if self._direction > 0:
+            size = self._clamp(self._size * self._factor)
+        else:
+            size = self._clamp(self._size / self._factor)
+        if size == self._size:
+            # a bound was hit, try the other way next time
+            self._direction = -self._direction
+        self._size = size
+
+
+def prefetch(iterable: Iterable, depth: int = 2) -> Iterator:
+    """Iterate over `iterable` in a background thread, up to `depth` items
+    ahead of the consumer.
+
+    The producer blocks while `depth` items are waiting. An exception it
+    raises is raised by the consumer once earlier items are consumed.
+    Closing the returned generator stops the producer after its current
+    item.
+    """
+    items = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException as e:
+            put((_DONE, e))
+        else:
+            put((_DONE, None))
+
+    thread = threading.Thread(
+        target=produce, name="dbimport-prefetch", daemon=True
+    )
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        # the producer isn't waited for, it may be blocked by `iterable`
+        stopped.set()
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather
+
+
+def get_default_cache_dir():
+    """Return directory of the parsed file cache of the current user."""
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "dbimport", "cache")
+
+
+class FileCache:
+    """On-disk cache of sheets read from files.
+
+    Sheets of a file are cached independently. Each sheet is stored as an
+    uncompressed Feather file, which is memory-mapped on read. Entries are
+    keyed by the content hash of the source file, while an index of (path,
+    size, mtime) lets unchanged files skip hashing. Least recently used
+    entries are evicted once the cache grows over `max_size` bytes.
+
+    Reads and updates of the index and manifests are serialized by a lock
+    shared by all instances, so sheets can be stored and read from several
+    threads. Index keys of evicted entries and of earlier versions of a file
+    are dropped.
+    """
+
+    _lock = threading.RLock()
+    _index_file = "index.json"
+    _manifest_file = "manifest.json"
+
+    def __init__(self, directory=None, max_size=1024**3):
+        self._dir = directory or get_default_cache_dir()
+        self._max_size = max_size
+
+    @property
+    def directory(self):
+        return self._dir
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    @staticmethod
+    def _stat_key(fp):
+        stat = os.stat(fp)
+        return "%s|%d|%d" % (
+            os.path.normcase(os.path.abspath(fp)),
+            stat.st_size,
+            stat.st_mtime_ns,
+        )
+
+    @staticmethod
+    def _hash_file(fp):
+        digest = hashlib.blake2b(digest_size=20)
+        with open(fp, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _load_json(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _save_json(path, obj):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "w") as f:
+            json.dump(obj, f)
+        os.replace(tmp, path)
+
+    def _get_digest(self, fp):
+        index_path = os.path.join(self._dir, self._index_file)
+        index = self._load_json(index_path)
+        key = self._stat_key(fp)
+
+        digest = index.get(key)
+        if digest is None:
+            digest = self._hash_file(fp)
+            if os.path.isdir(self._dir):
+                # keys of earlier versions of the file are replaced
+                path = key.rsplit("|", 2)[0]
+                with self._lock:
+                    index = {
+                        k: d
+                        for k, d in self._load_json(index_path).items()
+                        if k.rsplit("|", 2)[0] != path
+                    }
+                    index[key] = digest
+                    self._save_json(index_path, index)
+        return digest
+
+    def get(self, fp, sheet):
+        """Return a pair of column data types and data of a cached file sheet
+        or None if the sheet isn't cached."""
+        entry = os.path.join(self._dir, self._get_digest(fp))
+
+        # other threads must not evict the entry while it is mapped
+        with self._lock:
+            manifest = self._load_json(
+                os.path.join(entry, self._manifest_file)
+            )
+            details = manifest.get(sheet)
+            if details is None:
+                return None
+
+            try:
+                table = pyarrow.feather.read_table(
+                    os.path.join(entry, details["file"]), memory_map=True
+                )
+                # mark entry as recently used
+                os.utime(entry)
+            except (OSError, pa.ArrowException):
+                # e.g. evicted by another process
+                return None
+
+        return OrderedDict(details["columns"]), table
+
+    def put(self, fp, sheet, columns, data):
+        """Store a file sheet in the cache.
+
+        Return False if the sheet cannot be stored, e.g. contains columns of
+        mixed data types.
+        """
+        # other threads must not evict the entry while it is written
+        with self._lock:
+            os.makedirs(self._dir, exist_ok=True)
+            digest = self._get_digest(fp)
+            entry = os.path.join(self._dir, digest)
+            os.makedirs(entry, exist_ok=True)
+
+            file_name = (
+                "%s.arrow"
+                % hashlib.blake2b(sheet.encode(), digest_size=8).hexdigest()
+            )
+            fd, tmp = tempfile.mkstemp(dir=entry)
+            os.close(fd)
+
+            try:
+                if isinstance(data, pd.DataFrame):
+                    if not all(isinstance(c, str) for c in data.columns):
+                        raise ValueError("column names must be strings")
+                    data = pa.Table.from_pandas(data, preserve_index=False)
+
+                pyarrow.feather.write_feather(
+                    data, tmp, compression="uncompressed"
+                )
+                os.replace(tmp, os.path.join(entry, file_name))
+            except (OSError, ValueError, pa.ArrowException):
+                os.remove(tmp)
+                return False
+
+            manifest_path = os.path.join(entry, self._manifest_file)
+            manifest = self._load_json(manifest_path)
+            manifest[sheet] = {
+                "file": file_name,
+                "columns": list(columns.items()),
+            }
+            self._save_json(manifest_path, manifest)
+
+            self._evict(keep=digest)
+            return True
+
+    def _evict(self, keep=None):
+        entries = []
+        for name in os.listdir(self._dir):
+            path = os.path.join(self._dir, name)
+            if not os.path.isdir(path):
+                continue
+
+            size = sum(
+                os.path.getsize(os.path.join(path, file_name))
+                for file_name in os.listdir(path)
+            )
+            entries.append((os.path.getmtime(path), size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self._max_size:
+                break
+            if name == keep:
+                continue
+
+            shutil.rmtree(os.path.join(self._dir, name), ignore_errors=True)
+            if not os.path.exists(os.path.join(self._dir, name)):
+                total -= size
+
+        index_path = os.path.join(self._dir, self._index_file)
+        index = self._load_json(index_path)
+        alive = {
+            key: digest
+            for key, digest in index.items()
+            if os.path.isdir(os.path.join(self._dir, digest))
+        }
+        if alive != index:
+            self._save_json(index_path, alive)
@@ -0,0 +1,256 @@
+import datetime
+import json
+import os
+import sqlite3
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+def get_default_store_path():
+    """Return path of the delta import state store of the current user."""
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "dbimport", "delta.sqlite")
+
+
+def _normalize(values) -> List[pd.Series]:
+    # equal values hash equally only if their data types are equal, so each
+    # column is converted to a canonical form, e.g. integers read as floats
+    # because of nulls hash as integers
+    if pd.api.types.is_bool_dtype(values) or (
+        values.dtype == object
+        and pd.api.types.infer_dtype(values, skipna=True) == "boolean"
+    ):
+        return [values.astype("boolean")]
+    if pd.api.types.is_integer_dtype(values):
+        return [
+            values.astype("Int64"),
+            pd.Series(pd.NA, values.index, "Float64"),
+        ]
+    if pd.api.types.is_float_dtype(values):
+        # numbers are hashed as a pair of an integer and a fraction part, so
+        # whole numbers hash alike whatever the other values of the column
+        numbers = values.astype("Float64")
+        whole = (numbers % 1 == 0) & (numbers.abs() < 2**63)
+        whole = whole.fillna(False)
+        return [
+            numbers.where(whole).astype("Int64"),
+            numbers.mask(whole),
+        ]
+    if pd.api.types.is_datetime64_dtype(values):
+        return [values.astype("datetime64[ns]")]
+    return [values]
+
+
+def hash_rows(data, columns: List[str]) -> np.ndarray:
+    """Return a 64-bit hash of the values of `columns` of each row of a
+    DataFrame or an Arrow table."""
+    if isinstance(data, pa.Table):
+        data = data.select(columns).to_pandas()
+    frame = pd.concat(
+        [part for col in columns for part in _normalize(data[col])],
+        axis=1,
+        ignore_index=True,
+    )
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy(
+        dtype=np.uint64
+    )
+
+
+class DeltaState:
+    """Row hashes of the last successful import of data into a table,
+    used to skip rows that haven't changed since.
+
+    Rows are identified by the hash of their join key and compared by the
+    hash of their join key and subset columns.
+    """
+
+    def __init__(self, key_hashes=None, row_hashes=None):
+        self._keys = pd.Index(
+            np.empty(0, dtype=np.uint64) if key_hashes is None else key_hashes
+        )
+        self._rows = (
+            np.empty(0, dtype=np.uint64) if row_hashes is None else row_hashes
+        )
+        self._new_keys = []
+        self._new_rows = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    def changed(self, data, join_on: List[str], subset: List[str]):
+        """Return a boolean array marking rows that are new or changed since
+        the last import, the rows are recorded for the next one."""
+        key_hashes = hash_rows(data, join_on)
+        row_hashes = hash_rows(data, join_on + subset)
+        self._new_keys.append(key_hashes)
+        self._new_rows.append(row_hashes)
+
+        positions = self._keys.get_indexer(key_hashes)
+        changed = positions < 0
+        changed[~changed] = (
+            self._rows[positions[~changed]] != row_hashes[~changed]
+        )
+        return changed
+
+    def recorded(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return key and row hashes of all rows passed to `changed`."""
+        if not self._new_keys:
+            empty = np.empty(0, dtype=np.uint64)
+            return empty, empty
+        return np.concatenate(self._new_keys), np.concatenate(self._new_rows)
+
+
+class DeltaStore:
+    """Local sqlite store of the delta states of imports into tables of a
+    database, e.g. of a data source name.
+
+    States are keyed by the schema, table, join on and subset columns and
+    the actions performed, a state is replaced only once an import using it
+    succeeds. Rows changed in the database by other means since are not
+    detected.
+    """
+
+    def __init__(self, database: str, path: Optional[str] = None):
+        self._database = database
+        self._path = path or get_default_store_path()
+
+    @property
+    def database(self):
+        return self._database
+
+    @property
+    def path(self):
+        return self._path
+
+    def _connect(self):
+        os.makedirs(
+            os.path.dirname(os.path.abspath(self._path)), exist_ok=True
+        )
+        conn = sqlite3.connect(self._path)
+        conn.executescript("""create table if not exists states (
+                id integer primary key,
+                database text not null,
+                target text not null,
+                updated text not null,
+                unique (database, target)
+            );
+            create table if not exists rows (
+                state_id integer not null,
+                key_hash integer not null,
+                row_hash integer not null,
+                primary key (state_id, key_hash)
+            ) without rowid;""")
+        return conn
+
+    @staticmethod
+    def _target(schema, table, join_on, subset, actions):
+        # e.g. rows only updated before have to be sent again to be inserted
+        return json.dumps(
+            [schema, table, list(join_on), list(subset), sorted(actions)]
+        )
+
+    def load(
+        self, schema, table, join_on, subset, actions=("update",)
+    ) -> DeltaState:
+        """Return the state of the last successful import, an empty state if
+        there is none."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                """select key_hash, row_hash
+                from rows
+                inner join states on states.id = rows.state_id
+                where states.database = ? and states.target = ?""",
+                (
+                    self._database,
+                    self._target(schema, table, join_on, subset, actions),
+                ),
+            ).fetchall()
+        finally:
+            conn.close()
+
+        hashes = np.array(rows, dtype=np.int64).reshape(-1, 2)
+        # hashes are stored as signed integers
+        return DeltaState(
+            hashes[:, 0].view(np.uint64), hashes[:, 1].view(np.uint64)
+        )
+
+    def save(
+        self,
+        schema,
+        table,
+        join_on,
+        subset,
+        state: DeltaState,
+        actions=("update",),
+    ):
+        """Replace the stored state by rows recorded by a `DeltaState`."""
+        key_hashes, row_hashes = state.recorded()
+        target = self._target(schema, table, join_on, subset, actions)
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    """insert or ignore into states (database, target, updated)
+                    values (?, ?, '')""",
+                    (self._database, target),
+                )
+                conn.execute(
+                    """update states set updated = ?
+                    where database = ? and target = ?""",
+                    (
+                        datetime.datetime.now(
+                            datetime.timezone.utc
+                        ).isoformat(),
+                        self._database,
+                        target,
+                    ),
+                )
+                (state_id,) = conn.execute(
+                    "select id from states where database = ? and target = ?",
+                    (self._database, target),
+                ).fetchone()
+                conn.execute(
+                    "delete from rows where state_id = ?", (state_id,)
+                )
+                conn.executemany(
+                    "insert into rows values (?, ?, ?)",
+                    zip(
+                        [state_id] * len(key_hashes),
+                        key_hashes.view(np.int64).tolist(),
+                        row_hashes.view(np.int64).tolist(),
+                    ),
+                )
+        finally:
+            conn.close()
+
+    def clear(self, schema=None, table=None):
+        """Remove stored states of a table, all tables of a schema or all
+        tables of the database, so the next imports process all rows."""
+        conn = self._connect()
+        try:
+            with conn:
+                ids = [
+                    state_id
+                    for state_id, target in conn.execute(
+                        "select id, target from states where database = ?",
+                        (self._database,),
+                    ).fetchall()
+                    if (schema is None or json.loads(target)[0] == schema)
+                    and (table is None or json.loads(target)[1] == table)
+                ]
+                for state_id in ids:
+                    conn.execute(
+                        "delete from rows where state_id = ?", (state_id,)
+                    )
+                    conn.execute(
+                        "delete from states where id = ?", (state_id,)
+                    )
+        finally:
+            conn.close()
@@ -0,0 +1,640 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from .sqltypes import get_cast, get_input_size
+from .util import quote_name
+
+_DIALECTS = OrderedDict()
+_INSTANCES = {}
+
+
+def register_dialect(cls):
+    """Register a dialect backend class under its name, can be used as a
+    class decorator."""
+    _DIALECTS[cls.name] = cls
+    _INSTANCES.pop(cls.name, None)
+    return cls
+
+
+def get_dialect_names() -> List[str]:
+    """Return names of registered dialects."""
+    return sorted(_DIALECTS)
+
+
+def get_dialect(name: str) -> "Dialect":
+    """Return the shared backend of a registered dialect."""
+    if name not in _DIALECTS:
+        raise ValueError(
+            "unsupported dialect, use available: %s"
+            % ", ".join("'%s'" % c for c in get_dialect_names())
+        )
+    # backends are stateless apart from their statement cache
+    if name not in _INSTANCES:
+        _INSTANCES[name] = _DIALECTS[name]()
+    return _INSTANCES[name]
+
+
+class Dialect:
+    """Database specific part of an import: metadata queries, staging table
+    statements, bulk load of the staging table and the statements updating
+    and inserting target table rows from it.
+
+    Subclasses are registered with `register_dialect`.
+
+    The staging table is loaded by executemany, or by statements inserting
+    multiple rows if `multirow` is set; None leaves the choice to
+    `use_multirow`.
+    """
+
+    name: Optional[str] = None
+    default_schema: Optional[str] = None
+    temp_table = "dbimport"
+    journal_catalog = "dbimport_journal"
+    journal_prefix = "dbimport_undo_"
+    changes_column = "dbimport_changes"
+    # whether update statements can output the keys of updated rows into a
+    # temporary `matched_table`, so unmatched keys are found without the
+    # target table
+    matched_table: Optional[str] = None
+    output_matched = False
+    # maximum number of parameters of a single statement, None if unlimited
+    max_parameters: Optional[int] = None
+    # maximum number of rows of a multi-row insert statement
+    max_statement_rows = 1000
+
+    def __init__(self, multirow: Optional[bool] = None):
+        self._multirow = multirow
+        self._statements = {}
+
+    @property
+    def multirow(self) -> Optional[bool]:
+        return self._multirow
+
+    def quote(self, name: str) -> str:
+        return '"%s"' % name.replace('"', '""')
+
+    def table_name(self, schema: Optional[str], table: str) -> str:
+        if schema is None:
+            return self.quote(table)
+        return self.quote(schema) + "." + self.quote(table)
+
+    def get_primary_key(self, cur, schema, table) -> List[str]:
+        raise NotImplementedError
+
+    def get_columns(self, cur, schema, table) -> Dict[str, tuple]:
+        """Return a mapping of column name to a tuple of type name, size and
+        scale of each table column."""
+        raise NotImplementedError
+
+    def prepare_cursor(self, cur) -> None:
+        pass
+
+    def drop_staging_query(self) -> str:
+        raise NotImplementedError
+
+    def create_staging_query(self, table: str, columns: List[str]) -> str:
+        raise NotImplementedError
+
+    def insert_staging_query(
+        self, columns: List[str], row_count: int = 1
+    ) -> str:
+        values = "(%s)" % ", ".join("?" for _ in columns)
+        return "insert into {temp} ({cols}) values {vals}".format(
+            temp=self.temp_table,
+            cols=", ".join(self.quote(col) for col in columns),
+            vals=", ".join(values for _ in range(row_count)),
+        )
+
+    def _insert_staging_query(self, columns: List[str], row_count: int):
+        # statements differ only by the number of rows, so only a few are
+        # generated per import, cached across imports
+        key = (tuple(columns), row_count)
+        query = self._statements.get(key)
+        if query is None:
+            if len(self._statements) >= 256:
+                self._statements.clear()
+            query = self.insert_staging_query(columns, row_count)
+            self._statements[key] = query
+        return query
+
+    def use_multirow(self, cur) -> bool:
+        """Return whether to load the staging table by multi-row insert
+        statements instead of executemany."""
+        if self._multirow is not None:
+            return self._multirow
+        return False
+
+    def rows_per_statement(self, column_count: int) -> int:
+        """Return the number of rows of a multi-row insert statement."""
+        rows = self.max_statement_rows
+        if self.max_parameters is not None:
+            # stay below the limit, some drivers bind a parameter of their
+            # own
+            rows = min(rows, (self.max_parameters - 1) // column_count)
+        return max(rows, 1)
+
+    def get_casts(self, column_types: List[tuple]) -> list:
+        """Return a function converting values of each column into Python
+        objects bound as parameters, None to use values as they are."""
+        return [None] * len(column_types)
+
+    def bulk_load(
+        self, cur, columns: List[str], column_types: List[tuple], chunks
+    ):
+        """Insert chunks of rows into the staging table, each chunk is yielded
+        back once it is sent."""
+        if self.use_multirow(cur):
+            yield from self._bulk_load_multirow(cur, columns, chunks)
+            return
+
+        query = self._insert_staging_query(columns, 1)
+        for chunk in chunks:
+            cur.executemany(query, chunk)
+            yield chunk
+
+    def _bulk_load_multirow(self, cur, columns, chunks):
+        step = self.rows_per_statement(len(columns))
+        for chunk in chunks:
+            for start in range(0, len(chunk), step):
+                rows = chunk[start : start + step]
+                cur.execute(
+                    self._insert_staging_query(columns, len(rows)),
+                    [value for row in rows for value in row],
+                )
+            yield chunk
+
+    def update_query(
+        self,
+        table: str,
+        join_on: List[str],
+        subset: List[str],
+        source: Optional[str] = None,
+        changes: Optional[int] = None,
+        matched: bool = False,
+    ) -> str:
+        """Return a statement updating table rows from the staging table or
+        the `source` table with the same columns.
+
+        If `changes` is given, only staged rows with that value of the
+        changes column are used, see `changes_query`. If `matched` is set,
+        the join keys of updated rows are output into `matched_table`, see
+        `output_matched`.
+        """
+        raise NotImplementedError
+
+    def insert_query(
+        self, table: str, join_on: List[str], subset: List[str]
+    ) -> str:
+        condition = " and ".join(
+            "a.{col} = b.{col}".format(col=self.quote(col)) for col in join_on
+        )
+        cols = ", ".join(self.quote(col) for col in join_on + subset)
+
+        return """insert into {table} ({cols})
+        select {cols}
+        from {temp} as b
+        where not exists (select * from {table} as a where {cond})""".format(
+            table=table, cols=cols, temp=self.temp_table, cond=condition
+        )
+
+    def differs(self, left: str, right: str, type_name: str) -> str:
+        """Return a predicate true if two values of a column type differ,
+        nulls are equal to each other."""
+        # spelled out, as a comparison with a single null is unknown
+        return (
+            "({l} <> {r} or {l} is null and {r} is not null "
+            "or {l} is not null and {r} is null)"
+        ).format(l=left, r=right)
+
+    def _changes_expression(self, subset, column_types, left, right):
+        return "\n            + ".join(
+            "case when {pred} then {bit} else 0 end".format(
+                pred=self.differs(
+                    left + "." + self.quote(col),
+                    right + "." + self.quote(col),
+                    type_name,
+                ),
+                bit=1 << i,
+            )
+            for i, (col, (type_name, _, _)) in enumerate(
+                zip(subset, column_types)
+            )
+        )
+
+    def add_changes_column_query(self) -> str:
+        return "alter table {temp} add {col} bigint".format(
+            temp=self.temp_table, col=self.quote(self.changes_column)
+        )
+
+    def changes_query(
+        self,
+        table: str,
+        join_on: List[str],
+        subset: List[str],
+        column_types: List[tuple],
+    ) -> str:
+        """Return a statement setting the changes column of staged rows to a
+        bit mask of `subset` columns whose values differ from the matched
+        table row, bit i standing for column i."""
+        condition = " and ".join(
+            "a.{col} = {temp}.{col}".format(
+                col=self.quote(col), temp=self.temp_table
+            )
+            for col in join_on
+        )
+
+        return """update {temp}
+        set {changes} = (
+            select {expr}
+            from {table} as a
+            where {cond}
+        )""".format(
+            temp=self.temp_table,
+            changes=self.quote(self.changes_column),
+            expr=self._changes_expression(
+                subset, column_types, "a", self.temp_table
+            ),
+            table=table,
+            cond=condition,
+        )
+
+    def changes_groups_query(self) -> str:
+        return """select distinct {changes}
+        from {temp}
+        where {changes} > 0""".format(
+            changes=self.quote(self.changes_column), temp=self.temp_table
+        )
+
+    def delete_unchanged_query(self) -> str:
+        return "delete from {temp} where {changes} = 0".format(
+            temp=self.temp_table, changes=self.quote(self.changes_column)
+        )
+
+    def create_matched_query(self, join_on: List[str]) -> str:
+        """Return a query creating `matched_table` as a temporary table, only
+        dialects that `output_matched` implement it."""
+        raise NotImplementedError
+
+    def drop_matched_query(self) -> str:
+        raise NotImplementedError
+
+    def unmatched_keys_query(
+        self, table: str, join_on: List[str], changes: bool = False
+    ) -> str:
+        """Return a query of the join keys of staged rows matching no table
+        row, after the update.
+
+        If `changes` is set, rows are told by the changes column left null
+        by `changes_query`, otherwise by the keys output into
+        `matched_table` if `output_matched`, else by an anti-join with the
+        table.
+        """
+        if changes:
+            condition = "b.{col} is null".format(
+                col=self.quote(self.changes_column)
+            )
+        else:
+            condition = (
+                "not exists (select * from {source} as a where {cond})"
+            ).format(
+                source=(self.matched_table if self.output_matched else table),
+                cond=" and ".join(
+                    "a.{col} = b.{col}".format(col=self.quote(col))
+                    for col in join_on
+                ),
+            )
+
+        return """select {cols}
+        from {temp} as b
+        where {cond}""".format(
+            cols=", ".join(
+                "b.{col}".format(col=self.quote(col)) for col in join_on
+            ),
+            temp=self.temp_table,
+            cond=condition,
+        )
+
+    def create_journal_catalog_query(self) -> str:
+        return """create table if not exists {catalog} (
+            run_id varchar(32) not null primary key,
+            table_schema varchar(128),
+            table_name varchar(128) not null,
+            journal_table varchar(128) not null,
+            join_on text not null,
+            subset text not null,
+            created varchar(32) not null
+        )""".format(catalog=self.journal_catalog_name())
+
+    def journal_catalog_name(self) -> str:
+        return self.table_name(self.default_schema, self.journal_catalog)
+
+    def journal_name(self, run_id: str) -> str:
+        return self.table_name(
+            self.default_schema, self.journal_prefix + run_id
+        )
+
+    def journal_query(
+        self, table: str, journal: str, join_on: List[str], subset: List[str]
+    ) -> str:
+        """Return a statement copying the columns of table rows matched by the
+        staging table into a new `journal` table."""
+        condition = " and ".join(
+            "a.{col} = b.{col}".format(col=self.quote(col)) for col in join_on
+        )
+        cols = ", ".join(
+            "a.{col}".format(col=self.quote(col)) for col in join_on + subset
+        )
+
+        return """create table {journal} as
+        select {cols}
+        from {table} as a
+        inner join {temp} as b
+        on {cond}""".format(
+            journal=journal,
+            cols=cols,
+            table=table,
+            temp=self.temp_table,
+            cond=condition,
+        )
+
+
+@register_dialect
+class MssqlDialect(Dialect):
+    name = "mssql"
+    default_schema = "dbo"
+    temp_table = "#dbimport"
+    matched_table = "#dbimport_matched"
+    output_matched = True
+    max_parameters = 2100
+
+    def quote(self, name):
+        return quote_name(name)
+
+    def get_primary_key(self, cur, schema, table):
+        query = """select column_name
+        from information_schema.key_column_usage
+        where table_schema = ?
+            and table_name = ?
+        order by ordinal_position"""
+        return [row for row, in cur.execute(query, (schema, table)).fetchall()]
+
+    def get_columns(self, cur, schema, table):
+        query = """select column_name
+            , data_type
+            , coalesce(
+                character_maximum_length
+                , numeric_precision
+                , datetime_precision
+            )
+            , numeric_scale
+        from information_schema.columns
+        where table_schema = ?
+            and table_name = ?
+        order by ordinal_position"""
+        return OrderedDict(
+            (name, (type_name, size, scale))
+            for name, type_name, size, scale in cur.execute(
+                query, (schema, table)
+            ).fetchall()
+        )
+
+    def prepare_cursor(self, cur):
+        if hasattr(cur, "fast_executemany"):
+            cur.fast_executemany = True
+
+    def drop_staging_query(self):
+        return """if object_id('tempdb.dbo.{temp}') is not null
+        drop table {temp}""".format(temp=self.temp_table)
+
+    def create_staging_query(self, table, columns):
+        return "select top 0 {cols} into {temp} from {table}".format(
+            cols=", ".join(self.quote(col) for col in columns),
+            temp=self.temp_table,
+            table=table,
+        )
+
+    def get_casts(self, column_types):
+        return [
+            get_cast(type_name, scale) for type_name, _, scale in column_types
+        ]
+
+    def use_multirow(self, cur):
+        if self._multirow is not None:
+            return self._multirow
+        # executemany without fast_executemany takes a round trip per row
+        return not getattr(cur, "fast_executemany", False)
+
+    def bulk_load(self, cur, columns, column_types, chunks):
+        if self.use_multirow(cur):
+            # parameter types are derived from values already cast to the
+            # column types
+            yield from super().bulk_load(cur, columns, column_types, chunks)
+            return
+
+        # bind parameters explicitly, so fast_executemany doesn't have to
+        # guess their types from the values of each chunk
+        cur.setinputsizes(
+            [get_input_size(*column_type) for column_type in column_types]
+        )
+        try:
+            yield from super().bulk_load(cur, columns, column_types, chunks)
+        finally:
+            cur.setinputsizes(None)
+
+    def update_query(
+        self,
+        table,
+        join_on,
+        subset,
+        source=None,
+        changes=None,
+        matched=False,
+    ):
+        condition = " and ".join(
+            "a.{col} = b.{col}".format(col=self.quote(col)) for col in join_on
+        )
+        cols = ", ".join(
+            "a.{col} = b.{col}".format(col=self.quote(col)) for col in subset
+        )
+        if matched:
+            # keys are output as the rows are updated, not looked up again
+            cols += "\n        output {keys}\n        into {matched}".format(
+                keys=", ".join(
+                    "inserted.{col}".format(col=self.quote(col))
+                    for col in join_on
+                ),
+                matched=self.matched_table,
+            )
+
+        query = """update a
+        set {cols}
+        from {table} as a
+        inner join {source} as b
+        on {cond}""".format(
+            cols=cols,
+            table=table,
+            source=source or self.temp_table,
+            cond=condition,
+        )
+        if changes is not None:
+            query += "\n        where b.{col} = {changes:d}".format(
+                col=self.quote(self.changes_column), changes=changes
+            )
+        return query
+
+    def differs(self, left, right, type_name):
+        type_name = type_name.lower()
+        if type_name in ("text", "ntext", "image", "xml"):
+            # values of these types cannot be compared
+            return "1 = 1"
+        if type_name in ("char", "nchar", "varchar", "nvarchar"):
+            # compare case and trailing spaces too, unlike the collation
+            return (
+                "({l} <> {r} collate Latin1_General_BIN2 "
+                "or datalength({l}) <> datalength({r}) "
+                "or {l} is null and {r} is not null "
+                "or {l} is not null and {r} is null)"
+            ).format(l=left, r=right)
+        return super().differs(left, right, type_name)
+
+    def changes_query(self, table, join_on, subset, column_types):
+        condition = " and ".join(
+            "a.{col} = b.{col}".format(col=self.quote(col)) for col in join_on
+        )
+
+        return """update b
+        set b.{changes} = {expr}
+        from {table} as a
+        inner join {temp} as b
+        on {cond}""".format(
+            changes=self.quote(self.changes_column),
+            expr=self._changes_expression(subset, column_types, "a", "b"),
+            table=table,
+            temp=self.temp_table,
+            cond=condition,
+        )
+
+    def create_matched_query(self, join_on):
+        return "select top 0 {cols} into {matched} from {temp}".format(
+            cols=", ".join(self.quote(col) for col in join_on),
+            matched=self.matched_table,
+            temp=self.temp_table,
+        )
+
+    def drop_matched_query(self):
+        return """if object_id('tempdb.dbo.{matched}') is not null
+        drop table {matched}""".format(matched=self.matched_table)
+
+    def create_journal_catalog_query(self):
+        catalog = self.journal_catalog_name()
+        return """if object_id('{catalog}') is null
+        create table {catalog} (
+            run_id varchar(32) not null primary key,
+            table_schema nvarchar(128),
+            table_name nvarchar(128) not null,
+            journal_table nvarchar(128) not null,
+            join_on nvarchar(max) not null,
+            subset nvarchar(max) not null,
+            created varchar(32) not null
+        )""".format(catalog=catalog)
+
+    def journal_query(self, table, journal, join_on, subset):
+        condition = " and ".join(
+            "a.{col} = b.{col}".format(col=self.quote(col)) for col in join_on
+        )
+        cols = ", ".join(
+            "a.{col}".format(col=self.quote(col)) for col in join_on + subset
+        )
+
+        return """select {cols}
+        into {journal}
+        from {table} as a
+        inner join {temp} as b
+        on {cond}""".format(
+            cols=cols,
+            journal=journal,
+            table=table,
+            temp=self.temp_table,
+            cond=condition,
+        )
+
+
+@register_dialect
+class SqliteDialect(Dialect):
+    name = "sqlite"
+    # default limit of sqlite versions before 3.32
+    max_parameters = 999
+
+    def get_primary_key(self, cur, schema, table):
+        query = """select name
+        from pragma_table_info(?)
+        where pk > 0
+        order by pk"""
+        return [row for row, in cur.execute(query, (table,)).fetchall()]
+
+    def get_columns(self, cur, schema, table):
+        query = """select name, type, null, null
+        from pragma_table_info(?)
+        order by cid"""
+        return OrderedDict(
+            (name, (type_name, size, scale))
+            for name, type_name, size, scale in cur.execute(
+                query, (table,)
+            ).fetchall()
+        )
+
+    def use_multirow(self, cur):
+        if self._multirow is not None:
+            return self._multirow
+        # executemany binds and steps a statement per row, multi-row
+        # statements bind hundreds of rows at once
+        return True
+
+    def differs(self, left, right, type_name):
+        return "{l} is not {r}".format(l=left, r=right)
+
+    def drop_staging_query(self):
+        return "drop table if exists temp.{temp}".format(temp=self.temp_table)
+
+    def create_staging_query(self, table, columns):
+        return """create temp table {temp} as
+        select {cols} from {table} limit 0""".format(
+            temp=self.temp_table,
+            cols=", ".join(self.quote(col) for col in columns),
+            table=table,
+        )
+
+    def update_query(
+        self,
+        table,
+        join_on,
+        subset,
+        source=None,
+        changes=None,
+        matched=False,
+    ):
+        source = source or self.temp_table
+        condition = " and ".join(
+            "{table}.{col} = {source}.{col}".format(
+                col=self.quote(col), table=table, source=source
+            )
+            for col in join_on
+        )
+        if changes is not None:
+            condition += " and {source}.{col} = {changes:d}".format(
+                source=source,
+                col=self.quote(self.changes_column),
+                changes=changes,
+            )
+        cols = ",\n".join(
+            "{col} = (select {col} from {source} where {cond})".format(
+                col=self.quote(col), source=source, cond=condition
+            )
+            for col in subset
+        )
+
+        return """update {table}
+        set {cols}
+        where exists (select * from {source} where {cond})""".format(
+            cols=cols, table=table, source=source, cond=condition
+        )
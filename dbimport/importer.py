@@ -1,104 +1,123 @@
-from typing import List, Optional
+import datetime
+import itertools
+import json
+import time
+import uuid
+from collections import OrderedDict, deque, namedtuple
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
-import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
-from .util import quote_name as q
+from .batching import ChunkSizer, estimate_chunk_size, prefetch
+from .delta import DeltaState, DeltaStore
+from .dialects import Dialect, get_dialect
+from .keys import KeyIndex, duplicated_keys
+from .sqlcache import SqlCache
 
 
 class ImporterError(Exception):
     pass
 
 
+# phase being run, rows sent so far and total rows, None if unknown
+ProgressEvent = namedtuple(
+    "ProgressEvent", ["phase", "rows_staged", "rows_total"]
+)
+
+
 class Importer:
-    _chunk_size = 5000
-    _known_dialects = {"mssql", "sqlite"}
-    _temp_table = "dbimport"
-
-    _query_get_pk = {
-        "mssql": """select column_name
-        from information_schema.key_column_usage
-        where table_schema = ?
-            and table_name = ?
-        order by ordinal_position""",
-        "sqlite": """select name
-        from pragma_table_info(?)
-        where pk = 1
-        order by cid""",
-    }
-
-    _query_get_cols = {
-        "mssql": """select column_name
-        from information_schema.columns
-        where table_schema = ?
-            and table_name = ?
-        order by ordinal_position""",
-        "sqlite": """select name
-        from pragma_table_info(?)
-        order by cid""",
-    }
-
-    _query_drop_temp_table = {
-        "mssql": """if object_id('tempdb.dbo.{temp}') is not null
-        drop table {temp}""",
-        "sqlite": """drop table if exists temp.{temp}""",
-    }
-
-    _query_create_temp_table = {
-        "mssql": """select top 0 {cols} into {temp} from {table}""",
-        "sqlite": """create temp table {temp} as
-        select {cols} from {table} limit 0""",
-    }
+    # rows per chunk, tuned by observed throughput if None
+    _chunk_size = None
+    # chunks tuned by throughput start at about this size in bytes
+    _target_chunk_bytes = 4 * 1024**2
+    _min_chunk_size = 100
+    _max_chunk_size = 100000
+    # chunks converted ahead of the one being sent, 0 converts them in turn
+    _prefetch_chunks = 2
+    # changed columns are tracked as bits of a bigint
+    _max_changes_columns = 62
+    # above this number of changed column combinations, changed rows are
+    # updated by a single statement setting all columns
+    _max_update_groups = 32
 
     def __init__(
         self,
         connection,
-        data: pd.DataFrame,
+        data: Union[
+            pd.DataFrame,
+            pa.Table,
+            Iterable[Union[pd.DataFrame, pa.Table, pa.RecordBatch]],
+        ],
         table: str,
         schema: Optional[str] = None,
         join_on: Optional[List[str]] = None,
         subset: Optional[List[str]] = None,
-        dialect="mssql",
+        dialect: Union[str, Dialect] = "mssql",
+        cache: Optional[SqlCache] = None,
+        chunk_size: Optional[int] = None,
     ):
-        if data.empty:
-            raise ValueError("data contains no records")
+        # data can also be an iterator of chunks, e.g. a chunked reader, in
+        # which case only the chunk being sent is held in memory
+        self._chunks = None
+        self._chunks_consumed = False
+        if not isinstance(data, (pd.DataFrame, pa.Table)):
+            chunks = (self._prepare_data(chunk) for chunk in data)
+            for data in chunks:
+                if len(data) > 0:
+                    break
+            else:
+                data = []
+            self._chunks = itertools.chain([data], chunks)
+        elif isinstance(data, pd.DataFrame):
+            data = self._prepare_data(data)
 
-        if dialect not in self._known_dialects:
-            raise ValueError(
-                "unsupported dialect, use available: %s"
-                % ", ".join("'%s'" % c for c in sorted(self._known_dialects))
-            )
+        if len(data) == 0:
+            raise ValueError("data contains no records")
 
-        if (
-            not isinstance(data.index, (pd.MultiIndex, pd.RangeIndex))
-            and data.index.name
-        ):
-            data = data.reset_index()
+        if isinstance(dialect, Dialect):
+            backend = dialect
+        else:
+            backend = get_dialect(dialect)
 
         self._conn = connection
         self._data = None
         self._data_master = data
         self._table = table
         self._schema = schema
-        self._dialect = dialect
+        self._dialect = backend.name
+        self._backend = backend
+        self._cache = cache
+        if chunk_size is not None:
+            self._chunk_size = chunk_size
         self._row_cnt_upd = -1
         self._row_cnt_ins = -1
+        self._row_cnt_match = -1
+        self._unmatched_keys: Optional[pd.DataFrame] = None
+        self._run_id = None
+        self._stats = self._new_stats()
+        self._profiler = None
+        self._progress = None
+        self._delta: Optional[DeltaState] = None
 
-        if dialect == "mssql":
-            if self._schema is None:
-                self._schema = "dbo"
-            self._temp_table = "#" + self._temp_table
+        if self._schema is None:
+            self._schema = backend.default_schema
 
         self._join_on: List[str] = []
         self._subset: List[str] = []
 
-        cur = self._conn.cursor()
-        self._table_pk = self._get_pk(cur)
-        self._table_cols = self._get_cols(cur)
-        cur.close()
+        table_pk, table_col_types = self._cached(
+            "metadata", self._get_metadata
+        )
+        self._table_pk = list(table_pk)
+        self._table_col_types = OrderedDict(table_col_types)
+        self._table_cols = list(self._table_col_types)
 
-        join_cols = join_on or [c for c in data if c in self._table_pk]
-        subset_cols = [c for c in subset or data if c not in join_cols]
+        data_cols = self._get_data_cols()
+        join_cols = join_on or [c for c in data_cols if c in self._table_pk]
+        subset_cols = [c for c in subset or data_cols if c not in join_cols]
 
         self._set_join_on(join_cols)
         self._set_subset(subset_cols)
@@ -130,6 +149,12 @@ class Importer:
     def table_columns(self) -> List[str]:
         return self._table_cols
 
+    @property
+    def table_column_types(
+        self,
+    ) -> Dict[str, Tuple[str, Optional[int], Optional[int]]]:
+        return self._table_col_types
+
     @property
     def row_count_updated(self):
         return self._row_cnt_upd
@@ -138,6 +163,121 @@ class Importer:
     def row_count_inserted(self):
         return self._row_cnt_ins
 
+    @property
+    def row_count_matched(self):
+        """Return number of staged rows matching table rows in the last run
+        if unmatched keys were collected, -1 otherwise."""
+        return self._row_cnt_match
+
+    @property
+    def unmatched_keys(self) -> Optional[pd.DataFrame]:
+        """Return join keys of staged rows matching no table row in the last
+        run if they were collected, see `run`."""
+        return self._unmatched_keys
+
+    @property
+    def run_id(self) -> Optional[str]:
+        """Return id of the last run if its before-images were journaled, see
+        `journal.undo`."""
+        return self._run_id
+
+    @property
+    def stats(self) -> Dict:
+        """Return statistics of the last run: number of staged rows, chunks
+        and approximate bytes sent, and duration of each phase in seconds."""
+        stats = OrderedDict(self._stats)
+        stats["rows_updated"] = self._row_cnt_upd
+        stats["rows_inserted"] = self._row_cnt_ins
+        stats["rows_unmatched"] = (
+            len(self._unmatched_keys)
+            if self._unmatched_keys is not None
+            else -1
+        )
+        stats["durations"] = OrderedDict(self._stats["durations"])
+        return stats
+
+    @staticmethod
+    def _new_stats():
+        return OrderedDict(
+            [
+                ("rows_staged", 0),
+                ("rows_unchanged", 0),
+                ("chunks", 0),
+                ("bytes_sent", 0),
+                ("chunk_size_initial", None),
+                ("chunk_size", None),
+                ("durations", OrderedDict()),
+            ]
+        )
+
+    def _report(self, phase):
+        if self._progress is None:
+            return
+
+        if isinstance(self._data, (pd.DataFrame, pa.Table)):
+            rows_total = len(self._data)
+        else:
+            rows_total = None
+        self._progress(
+            ProgressEvent(phase, self._stats["rows_staged"], rows_total)
+        )
+
+    @contextmanager
+    def _phase(self, name):
+        self._report(name)
+        profiled = (
+            self._profiler.phase(name)
+            if self._profiler is not None
+            else nullcontext()
+        )
+        start = time.perf_counter()
+        try:
+            with profiled:
+                yield
+        finally:
+            durations = self._stats["durations"]
+            durations[name] = (
+                durations.get(name, 0.0) + time.perf_counter() - start
+            )
+
+    def _cached(self, kind, factory, *key):
+        if self._cache is None:
+            return factory()
+        return self._cache.get(
+            (kind, self._dialect, self._schema, self._table) + key, factory
+        )
+
+    def _cached_query(self, kind, factory):
+        # statements depend on the columns being imported as well
+        return self._cached(
+            kind, factory, tuple(self._join_on), tuple(self._subset)
+        )
+
+    def _get_metadata(self):
+        cur = self._conn.cursor()
+        try:
+            table_pk = self._backend.get_primary_key(
+                cur, self._schema, self._table
+            )
+            table_col_types = self._backend.get_columns(
+                cur, self._schema, self._table
+            )
+        finally:
+            cur.close()
+        return tuple(table_pk), tuple(table_col_types.items())
+
+    @staticmethod
+    def _prepare_data(data):
+        if isinstance(data, pa.RecordBatch):
+            return pa.Table.from_batches([data])
+        if (
+            isinstance(data, pd.DataFrame)
+            and not isinstance(data.index, (pd.MultiIndex, pd.RangeIndex))
+            and data.index.name
+        ):
+            return data.reset_index()
+        return data
+
     @staticmethod
     def _unique(values: List[str]) -> List[str]:
         unique: List[str] = []
@@ -146,21 +286,10 @@ class Importer:
                 unique.append(value)
         return unique
 
-    def _get_pk(self, cur) -> List[str]:
-        query = self._query_get_pk[self._dialect]
-        if self._dialect == "mssql":
-            params = (self._schema, self._table)
-        else:  # sqlite
-            params = (self._table,)
-        return [row for row, in cur.execute(query, params).fetchall()]
-
-    def _get_cols(self, cur) -> List[str]:
-        query = self._query_get_cols[self._dialect]
-        if self._dialect == "mssql":
-            params = (self._schema, self._table)
-        else:  # sqlite
-            params = (self._table,)
-        return [row for row, in cur.execute(query, params).fetchall()]
+    def _get_data_cols(self) -> List[str]:
+        if isinstance(self._data_master, pa.Table):
+            return self._data_master.column_names
+        return list(self._data_master.columns)
 
     def _set_join_on(self, columns: List[str]) -> None:
         if not columns:
@@ -168,7 +297,7 @@ class Importer:
 
         columns = self._unique(columns)
 
-        diff = set(columns) - set(self._data_master.columns)
+        diff = set(columns) - set(self._get_data_cols())
         if diff:
             raise ValueError(
                 "couldn't find supplied column%s to join on: %s"
@@ -186,7 +315,7 @@ class Importer:
 
         columns = self._unique(columns)
 
-        diff = set(columns) - set(self._data_master.columns)
+        diff = set(columns) - set(self._get_data_cols())
         if diff:
             raise ValueError(
                 "column%s provided not found in data: %s"
@@ -227,10 +356,10 @@ class Importer:
 
     def _slice_data(self):
         cols = self._join_on + self._subset
-        data = self._data_master[cols].copy().dropna(subset=self._join_on)
+        data_cols = pd.Index([c for c in self._get_data_cols() if c in cols])
 
-        if data.columns.has_duplicates:
-            duplicates = data.columns[data.columns.duplicated()]
+        if data_cols.has_duplicates:
+            duplicates = data_cols[data_cols.duplicated()]
             raise ImporterError(
                 "data contains duplicate column%s: %s"
                 % (
@@ -239,124 +368,452 @@ class Importer:
                 )
             )
 
-        if data.duplicated(self._join_on).any():
-            raise ImporterError(
-                "data contains duplicate values in join on column%s: %s"
-                % (
-                    "s" if len(self._join_on) > 1 else "",
-                    ", ".join("'%s'" % c for c in self._join_on),
-                )
-            )
+        if self._chunks is not None:
+            # chunks are sliced and checked while they are sent
+            self._data = self._chunks
+            return
+
+        data, keys = self._slice_chunk(self._data_master)
+        # keys are compared as int64 codes, not as rows of Python objects
+        if duplicated_keys(keys).any():
+            self._raise_duplicate_keys()
 
         self._data = data
 
-    def _executemany(self, cur, query: str, data: pd.DataFrame) -> None:
-        for _, chunk in data.groupby(np.arange(len(data)) // self._chunk_size):
-            cur.executemany(
-                query,
-                chunk.astype(object)
-                .where(pd.notnull(chunk), None)
-                .values.tolist(),
+    def _slice_chunk(self, data):
+        cols = self._join_on + self._subset
+
+        if isinstance(data, pa.Table):
+            data = data.select(cols)
+            valid = [pc.is_valid(data[col]) for col in self._join_on]
+            mask = valid[0]
+            for col_valid in valid[1:]:
+                mask = pc.and_(mask, col_valid)
+            data = data.filter(mask)
+            keys = data.select(self._join_on)
+        else:
+            data = data[cols].dropna(subset=self._join_on)
+            keys = data[self._join_on]
+        return data, keys
+
+    def _raise_duplicate_keys(self):
+        raise ImporterError(
+            "data contains duplicate values in join on column%s: %s"
+            % (
+                "s" if len(self._join_on) > 1 else "",
+                ", ".join("'%s'" % c for c in self._join_on),
             )
-            self._conn.commit()
+        )
+
+    def _iter_sliced_chunks(self, chunks):
+        # join keys are checked for duplicates across chunks by a key index,
+        # rows of chunks already sent are not kept. Key columns of later
+        # chunks can be wider, e.g. integers read as floats by a CSV reader,
+        # keys are compared by value whatever their data types
+        key_index = KeyIndex()
+
+        for chunk in chunks:
+            try:
+                chunk, keys = self._slice_chunk(chunk)
+            except (KeyError, pa.ArrowInvalid):
+                raise ImporterError(
+                    "data chunks must contain the same columns"
+                ) from None
+            if len(chunk) == 0:
+                continue
+            if isinstance(keys, pa.Table):
+                keys = keys.to_pandas()
+
+            if key_index.add(keys).any():
+                self._raise_duplicate_keys()
+            yield chunk
+
+    def _get_column_types(self) -> list:
+        return [
+            self._table_col_types[col] for col in self._join_on + self._subset
+        ]
+
+    def _new_chunk_sizer(self, data) -> ChunkSizer:
+        if self._chunk_size is not None:
+            size = self._chunk_size
+            return ChunkSizer(size, minimum=size, maximum=size)
+
+        # the first chunk size is estimated from the width of sample rows
+        if isinstance(data, pa.Table):
+            sample = data.slice(0, 1000)
+            sample_bytes = sample.nbytes
+        else:
+            sample = data.iloc[:1000]
+            sample_bytes = sample.memory_usage(index=False, deep=True).sum()
+        row_bytes = sample_bytes / max(len(sample), 1)
+        size = estimate_chunk_size(
+            row_bytes,
+            target_bytes=self._target_chunk_bytes,
+            minimum=self._min_chunk_size,
+            maximum=self._max_chunk_size,
+        )
+        return ChunkSizer(
+            size, minimum=self._min_chunk_size, maximum=self._max_chunk_size
+        )
+
+    def _iter_chunks(self, data, sizer: ChunkSizer):
+        # columns are cast to Python objects matching the column types once
+        # per chunk, so the driver can bind them without guessing
+        casts = self._backend.get_casts(self._get_column_types())
+
+        offset = 0
+        while offset < len(data):
+            # the size is read for each chunk, as it is tuned while sending
+            size = sizer.size
+            if isinstance(data, pa.Table):
+                # slices are converted column-wise straight into rows of
+                # Python objects, without going through a DataFrame
+                chunk = data.slice(offset, size)
+                self._stats["bytes_sent"] += chunk.nbytes
+                columns = []
+                for values, cast in zip(chunk.columns, casts):
+                    if cast is None:
+                        columns.append(values.to_pylist())
+                    else:
+                        columns.append(cast(values.to_pandas()))
+            else:
+                chunk = data.iloc[offset : offset + size]
+                self._stats["bytes_sent"] += int(
+                    chunk.memory_usage(index=False, deep=True).sum()
+                )
+                columns = []
+                for (_, values), cast in zip(chunk.items(), casts):
+                    if cast is None:
+                        values = values.astype(object)
+                        columns.append(
+                            values.where(pd.notnull(values), None).tolist()
+                        )
+                    else:
+                        columns.append(cast(values))
+            offset += size
+            yield size, list(zip(*columns))
+
+    def _executemany(self, cur, columns: List[str], data) -> None:
+        if isinstance(data, (pd.DataFrame, pa.Table)):
+            frames = [data]
+        else:
+            frames = self._iter_sliced_chunks(data)
+
+        sizer = None
+        sizes = deque()
+
+        def iter_chunks():
+            nonlocal sizer
+            # frames are pulled from the source on this thread, as sources
+            # such as chunked database readers are bound to their thread
+            for frame in frames:
+                if self._delta is not None:
+                    frame = self._filter_unchanged(frame)
+                    if len(frame) == 0:
+                        continue
+                if sizer is None:
+                    sizer = self._new_chunk_sizer(frame)
+                    self._stats["chunk_size_initial"] = sizer.initial_size
+
+                # chunks of a frame are converted in a background thread
+                # while the previous ones are sent, so conversion and round
+                # trips overlap; not when profiling, as cProfile only sees
+                # the calling thread
+                converted = self._iter_chunks(frame, sizer)
+                if self._prefetch_chunks > 0 and self._profiler is None:
+                    converted = prefetch(converted, self._prefetch_chunks)
+                try:
+                    for size, chunk in converted:
+                        sizes.append(size)
+                        yield chunk
+                finally:
+                    converted.close()
+
+        chunks = iter_chunks()
+
+        start = time.perf_counter()
+        try:
+            for chunk in self._backend.bulk_load(
+                cur, columns, self._get_column_types(), chunks
+            ):
+                self._conn.commit()
+
+                now = time.perf_counter()
+                sizer.record(len(chunk), now - start, sizes.popleft())
+                start = now
+
+                self._stats["rows_staged"] += len(chunk)
+                self._stats["chunks"] += 1
+                self._stats["chunk_size"] = sizer.size
+                self._report("stage")
+        finally:
+            # stops the background conversion if sending failed
+            chunks.close()
+
+    def _filter_unchanged(self, data):
+        # rows are compared by hashes of their values, vectorized per frame
+        changed = self._delta.changed(data, self._join_on, self._subset)
+        self._stats["rows_unchanged"] += int(len(changed) - changed.sum())
+        if isinstance(data, pa.Table):
+            return data.filter(pa.array(changed))
+        return data[changed]
+
+    def _get_table_name(self) -> str:
+        return self._backend.table_name(self._schema, self._table)
 
     def _drop_temp_table(self, cur):
-        drop_temp = self._query_drop_temp_table[self._dialect]
-        drop_temp_query = drop_temp.format(temp=self._temp_table)
-        cur.execute(drop_temp_query)
+        cur.execute(self._backend.drop_staging_query())
 
     def _fill_temp_table(self, cur):
-        create_temp = self._query_create_temp_table[self._dialect]
-        insert_temp = "insert into {temp} ({cols}) values ({vals})"
-
-        if self._dialect == "mssql":
-            table = q(self._schema) + "." + q(self._table)
-            cols = ", ".join(q(col) for col in self._data.columns)
-        else:  # sqlite
-            table = self._table
-            cols = ", ".join(self._data.columns)
-
-        create_temp_query = create_temp.format(
-            temp=self._temp_table,
-            table=table,
-            cols=cols,
-        )
-        insert_temp_query = insert_temp.format(
-            temp=self._temp_table,
-            cols=cols,
-            vals=", ".join("?" for _ in range(len(self._data.columns))),
+        cols = self._join_on + self._subset
+        cur.execute(
+            self._cached_query(
+                "create_staging",
+                lambda: self._backend.create_staging_query(
+                    self._get_table_name(), cols
+                ),
+            )
         )
+        self._executemany(cur, cols, self._data)
 
-        cur.execute(create_temp_query)
-        self._executemany(cur, insert_temp_query, self._data)
-
-    def run(self, update=True, insert=False):
+    def run(
+        self,
+        update=True,
+        insert=False,
+        profiler=None,
+        progress=None,
+        journal=False,
+        changed_only=False,
+        delta: Optional[DeltaStore] = None,
+        collect_unmatched=False,
+    ):
+        """Update and / or insert table rows using the data.
+
+        If `journal` is set, the current values of the updated rows and
+        columns are copied into a journal table before the update, so the
+        update can be undone by `journal.undo` using `run_id`. Inserted rows
+        are not journaled.
+
+        If `changed_only` is set, staged rows are compared with the table
+        and grouped by the set of columns that differ, each group updates
+        only its changed columns and unchanged rows are not updated, nor
+        counted in `row_count_updated`.
+
+        If a `delta.DeltaStore` is provided, rows whose values equal those
+        of the last successful run with the same table, columns and actions
+        are not staged at all, the state is replaced once the run succeeds.
+
+        If `collect_unmatched` is set, the join keys of staged rows matching
+        no table row are kept in `unmatched_keys` after the update, before
+        any insert, and `row_count_matched` is set. Dialects supporting it
+        output matched keys while updating, otherwise the keys are found by
+        an anti-join of the staging table with the table.
+
+        Each phase of the run is profiled if a `profiler.Profiler` is
+        provided. `progress` is called with a `ProgressEvent` when a phase
+        starts, after each chunk is sent and when the run is done, an
+        exception it raises aborts the run.
+        """
         if not update and not insert:
             raise ValueError("at least one action must be performed")
 
+        if self._chunks is not None and self._chunks_consumed:
+            raise ImporterError("data chunks can only be imported once")
+        self._chunks_consumed = self._chunks is not None
+
+        self._stats = self._new_stats()
+        self._row_cnt_match = -1
+        self._unmatched_keys = None
+        self._run_id = None
+        self._profiler = profiler
+        self._progress = progress
+        actions = [a for a, b in (("update", update), ("insert", insert)) if b]
+        self._delta = (
+            delta.load(
+                self._schema, self._table, self._join_on, self._subset, actions
+            )
+            if delta is not None
+            else None
+        )
+
         cur = self._conn.cursor()
-        if self._dialect == "mssql" and hasattr(cur, "fast_executemany"):
-            cur.fast_executemany = True
+        self._backend.prepare_cursor(cur)
 
-        self._drop_temp_table(cur)
-        self._fill_temp_table(cur)
+        with self._phase("stage"):
+            self._drop_temp_table(cur)
+            self._fill_temp_table(cur)
 
+        if update and journal:
+            with self._phase("journal"):
+                self._journal(cur)
+        changes = (
+            changed_only and len(self._subset) <= self._max_changes_columns
+        )
         if update:
-            self._update(cur)
+            with self._phase("update"):
+                if changes:
+                    self._update_changed(cur)
+                else:
+                    self._update(cur, matched=collect_unmatched)
+        if update and collect_unmatched:
+            with self._phase("unmatched"):
+                self._collect_unmatched(cur, changes)
         if insert:
-            self._insert(cur)
+            with self._phase("insert"):
+                self._insert(cur)
+
+        with self._phase("cleanup"):
+            self._drop_temp_table(cur)
+            cur.close()
+
+        if delta is not None:
+            with self._phase("delta"):
+                delta.save(
+                    self._schema,
+                    self._table,
+                    self._join_on,
+                    self._subset,
+                    self._delta,
+                    actions,
+                )
+            self._delta = None
+
+        self._report("done")
+        self._profiler = None
+        self._progress = None
+
+    def _journal(self, cur) -> None:
+        # before-images are copied by a single join of the table with the
+        # staging table, only the columns being updated are copied
+        run_id = uuid.uuid4().hex
+        backend = self._backend
+
+        cur.execute(backend.create_journal_catalog_query())
+        cur.execute(
+            backend.journal_query(
+                self._get_table_name(),
+                backend.journal_name(run_id),
+                self._join_on,
+                self._subset,
+            )
+        )
+        cur.execute(
+            "insert into {catalog} values (?, ?, ?, ?, ?, ?, ?)".format(
+                catalog=backend.journal_catalog_name()
+            ),
+            (
+                run_id,
+                self._schema,
+                self._table,
+                backend.journal_prefix + run_id,
+                json.dumps(self._join_on),
+                json.dumps(self._subset),
+                datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            ),
+        )
+        self._conn.commit()
 
-        self._drop_temp_table(cur)
-        cur.close()
+        self._run_id = run_id
+
+    def _update(self, cur, matched=False) -> None:
+        matched = matched and self._backend.output_matched
+        if matched:
+            cur.execute(self._backend.drop_matched_query())
+            cur.execute(self._backend.create_matched_query(self._join_on))
+
+        query = self._cached_query(
+            "update_matched" if matched else "update",
+            lambda: self._backend.update_query(
+                self._get_table_name(),
+                self._join_on,
+                self._subset,
+                matched=matched,
+            ),
+        )
+        cur.execute(query)
+        self._conn.commit()
 
-    def _update(self, cur) -> None:
-        if self._dialect == "mssql":
-            condition = " and ".join(
-                "a.{col} = b.{col}".format(col=q(col)) for col in self._join_on
-            )
-            cols = ", ".join(
-                "a.{col} = b.{col}".format(col=q(col)) for col in self._subset
-            )
+        self._row_cnt_upd = cur.rowcount
 
-            query = """update a
-            set {cols}
-            from {table} as a
-            inner join {temp} as b
-            on {cond}""".format(
-                cols=cols,
-                table=q(self._schema) + "." + q(self._table),
-                temp=self._temp_table,
-                cond=condition,
-            )
-        else:  # sqlite
-            condition = " and ".join(
-                "{table}.{col} = {temp}.{col}".format(
-                    col=col,
-                    table=self._table,
-                    temp=self._temp_table,
-                )
-                for col in self._join_on
+    def _update_changed(self, cur) -> None:
+        # a bit mask of changed columns is computed for each staged row by a
+        # single join, rows are then updated in groups of equal masks
+        backend = self._backend
+        cur.execute(backend.add_changes_column_query())
+        cur.execute(
+            self._cached_query(
+                "changes",
+                lambda: backend.changes_query(
+                    self._get_table_name(),
+                    self._join_on,
+                    self._subset,
+                    [self._table_col_types[col] for col in self._subset],
+                ),
             )
-            cols = ",\n".join(
-                "{col} = (select {col} from {temp} where {cond})".format(
-                    col=col, temp=self._temp_table, cond=condition
+        )
+        groups = [
+            changes
+            for changes, in cur.execute(
+                backend.changes_groups_query()
+            ).fetchall()
+        ]
+
+        if len(groups) > self._max_update_groups:
+            # staged rows without changes are not needed by the insert either
+            cur.execute(backend.delete_unchanged_query())
+            self._update(cur)
+            return
+
+        row_count = 0
+        for changes in groups:
+            subset = [
+                col for i, col in enumerate(self._subset) if changes >> i & 1
+            ]
+            cur.execute(
+                self._cached_query(
+                    "update_changes_%d" % changes,
+                    lambda: backend.update_query(
+                        self._get_table_name(),
+                        self._join_on,
+                        subset,
+                        changes=changes,
+                    ),
                 )
-                for col in self._subset
             )
+            row_count += cur.rowcount
+        self._conn.commit()
 
-            query = """update {table}
-            set {cols}
-            where exists (select * from {temp} where {cond})""".format(
-                cols=cols,
-                table=self._table,
-                temp=self._temp_table,
-                cond=condition,
+        self._row_cnt_upd = row_count
+
+    def _collect_unmatched(self, cur, changes) -> None:
+        # keys output by the update or the changes column tell matched rows
+        # without joining the table again, where the dialect or run has them
+        backend = self._backend
+        cur.execute(
+            backend.unmatched_keys_query(
+                self._get_table_name(), self._join_on, changes
             )
+        )
+        keys = pd.DataFrame.from_records(
+            [tuple(row) for row in cur.fetchall()], columns=self._join_on
+        )
+        if not changes and backend.output_matched:
+            cur.execute(backend.drop_matched_query())
 
+        self._unmatched_keys = keys
+        self._row_cnt_match = self._stats["rows_staged"] - len(keys)
+        if self._row_cnt_upd < 0 and not changes:
+            # some drivers don't report the row count of the update
+            self._row_cnt_upd = self._row_cnt_match
+
+    def _insert(self, cur) -> None:
+        query = self._cached_query(
+            "insert",
+            lambda: self._backend.insert_query(
+                self._get_table_name(), self._join_on, self._subset
+            ),
+        )
         cur.execute(query)
         self._conn.commit()
 
-        self._row_cnt_upd = cur.rowcount
-
-    def _insert(self, cur) -> None:
-        raise NotImplementedError
+        self._row_cnt_ins = cur.rowcount
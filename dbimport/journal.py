@@ -0,0 +1,117 @@
+import json
+from collections import OrderedDict
+from typing import Dict, List, Union
+
+from .dialects import Dialect, get_dialect
+from .importer import ImporterError
+
+_CATALOG_COLUMNS = [
+    "run_id",
+    "table_schema",
+    "table_name",
+    "journal_table",
+    "join_on",
+    "subset",
+    "created",
+]
+
+
+def _get_backend(dialect):
+    if isinstance(dialect, Dialect):
+        return dialect
+    return get_dialect(dialect)
+
+
+def _fetch_runs(cur, backend, run_id=None):
+    cur.execute(backend.create_journal_catalog_query())
+    query = "select {cols} from {catalog}".format(
+        cols=", ".join(_CATALOG_COLUMNS),
+        catalog=backend.journal_catalog_name(),
+    )
+    if run_id is None:
+        rows = cur.execute(query + " order by created").fetchall()
+    else:
+        rows = cur.execute(query + " where run_id = ?", (run_id,)).fetchall()
+
+    runs = []
+    for row in rows:
+        run = OrderedDict(zip(_CATALOG_COLUMNS, row))
+        run["join_on"] = json.loads(run["join_on"])
+        run["subset"] = json.loads(run["subset"])
+        runs.append(run)
+    return runs
+
+
+def _get_run(cur, backend, run_id):
+    runs = _fetch_runs(cur, backend, run_id)
+    if not runs:
+        raise ImporterError("import run '%s' not found in journal" % run_id)
+    return runs[0]
+
+
+def _get_journal_name(backend, run):
+    return backend.table_name(backend.default_schema, run["journal_table"])
+
+
+def _drop_journal(cur, backend, run):
+    cur.execute(
+        "drop table {journal}".format(journal=_get_journal_name(backend, run))
+    )
+    cur.execute(
+        "delete from {catalog} where run_id = ?".format(
+            catalog=backend.journal_catalog_name()
+        ),
+        (run["run_id"],),
+    )
+
+
+def get_runs(connection, dialect: Union[str, Dialect] = "mssql") -> List[Dict]:
+    """Return journaled import runs that can be undone, oldest first."""
+    cur = connection.cursor()
+    try:
+        runs = _fetch_runs(cur, _get_backend(dialect))
+        connection.commit()
+    finally:
+        cur.close()
+    return runs
+
+
+def undo(
+    connection, run_id: str, dialect: Union[str, Dialect] = "mssql"
+) -> int:
+    """Restore the values an import run updated from its journal and drop
+    the journal, return the number of rows restored.
+
+    Values changed by later imports of the same rows are overwritten too.
+    """
+    backend = _get_backend(dialect)
+    cur = connection.cursor()
+    try:
+        run = _get_run(cur, backend, run_id)
+        cur.execute(
+            backend.update_query(
+                backend.table_name(run["table_schema"], run["table_name"]),
+                run["join_on"],
+                run["subset"],
+                source=_get_journal_name(backend, run),
+            )
+        )
+        row_count = cur.rowcount
+        _drop_journal(cur, backend, run)
+        connection.commit()
+    finally:
+        cur.close()
+    return row_count
+
+
+def discard(
+    connection, run_id: str, dialect: Union[str, Dialect] = "mssql"
+) -> None:
+    """Drop the journal of an import run, it can no longer be undone."""
+    backend = _get_backend(dialect)
+    cur = connection.cursor()
+    try:
+        _drop_journal(cur, backend, _get_run(cur, backend, run_id))
+        connection.commit()
+    finally:
+        cur.close()
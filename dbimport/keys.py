@@ -0,0 +1,178 @@
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .delta import hash_rows
+
+
+def _factorize(values):
+    if isinstance(values, (pa.Array, pa.ChunkedArray)):
+        encoded = values.dictionary_encode()
+        chunks = (
+            encoded.chunks
+            if isinstance(encoded, pa.ChunkedArray)
+            else [encoded]
+        )
+        # chunks of a dictionary encoded chunked array share the dictionary
+        codes = [
+            chunk.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+            for chunk in chunks
+        ]
+        cardinality = max(
+            (len(chunk.dictionary) for chunk in chunks), default=0
+        )
+        return (
+            np.concatenate(codes).astype(np.int64)
+            if codes
+            else np.empty(0, dtype=np.int64)
+        ), cardinality
+
+    codes, uniques = pd.factorize(values)
+    return codes.astype(np.int64), len(uniques)
+
+
+def encode_keys(keys) -> np.ndarray:
+    """Return a single int64 code of each row of join key columns, equal keys
+    have equal codes and different keys have different codes.
+
+    `keys` is a DataFrame or an Arrow table. Columns are factorized and
+    their codes combined, combined codes are factorized again whenever they
+    could overflow, so no key values are hashed or copied into Python
+    objects. Null values get a code of their own.
+    """
+    columns = (
+        keys.columns
+        if isinstance(keys, pa.Table)
+        else [values for _, values in keys.items()]
+    )
+
+    combined = np.zeros(len(keys), dtype=np.int64)
+    cardinality = 1
+    for values in columns:
+        codes, size = _factorize(values)
+        # nulls are coded -1
+        size += 1
+        codes += 1
+
+        if cardinality * size >= 2**63:
+            combined, uniques = pd.factorize(combined)
+            cardinality = len(uniques)
+        combined = combined * size + codes
+        cardinality *= size
+    return combined
+
+
+def duplicated_keys(keys) -> np.ndarray:
+    """Return a boolean array marking rows of join key columns that repeat
+    an earlier row, see `encode_keys`."""
+    return pd.Series(encode_keys(keys)).duplicated().to_numpy()
+
+
+def hash_keys(keys: pd.DataFrame) -> np.ndarray:
+    """Return a 64-bit hash of each row of join key columns.
+
+    Equal keys have equal hashes whatever their data types, see
+    `delta.hash_rows`.
+    """
+    return hash_rows(keys, list(keys.columns))
+
+
+def _same_row(a, b):
+    for x, y in zip(a, b):
+        if pd.isna(x) or pd.isna(y):
+            if not (pd.isna(x) and pd.isna(y)):
+                return False
+        elif x != y:
+            return False
+    return True
+
+
+class KeyIndex:
+    """Set of join keys, used to check uniqueness of join keys of data
+    arriving in chunks.
+
+    Keys are looked up by their 64-bit hashes, kept in sorted runs of
+    geometrically growing size, small runs being merged into larger ones,
+    so adding a chunk doesn't copy the whole index. Key values are kept
+    along with their hashes, equal hashes are confirmed by comparing them,
+    so keys with colliding hashes aren't taken for duplicates.
+    """
+
+    # a run is merged into the previous one unless that one is larger by
+    # more than this factor
+    _merge_factor = 2
+
+    def __init__(self):
+        self._runs: List[Tuple[np.ndarray, pd.DataFrame]] = []
+
+    def __len__(self):
+        return sum(len(hashes) for hashes, _ in self._runs)
+
+    @property
+    def nbytes(self):
+        return sum(
+            hashes.nbytes
+            + int(keys.memory_usage(index=False, deep=True).sum())
+            for hashes, keys in self._runs
+        )
+
+    def add(self, keys: pd.DataFrame, hashes=None) -> np.ndarray:
+        """Add join keys to the index.
+
+        Return a boolean array marking keys that were already in the index
+        or occur earlier in `keys`. `hashes` of the keys are computed by
+        `hash_keys` unless provided.
+        """
+        keys = keys.reset_index(drop=True)
+        if hashes is None:
+            hashes = hash_keys(keys)
+        hashes = np.asarray(hashes, dtype=np.uint64)
+
+        duplicated = duplicated_keys(keys).copy()
+        # searching sorted hashes is faster
+        new = np.flatnonzero(~duplicated)
+        new = new[np.argsort(hashes[new], kind="stable")]
+        for run_hashes, run_keys in self._runs:
+            left = np.searchsorted(run_hashes, hashes[new], side="left")
+            found = np.flatnonzero(
+                run_hashes[np.minimum(left, len(run_hashes) - 1)]
+                == hashes[new]
+            )
+            right = left.copy()
+            right[found] = np.searchsorted(
+                run_hashes, hashes[new[found]], side="right"
+            )
+            # only keys of equal hashes are compared, duplicates or
+            # collisions being rare
+            for i in found:
+                row = tuple(keys.iloc[new[i]])
+                if any(
+                    _same_row(row, tuple(run_keys.iloc[j]))
+                    for j in range(left[i], right[i])
+                ):
+                    duplicated[new[i]] = True
+
+        added = np.flatnonzero(~duplicated)
+        if len(added):
+            order = added[np.argsort(hashes[added], kind="stable")]
+            self._runs.append(
+                (hashes[order], keys.take(order).reset_index(drop=True))
+            )
+        while (
+            len(self._runs) > 1
+            and len(self._runs[-2][0])
+            <= len(self._runs[-1][0]) * self._merge_factor
+        ):
+            last_hashes, last_keys = self._runs.pop()
+            run_hashes, run_keys = self._runs[-1]
+            merged = np.concatenate([run_hashes, last_hashes])
+            order = np.argsort(merged, kind="stable")
+            self._runs[-1] = (
+                merged[order],
+                pd.concat([run_keys, last_keys], ignore_index=True)
+                .take(order)
+                .reset_index(drop=True),
+            )
+        return duplicated
@@ -0,0 +1,193 @@
+import heapq
+import re
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict, Iterable, List
+
+from .util import is_cast_explicit
+
+_WORD_BOUNDARY = re.compile(r"([a-z0-9])([A-Z])")
+_NON_ALNUM = re.compile(r"[\W_]+")
+
+# penalty of a match which needs an explicit cast
+_CAST_PENALTY = 0.1
+
+
+def normalize_name(name):
+    """Return column name case folded without separators, e.g. 'Order ID',
+    'order_id' and 'OrderId' are all normalized to 'orderid'.
+
+    Letters and digits of any script are kept, a name without any is
+    normalized to an empty string.
+    """
+    return _NON_ALNUM.sub("", _WORD_BOUNDARY.sub(r"\1 \2", name).casefold())
+
+
+def _trigrams(name):
+    padded = "  %s " % name
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit=None):
+    """Return Levenshtein distance of two strings.
+
+    If `limit` is provided, the computation stops once the distance exceeds
+    it and `limit + 1` is returned.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (ca != cb),
+                )
+            )
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class ColumnMatcher:
+    """Matches file columns to table columns by name and data type.
+
+    Table columns are indexed by normalized name and by name trigrams, so
+    each file column is compared only to a few candidates sharing parts of
+    its name instead of every table column.
+    """
+
+    def __init__(
+        self,
+        table_columns: Dict[str, str],
+        min_score: float = 0.75,
+        max_candidates: int = 10,
+    ):
+        self._table_cols = OrderedDict(table_columns)
+        self._min_score = min_score
+        self._max_candidates = max_candidates
+
+        self._names = {}
+        self._by_name = defaultdict(list)
+        self._by_trigram = defaultdict(list)
+        for col in self._table_cols:
+            name = normalize_name(col)
+            self._names[col] = name
+            if not name:
+                # names of separators only match nothing
+                continue
+            self._by_name[name].append(col)
+            for trigram in _trigrams(name):
+                self._by_trigram[trigram].append(col)
+
+    def _candidates(self, name):
+        if name in self._by_name:
+            return self._by_name[name]
+
+        shared = Counter()
+        for trigram in _trigrams(name):
+            shared.update(self._by_trigram.get(trigram, ()))
+        return [
+            col
+            for col, _ in heapq.nlargest(
+                self._max_candidates, shared.items(), key=lambda x: x[1]
+            )
+        ]
+
+    def _name_score(self, name, table_col):
+        other = self._names[table_col]
+        if name == other:
+            return 1.0
+
+        length = max(len(name), len(other))
+        if not length:
+            return 0.0
+        limit = int(length * (1 - self._min_score))
+        return 1 - edit_distance(name, other, limit) / length
+
+    def scores(self, file_col, file_col_type=None):
+        """Return a list of (score, table column) pairs of the table columns
+        matching a file column, best match first.
+
+        The score is the similarity of normalized names, lowered if the
+        file column data type cannot be implicitly converted to the table
+        column data type. Only matches scoring at least `min_score` are
+        returned.
+        """
+        name = normalize_name(file_col)
+        if not name:
+            return []
+        matches = []
+        for table_col in self._candidates(name):
+            score = self._name_score(name, table_col)
+            if file_col_type is not None and is_cast_explicit(
+                file_col_type, self._table_cols[table_col]
+            ):
+                score -= _CAST_PENALTY
+            if score >= self._min_score:
+                matches.append((score, table_col))
+
+        matches.sort(key=lambda x: (-x[0], x[1] != file_col))
+        return matches
+
+    def match(self, file_columns: Dict[str, str]) -> Dict[str, str]:
+        """Return a mapping of file column to the matching table column.
+
+        `file_columns` is a mapping of file column to its common data type
+        name, see `util.translate_dtype`. Each table column is matched to at
+        most one file column, best scoring pairs are matched first.
+        """
+        pairs = []
+        for i, (file_col, file_col_type) in enumerate(file_columns.items()):
+            for score, table_col in self.scores(file_col, file_col_type):
+                # ties are broken by exact name, then file column order
+                pairs.append((-score, table_col != file_col, i, table_col))
+        pairs.sort()
+
+        file_cols = list(file_columns)
+        mapping = {}
+        used = set()
+        for _, _, i, table_col in pairs:
+            file_col = file_cols[i]
+            if file_col in mapping or table_col in used:
+                continue
+            mapping[file_col] = table_col
+            used.add(table_col)
+
+        return OrderedDict(
+            (file_col, mapping[file_col])
+            for file_col in file_columns
+            if file_col in mapping
+        )
+
+
+def match_columns(
+    file_columns: Dict[str, str],
+    table_columns: Dict[str, str],
+    min_score: float = 0.75,
+) -> Dict[str, str]:
+    """Return a mapping of file column to the matching table column, see
+    `ColumnMatcher.match`."""
+    return ColumnMatcher(table_columns, min_score).match(file_columns)
+
+
+def suggest_join_on(
+    mapping: Dict[str, str], primary_key: Iterable[str]
+) -> List[str]:
+    """Return file columns mapped to the table primary key columns.
+
+    An empty list is returned unless every primary key column is mapped.
+    """
+    by_table_col = {
+        table_col: file_col for file_col, table_col in mapping.items()
+    }
+    primary_key = list(primary_key)
+    if not primary_key or any(c not in by_table_col for c in primary_key):
+        return []
+    return [by_table_col[c] for c in primary_key]
@@ -0,0 +1,375 @@
+from collections import OrderedDict
+
+from PySide2.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer, Signal
+from PySide2.QtGui import QBrush
+from PySide2.QtWidgets import QComboBox, QStyledItemDelegate
+
+from .preview import format_value
+from .util import is_cast_explicit
+
+
+class ColumnMappingModel(QAbstractTableModel):
+    """Mapping of table columns to file columns, one row per table column."""
+
+    COL_TABLE = 0
+    COL_TABLE_TYPE = 1
+    COL_FILE = 2
+    COL_FILE_TYPE = 3
+    COL_JOIN = 4
+
+    headers = [
+        "Table Column Name",
+        "Table Data Type",
+        "File Column Name",
+        "File Data Type",
+        "Join",
+    ]
+
+    mappingChanged = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self._table_cols = []
+        self._file_cols = OrderedDict()
+
+        # file column and join flag of each row, file column -> row index
+        self._mapping = []
+        self._join = []
+        self._used = {}
+
+        self._join_cnt = 0
+
+    @property
+    def join_count(self):
+        return self._join_cnt
+
+    @property
+    def subset_count(self):
+        return len(self._used) - self._join_cnt
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._table_cols)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    def flags(self, index):
+        flags = Qt.ItemIsEnabled
+        if index.column() == self.COL_FILE and self._file_cols:
+            flags |= Qt.ItemIsEditable
+        elif index.column() == self.COL_JOIN and self._mapping[index.row()]:
+            flags |= Qt.ItemIsUserCheckable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row, col = index.row(), index.column()
+        table_col, table_col_type = self._table_cols[row]
+        file_col = self._mapping[row]
+
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            if col == self.COL_TABLE:
+                return table_col
+            elif col == self.COL_TABLE_TYPE:
+                return table_col_type
+            elif col == self.COL_FILE:
+                return file_col or ""
+            elif col == self.COL_FILE_TYPE and file_col:
+                return self._file_cols[file_col]
+        elif role == Qt.CheckStateRole:
+            if col == self.COL_JOIN and file_col:
+                return Qt.Checked if self._join[row] else Qt.Unchecked
+        elif role == Qt.BackgroundRole:
+            if col == self.COL_FILE_TYPE and file_col:
+                if is_cast_explicit(self._file_cols[file_col], table_col_type):
+                    return QBrush(Qt.yellow)
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid():
+            return False
+
+        row, col = index.row(), index.column()
+        if col == self.COL_FILE and role == Qt.EditRole:
+            self.set_mapping(row, value or None)
+            return True
+        elif col == self.COL_JOIN and role == Qt.CheckStateRole:
+            self.set_join(row, value == Qt.Checked)
+            return True
+        return False
+
+    def _row_changed(self, row):
+        self.dataChanged.emit(
+            self.index(row, self.COL_FILE), self.index(row, self.COL_JOIN)
+        )
+
+    def _unmap(self, row):
+        file_col = self._mapping[row]
+        if file_col is None:
+            return
+
+        del self._used[file_col]
+        if self._join[row]:
+            self._join_cnt -= 1
+
+        self._mapping[row] = None
+        self._join[row] = False
+        self._row_changed(row)
+
+    def set_mapping(self, row, file_col):
+        """Map table column of the row to a file column, None unmaps it.
+
+        A file column already mapped to another row is moved.
+        """
+        if file_col == self._mapping[row]:
+            return
+        if file_col is not None and file_col not in self._file_cols:
+            raise ValueError("unknown file column '%s'" % file_col)
+
+        self._unmap(row)
+        if file_col is not None:
+            other = self._used.get(file_col)
+            if other is not None:
+                self._unmap(other)
+
+            self._used[file_col] = row
+            self._mapping[row] = file_col
+            self._row_changed(row)
+
+        self.mappingChanged.emit()
+
+    def set_join(self, row, join):
+        join = bool(join) and self._mapping[row] is not None
+        if join == self._join[row]:
+            return
+
+        self._join[row] = join
+        self._join_cnt += 1 if join else -1
+
+        index = self.index(row, self.COL_JOIN)
+        self.dataChanged.emit(index, index)
+        self.mappingChanged.emit()
+
+    def available_file_columns(self, row):
+        """Return file columns that can be mapped to the table column of the
+        row, an empty string stands for no mapping."""
+        return [""] + [
+            c
+            for c in self._file_cols
+            if c not in self._used or self._used[c] == row
+        ]
+
+    def _reset_mapping(self):
+        self._mapping = [None] * len(self._table_cols)
+        self._join = [False] * len(self._table_cols)
+        self._used.clear()
+        self._join_cnt = 0
+
+    def set_table_columns(self, columns):
+        """Set table columns from a mapping of column name to data type,
+        existing mapping is cleared."""
+        self.beginResetModel()
+        self._table_cols = list(columns.items())
+        self._reset_mapping()
+        self.endResetModel()
+        self.mappingChanged.emit()
+
+    def set_file_columns(self, columns):
+        """Set file columns from a mapping of column name to data type,
+        existing mapping is cleared."""
+        self.beginResetModel()
+        self._file_cols = OrderedDict(columns)
+        self._reset_mapping()
+        self.endResetModel()
+        self.mappingChanged.emit()
+
+    def apply_mapping(self, mapping, join_on=()):
+        """Replace the current mapping with a mapping of file column to table
+        column, `join_on` file columns are marked as join keys.
+
+        Unknown columns are ignored.
+        """
+        rows = {
+            table_col: i for i, (table_col, _) in enumerate(self._table_cols)
+        }
+
+        self.beginResetModel()
+        self._reset_mapping()
+        for file_col, table_col in mapping.items():
+            row = rows.get(table_col)
+            if (
+                row is None
+                or file_col not in self._file_cols
+                or file_col in self._used
+                or self._mapping[row] is not None
+            ):
+                continue
+
+            self._mapping[row] = file_col
+            self._used[file_col] = row
+            if file_col in join_on:
+                self._join[row] = True
+                self._join_cnt += 1
+        self.endResetModel()
+        self.mappingChanged.emit()
+
+    def _mapped(self, join):
+        return OrderedDict(
+            (file_col, self._table_cols[row][0])
+            for row, file_col in enumerate(self._mapping)
+            if file_col is not None and self._join[row] == join
+        )
+
+    def join_on(self):
+        """Return a mapping of file column to table column to join on."""
+        return self._mapped(join=True)
+
+    def subset(self):
+        """Return a mapping of file column to table column to update."""
+        return self._mapped(join=False)
+
+
+class DataPreviewModel(QAbstractTableModel):
+    """Rows of a sheet, values are read from the data only for the cells
+    being displayed."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self._preview = None
+
+    @property
+    def preview(self):
+        return self._preview
+
+    def set_preview(self, preview):
+        """Set `preview.DataPreview` of the data to display, None clears
+        it."""
+        self.beginResetModel()
+        self._preview = preview
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self._preview is None:
+            return 0
+        return self._preview.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid() or self._preview is None:
+            return 0
+        return len(self._preview.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or self._preview is None:
+            return None
+        if orientation == Qt.Horizontal:
+            return self._preview.columns[section]
+        return section + 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        return self._preview.text(index.row(), index.column())
+
+
+class ColumnStatsModel(QAbstractTableModel):
+    """Statistics of the columns of a sheet, one row per column.
+
+    Statistics of a column are computed when its row is first displayed.
+    """
+
+    COL_NAME = 0
+    COL_TYPE = 1
+    COL_NULLS = 2
+    COL_DISTINCT = 3
+    COL_MIN = 4
+    COL_MAX = 5
+
+    headers = ["Column Name", "Data Type", "Nulls", "Distinct", "Min", "Max"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self._preview = None
+        self._types = []
+
+    def set_preview(self, preview, types):
+        """Set `preview.DataPreview` of the data and a mapping of column name
+        to data type, None clears them."""
+        self.beginResetModel()
+        self._preview = preview
+        self._types = list((types or {}).values())
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self._preview is None:
+            return 0
+        return len(self._preview.columns)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row, col = index.row(), index.column()
+        if role == Qt.DisplayRole:
+            if col == self.COL_NAME:
+                return self._preview.columns[row]
+            elif col == self.COL_TYPE:
+                return self._types[row] if row < len(self._types) else ""
+
+            stats = self._preview.column_stats(row)
+            value = {
+                self.COL_NULLS: stats.nulls,
+                self.COL_DISTINCT: stats.distinct,
+                self.COL_MIN: stats.minimum,
+                self.COL_MAX: stats.maximum,
+            }[col]
+            return format_value(value)
+        elif role == Qt.TextAlignmentRole:
+            if col in (self.COL_NULLS, self.COL_DISTINCT):
+                return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+
+class FileColumnDelegate(QStyledItemDelegate):
+    """Drop-down list editor of file columns available for a table column."""
+
+    def createEditor(self, parent, option, index):
+        # noinspection PyArgumentList
+        editor = QComboBox(parent)
+        editor.addItems(index.model().available_file_columns(index.row()))
+        # noinspection PyUnresolvedReferences
+        editor.activated.connect(lambda: self._commit(editor))
+        # open the list right away, so a single click selects a column
+        QTimer.singleShot(0, editor.showPopup)
+        return editor
+
+    def _commit(self, editor):
+        # noinspection PyUnresolvedReferences
+        self.commitData.emit(editor)
+        # noinspection PyUnresolvedReferences
+        self.closeEditor.emit(editor)
+
+    def setEditorData(self, editor, index):
+        editor.setCurrentIndex(
+            max(editor.findText(index.data(Qt.EditRole)), 0)
+        )
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentText(), Qt.EditRole)
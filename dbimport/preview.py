@@ -0,0 +1,115 @@
+from collections import OrderedDict, namedtuple
+from typing import List, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# statistics of a single column, values are None where they can't be
+# computed, e.g. min and max of values that aren't comparable
+ColumnStats = namedtuple(
+    "ColumnStats", ["nulls", "distinct", "minimum", "maximum"]
+)
+
+
+def format_value(value) -> str:
+    """Return text of a single value for display, an empty string for
+    nulls."""
+    if value is None or value is pd.NaT:
+        return ""
+    try:
+        if pd.isna(value):
+            return ""
+    except (TypeError, ValueError):
+        # array-like values, e.g. of Arrow list columns
+        pass
+    if isinstance(value, pd.Timestamp) and value == value.normalize():
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+def _frame_column_stats(values: pd.Series) -> ColumnStats:
+    nulls = int(values.isna().sum())
+    try:
+        distinct = int(values.nunique(dropna=True))
+    except TypeError:
+        # unhashable values, e.g. lists
+        distinct = None
+
+    values = values.dropna()
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # unordered categories cannot be compared, their values can
+        values = values.astype(values.cat.categories.dtype)
+    try:
+        minimum, maximum = values.min(), values.max()
+    except TypeError:
+        # e.g. numbers and text mixed in an object column
+        text = values.astype(str)
+        minimum, maximum = text.min(), text.max()
+    if len(values) == 0:
+        minimum = maximum = None
+    return ColumnStats(nulls, distinct, minimum, maximum)
+
+
+def _arrow_column_stats(values: pa.ChunkedArray) -> ColumnStats:
+    nulls = values.null_count
+    if pa.types.is_dictionary(values.type):
+        values = values.cast(values.type.value_type)
+
+    # kernels are missing for nested types, e.g. lists
+    try:
+        distinct = pc.count_distinct(values, mode="only_valid").as_py()
+    except pa.ArrowNotImplementedError:
+        distinct = None
+    try:
+        min_max = pc.min_max(values)
+    except (pa.ArrowNotImplementedError, pa.ArrowTypeError):
+        minimum = maximum = None
+    else:
+        minimum, maximum = min_max["min"].as_py(), min_max["max"].as_py()
+    return ColumnStats(nulls, distinct, minimum, maximum)
+
+
+class DataPreview:
+    """Read-only view of a DataFrame or an Arrow table for display.
+
+    Values are read one at a time, as they are displayed, the data is not
+    copied. Column statistics are computed by column on first use and
+    cached.
+    """
+
+    def __init__(self, data: Union[pd.DataFrame, pa.Table]):
+        self._data = data
+        self._stats = OrderedDict()
+
+    @property
+    def data(self):
+        return self._data
+
+    @property
+    def row_count(self) -> int:
+        return len(self._data)
+
+    @property
+    def columns(self) -> List[str]:
+        if isinstance(self._data, pa.Table):
+            return self._data.column_names
+        return [str(col) for col in self._data.columns]
+
+    def value(self, row: int, column: int):
+        if isinstance(self._data, pa.Table):
+            return self._data.column(column)[row].as_py()
+        return self._data.iat[row, column]
+
+    def text(self, row: int, column: int) -> str:
+        return format_value(self.value(row, column))
+
+    def column_stats(self, column: int) -> ColumnStats:
+        stats = self._stats.get(column)
+        if stats is None:
+            if isinstance(self._data, pa.Table):
+                stats = _arrow_column_stats(self._data.column(column))
+            else:
+                stats = _frame_column_stats(self._data.iloc[:, column])
+            self._stats[column] = stats
+        return stats
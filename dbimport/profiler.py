@@ -0,0 +1,113 @@
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+
+_IGNORED_FRAMES = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class Profiler:
+    """Collects cProfile statistics and tracemalloc snapshots of import
+    phases into a directory.
+
+    Each phase produces a pstats file and a list of the `top` allocation
+    sites, a summary with duration and peak memory of all phases is kept
+    in summary.json. Phases cannot be nested.
+    """
+
+    _summary_file = "summary.json"
+
+    def __init__(self, directory, top=25, frames=10):
+        self._dir = directory
+        self._top = top
+        self._frames = frames
+        self._phases = []
+
+    @property
+    def directory(self):
+        return self._dir
+
+    @property
+    def phases(self):
+        return list(self._phases)
+
+    def _path(self, name, suffix):
+        return os.path.join(
+            self._dir, "%02d-%s%s" % (len(self._phases) + 1, name, suffix)
+        )
+
+    @contextmanager
+    def phase(self, name):
+        """Profile the enclosed block as a phase called `name`."""
+        os.makedirs(self._dir, exist_ok=True)
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(self._frames)
+        elif hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        memory_before, _ = tracemalloc.get_traced_memory()
+
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            duration = time.perf_counter() - start
+
+            snapshot = tracemalloc.take_snapshot()
+            memory_after, memory_peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+            stats_path = self._path(name, ".pstats")
+            profile.dump_stats(stats_path)
+
+            allocations_path = self._path(name, "-allocations.txt")
+            self._write_allocations(allocations_path, snapshot)
+
+            self._phases.append(
+                OrderedDict(
+                    [
+                        ("name", name),
+                        ("duration", duration),
+                        ("memory_peak", memory_peak),
+                        ("memory_allocated", memory_after - memory_before),
+                        ("stats", os.path.basename(stats_path)),
+                        (
+                            "allocations",
+                            os.path.basename(allocations_path),
+                        ),
+                    ]
+                )
+            )
+            self._write_summary()
+
+    def _write_allocations(self, path, snapshot):
+        statistics = snapshot.filter_traces(_IGNORED_FRAMES).statistics(
+            "traceback"
+        )
+        with open(path, "w", encoding="utf-8") as f:
+            for i, stat in enumerate(statistics[: self._top], 1):
+                f.write(
+                    "#%d: %.1f KiB in %d blocks\n"
+                    % (i, stat.size / 1024, stat.count)
+                )
+                for line in stat.traceback.format(most_recent_first=True):
+                    f.write(line + "\n")
+                f.write("\n")
+
+    def _write_summary(self):
+        with open(
+            os.path.join(self._dir, self._summary_file), "w", encoding="utf-8"
+        ) as f:
+            json.dump({"phases": self._phases}, f, indent=2)
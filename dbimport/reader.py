@@ -0,0 +1,490 @@
+import csv
+import os.path
+import posixpath
+import re
+import zipfile
+from collections import OrderedDict
+from xml.etree import ElementTree
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv
+import pyarrow.feather
+import pyarrow.ipc
+import pyarrow.parquet
+
+from .util import translate_dtype
+
+FILE_FORMATS = OrderedDict(
+    [
+        ("excel", ("Excel Workbook", (".xlsx",))),
+        ("parquet", ("Parquet", (".parquet",))),
+        ("arrow", ("Feather / Arrow IPC", (".feather", ".arrow", ".ipc"))),
+        ("csv", ("Delimited Text", (".csv", ".tsv", ".txt"))),
+    ]
+)
+
+CSV_SAMPLE_ROWS = 1000
+PREVIEW_ROWS = 100
+
+# candidate types are tried in order, text is used if none fits
+_CSV_TYPES = (pa.int64(), pa.float64(), pa.timestamp("us"), pa.bool_())
+
+
+def get_file_format(fp):
+    """Return name of the file format based on the file extension."""
+    ext = os.path.splitext(fp)[1].lower()
+    for name, (_, extensions) in FILE_FORMATS.items():
+        if ext in extensions:
+            return name
+    raise ValueError("unsupported file format '%s'" % ext)
+
+
+def get_frame_columns(data):
+    """Return common data type name of each column of a DataFrame."""
+    return OrderedDict(
+        (col, translate_dtype(dtype.name))
+        for col, dtype in data.dtypes.items()
+    )
+
+
+def get_arrow_columns(table):
+    """Return common data type name of each column of an Arrow table.
+
+    Data types are taken from the table schema, no inference is made.
+    """
+    return OrderedDict(
+        (field.name, translate_dtype(str(field.type)))
+        for field in table.schema
+    )
+
+
+def _read_head(batches, schema, nrows):
+    head = []
+    for batch in batches:
+        head.append(batch)
+        nrows -= batch.num_rows
+        if nrows <= 0:
+            break
+    table = pa.Table.from_batches(head, schema=schema)
+    return table.slice(0, table.num_rows + min(nrows, 0))
+
+
+def read_excel_sheet_names(fp):
+    """Return sheet names of an Excel workbook.
+
+    Only the workbook part is read, sheets themselves are not parsed.
+    """
+    with zipfile.ZipFile(fp) as archive:
+        part = "xl/workbook.xml"
+        rels = ElementTree.fromstring(archive.read("_rels/.rels"))
+        for rel in rels:
+            if rel.get("Type", "").endswith("/officeDocument"):
+                part = posixpath.normpath(rel.get("Target").lstrip("/"))
+                break
+        workbook = ElementTree.fromstring(archive.read(part))
+
+    return [
+        element.get("name")
+        for element in workbook.iter()
+        if element.tag.rpartition("}")[2] == "sheet"
+    ]
+
+
+def _excel_value(cell):
+    # converted as by pandas, whole numbers become integers, errors nulls
+    if cell.data_type == "e":
+        return None
+    if isinstance(cell.value, float) and cell.value.is_integer():
+        return int(cell.value)
+    return cell.value
+
+
+def _excel_column_names(header):
+    # named as by pandas, e.g. 'Unnamed: 2' for an empty header cell and
+    # 'name.1' for the second column named 'name'
+    names = []
+    counts = {}
+    for i, name in enumerate(header):
+        if name is None:
+            name = "Unnamed: %d" % i
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = "%s.%d" % (name, count)
+            count = counts.get(name, 0)
+        counts[name] = count + 1
+        names.append(name)
+    return names
+
+
+def _read_excel_head(fp, sheet, nrows):
+    # pandas parses the whole sheet even if only a few rows are read, rows
+    # of a read-only workbook are parsed as they are iterated
+    workbook = openpyxl.load_workbook(fp, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet]
+        # dimensions written by some applications are wrong
+        worksheet.reset_dimensions()
+
+        rows = []
+        for cells in worksheet.iter_rows():
+            rows.append([_excel_value(cell) for cell in cells])
+            if len(rows) > nrows:
+                break
+    finally:
+        workbook.close()
+
+    # trailing empty columns and rows are dropped
+    width = 0
+    for row in rows:
+        while row and row[-1] is None:
+            row.pop()
+        width = max(width, len(row))
+    while rows and not rows[-1]:
+        rows.pop()
+    rows = [row + [None] * (width - len(row)) for row in rows]
+
+    header = rows.pop(0) if rows else []
+    # empty cells are NaN, as read by pandas
+    rows = [
+        [np.nan if value is None else value for value in row] for row in rows
+    ]
+    return pd.DataFrame(
+        rows, columns=_excel_column_names(header), dtype=object
+    )
+
+
+def read_excel(fp, sheet, nrows=None):
+    """Return a pair of column data types and data of an Excel workbook
+    sheet.
+
+    Only the first `nrows` rows are read and parsed if provided.
+    """
+    if nrows is None:
+        data = pd.read_excel(fp, sheet_name=sheet, dtype=object)
+    else:
+        data = _read_excel_head(fp, sheet, nrows)
+    data = data.convert_dtypes()
+    return get_frame_columns(data), data
+
+
+def read_arrow(fp, nrows=None):
+    """Return Arrow table read from a Parquet, Feather or Arrow IPC file.
+
+    The file is memory-mapped, so uncompressed Feather / Arrow IPC column
+    buffers are not copied until they are accessed. Only the first `nrows`
+    rows are read if provided.
+    """
+    if get_file_format(fp) == "parquet":
+        if nrows is None:
+            return pyarrow.parquet.read_table(fp, memory_map=True)
+
+        parquet_file = pyarrow.parquet.ParquetFile(fp, memory_map=True)
+        return _read_head(
+            parquet_file.iter_batches(batch_size=nrows),
+            parquet_file.schema_arrow,
+            nrows,
+        )
+
+    try:
+        table = pyarrow.feather.read_table(fp, memory_map=True)
+    except pa.ArrowInvalid:
+        # not a Feather / IPC file format, try IPC streaming format
+        table = pyarrow.ipc.open_stream(pa.memory_map(fp, "r")).read_all()
+    return table if nrows is None else table.slice(0, nrows)
+
+
+def sniff_delimiter(fp):
+    """Return field delimiter of a delimited text file."""
+    with open(fp, newline="", encoding="utf-8") as f:
+        sample = f.read(64 * 1024)
+
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return "\t" if fp.lower().endswith(".tsv") else ","
+
+
+def infer_csv_schema(fp, delimiter, sample_rows=CSV_SAMPLE_ROWS):
+    """Return Arrow schema of a delimited text file inferred from the first
+    `sample_rows` rows."""
+    sample = pd.read_csv(fp, sep=delimiter, nrows=sample_rows, dtype=object)
+
+    fields = []
+    for col in sample:
+        values = pa.array(sample[col], pa.string(), from_pandas=True)
+
+        dtype = pa.string()
+        if values.null_count < len(values):
+            for candidate in _CSV_TYPES:
+                try:
+                    pc.cast(values, candidate)
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                    continue
+                dtype = candidate
+                break
+
+        fields.append(pa.field(col, dtype))
+    return pa.schema(fields)
+
+
+def _widen_csv_schema(schema, error):
+    # only the column named by the error message is widened, other errors
+    # e.g. rows of a wrong number of columns are raised
+    match = re.search(r"CSV column #(\d+)", str(error))
+    if not match:
+        raise error
+    i = int(match.group(1))
+    field = schema.field(i)
+    if field.type == pa.string():
+        raise error
+    dtype = pa.float64() if field.type == pa.int64() else pa.string()
+    return schema.set(i, field.with_type(dtype))
+
+
+def _csv_options(delimiter, schema):
+    return dict(
+        parse_options=pyarrow.csv.ParseOptions(delimiter=delimiter),
+        convert_options=pyarrow.csv.ConvertOptions(
+            column_types=schema, strings_can_be_null=True
+        ),
+    )
+
+
+def read_csv(fp, sample_rows=CSV_SAMPLE_ROWS, nrows=None):
+    """Return Arrow table read from a delimited text file.
+
+    Column data types are inferred from a sample of rows and the whole file
+    is parsed in parallel using these types. A column holding a value
+    outside of the sample that doesn't match its type is widened, integers
+    to floats and anything else to text, and the file is read again. Only
+    the first `nrows` rows are read if provided.
+    """
+    delimiter = sniff_delimiter(fp)
+    schema = infer_csv_schema(fp, delimiter, sample_rows)
+
+    while True:
+        try:
+            options = _csv_options(delimiter, schema)
+            if nrows is None:
+                return pyarrow.csv.read_csv(fp, **options)
+
+            reader = pyarrow.csv.open_csv(fp, **options)
+            return _read_head(reader, reader.schema, nrows)
+        except pa.ArrowInvalid as e:
+            schema = _widen_csv_schema(schema, e)
+
+
+def iter_csv(fp, sample_rows=CSV_SAMPLE_ROWS):
+    """Return an iterator of Arrow record batches read from a delimited text
+    file.
+
+    The file is parsed block by block, only the current batch is held in
+    memory. Column data types are inferred from a sample of rows. A column
+    holding a value that doesn't match its type is widened as by
+    `read_csv`, reading resumes after the rows already returned, so later
+    batches can have wider column types than earlier ones.
+    """
+    delimiter = sniff_delimiter(fp)
+    schema = infer_csv_schema(fp, delimiter, sample_rows)
+
+    rows = 0
+    while True:
+        skip = rows
+        try:
+            reader = pyarrow.csv.open_csv(
+                fp, **_csv_options(delimiter, schema)
+            )
+            for batch in reader:
+                if skip >= batch.num_rows:
+                    skip -= batch.num_rows
+                    continue
+                batch, skip = batch.slice(skip), 0
+                rows += batch.num_rows
+                yield batch
+            return
+        except pa.ArrowInvalid as e:
+            schema = _widen_csv_schema(schema, e)
+
+
+def read_sheet_names(fp):
+    """Return sheet names of a file.
+
+    Files other than Excel workbooks contain a single sheet named after the
+    file.
+    """
+    if get_file_format(fp) == "excel":
+        return read_excel_sheet_names(fp)
+    return [os.path.splitext(os.path.basename(fp))[0]]
+
+
+def read_sheet(
+    fp,
+    sheet,
+    nrows=None,
+    sample_rows=CSV_SAMPLE_ROWS,
+    cache=None,
+    memory=None,
+):
+    """Return a pair of column data types and data of a single file sheet.
+
+    Excel workbook sheets are read into DataFrames, other formats are read
+    into Arrow tables. Data types of delimited text files are inferred from
+    the first `sample_rows` rows. Only the first `nrows` rows are read if
+    provided, e.g. for a preview.
+
+    Complete sheets are compacted right after they are read, see
+    `compact_data`. If a `memory` dict is provided, bytes taken by the sheet
+    before and after are stored in it as "before" and "after".
+
+    Complete Excel workbook sheets are stored in a `cache` if provided,
+    cached sheets are returned as Arrow tables and can also serve as a
+    preview.
+    """
+    file_format = get_file_format(fp)
+    cached = None
+    if file_format == "excel":
+        if cache is not None:
+            cached = cache.get(fp, sheet)
+        if cached is not None:
+            columns, data = cached
+        else:
+            columns, data = read_excel(fp, sheet, nrows)
+    elif file_format == "csv":
+        data = read_csv(fp, sample_rows, nrows)
+        columns = get_arrow_columns(data)
+    else:
+        data = read_arrow(fp, nrows)
+        columns = get_arrow_columns(data)
+
+    if nrows is None or cached is not None:
+        before = get_memory_usage(data)
+        data = compact_data(data)
+        if memory is not None:
+            memory["before"] = before
+            memory["after"] = get_memory_usage(data)
+        # stored compacted, so cached sheets are mapped in smaller types
+        if cached is None and file_format == "excel" and cache is not None:
+            cache.put(fp, sheet, columns, data)
+    return columns, data
+
+
+def select_columns(data, columns):
+    """Return data containing only the `columns` mapping keys renamed to the
+    mapping values."""
+    if isinstance(data, pa.Table):
+        return data.select(list(columns)).rename_columns(
+            list(columns.values())
+        )
+    return data[list(columns)].rename(columns=columns)
+
+
+def get_memory_usage(data):
+    """Return number of bytes taken by a DataFrame or an Arrow table."""
+    if isinstance(data, pa.Table):
+        return data.nbytes
+    return int(data.memory_usage(index=False, deep=True).sum())
+
+
+def _compact_text(values, category_ratio):
+    count = values.count()
+    if count and values.nunique() <= count * category_ratio:
+        return values.astype("category")
+    try:
+        return values.astype(pd.StringDtype("pyarrow"))
+    except (TypeError, ValueError, ImportError):
+        # Arrow backed strings require pandas 1.3
+        return values
+
+
+def _compact_float(values):
+    smaller = values.astype(
+        "Float32"
+        if pd.api.types.is_extension_array_dtype(values)
+        else "float32"
+    )
+    # only values that survive the round trip exactly are downcast
+    same = smaller.astype(values.dtype).eq(values) | values.isna()
+    return smaller if bool(same.all()) else values
+
+
+def compact_frame(data, category_ratio=0.5):
+    """Return a DataFrame of the same values using smaller column types.
+
+    Text columns with at most `category_ratio` distinct values per value
+    become categorical, other text columns Arrow backed strings. Integers
+    are downcast to the smallest type holding all values and floats to
+    single precision if no value changes.
+    """
+    columns = []
+    for _, values in data.items():
+        if pd.api.types.is_bool_dtype(values):
+            pass
+        elif pd.api.types.is_integer_dtype(values):
+            values = pd.to_numeric(values, downcast="integer")
+        elif pd.api.types.is_float_dtype(values):
+            values = _compact_float(values)
+        elif pd.api.types.infer_dtype(values, skipna=True) == "string":
+            values = _compact_text(values, category_ratio)
+        columns.append(values)
+
+    if not columns:
+        return data
+    return pd.concat(columns, axis=1)
+
+
+def _compact_arrow_int(values):
+    minimum, maximum = pc.min_max(values).values()
+    if minimum.as_py() is None:
+        return values
+    for dtype in (pa.int8(), pa.int16(), pa.int32()):
+        if dtype.bit_width >= values.type.bit_width:
+            break
+        info = np.iinfo(dtype.to_pandas_dtype())
+        if info.min <= minimum.as_py() and maximum.as_py() <= info.max:
+            return values.cast(dtype)
+    return values
+
+
+def _compact_arrow_float(values):
+    smaller = values.cast(pa.float32())
+    # only values that survive the round trip exactly are downcast
+    same = pc.all(pc.equal(smaller.cast(values.type), values)).as_py()
+    return smaller if same is not False else values
+
+
+def compact_table(table, category_ratio=0.5):
+    """Return an Arrow table of the same values using smaller column types.
+
+    Columns are compacted as by `compact_frame`, low cardinality text
+    columns are dictionary encoded. Unchanged columns keep their buffers,
+    e.g. of a memory-mapped file.
+    """
+    columns = []
+    for values in table.columns:
+        dtype = values.type
+        if pa.types.is_integer(dtype) and pa.types.is_signed_integer(dtype):
+            values = _compact_arrow_int(values)
+        elif pa.types.is_float64(dtype):
+            values = _compact_arrow_float(values)
+        elif pa.types.is_string(dtype) or pa.types.is_large_string(dtype):
+            count = len(values) - values.null_count
+            if (
+                count
+                and pc.count_distinct(values).as_py() <= count * category_ratio
+            ):
+                values = values.dictionary_encode()
+        columns.append(values)
+    return pa.Table.from_arrays(columns, names=table.column_names)
+
+
+def compact_data(data):
+    """Return a DataFrame or an Arrow table of the same values using smaller
+    column types, see `compact_frame` and `compact_table`."""
+    if isinstance(data, pa.Table):
+        return compact_table(data)
+    return compact_frame(data)
@@ -0,0 +1,225 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+from collections import OrderedDict, defaultdict
+
+
+def get_default_log_path():
+    """Return path of the import run log of the current user."""
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "dbimport", "runs.jsonl")
+
+
+def make_record(dsn, table, stats=None, error=None, started=None, **details):
+    """Return a run log record of a single import.
+
+    `stats` are the statistics of `Importer.stats`, `details` are added to
+    the record as is, e.g. file name or durations of phases run outside of
+    the importer.
+    """
+    stats = stats or {}
+    started = started or datetime.datetime.now(datetime.timezone.utc)
+
+    durations = OrderedDict(details.pop("durations", {}))
+    durations.update(stats.get("durations", {}))
+
+    record = OrderedDict(
+        [
+            ("started", started.isoformat()),
+            ("dsn", dsn),
+            ("table", table),
+            ("status", "ok" if error is None else "error"),
+            ("error", None if error is None else str(error)),
+            ("rows_staged", stats.get("rows_staged", 0)),
+            ("rows_updated", stats.get("rows_updated", -1)),
+            ("rows_inserted", stats.get("rows_inserted", -1)),
+            ("rows_unmatched", stats.get("rows_unmatched", -1)),
+            ("chunks", stats.get("chunks", 0)),
+            ("bytes_sent", stats.get("bytes_sent", 0)),
+            ("chunk_size", stats.get("chunk_size")),
+            ("durations", durations),
+            ("duration", sum(durations.values())),
+        ]
+    )
+    record.update(details)
+    return record
+
+
+class RunLog:
+    """Log of import runs stored as JSON lines, one record per run."""
+
+    def __init__(self, path=None):
+        self._path = path or get_default_log_path()
+
+    @property
+    def path(self):
+        return self._path
+
+    def write(self, record):
+        """Append a record to the log."""
+        os.makedirs(
+            os.path.dirname(os.path.abspath(self._path)), exist_ok=True
+        )
+        with open(self._path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+    def read(self):
+        """Return all records of the log, malformed lines are skipped."""
+        records = []
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return records
+
+
+def _escape(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+
+
+def _labels(**labels):
+    return ",".join(
+        '%s="%s"' % (name, _escape(value)) for name, value in labels.items()
+    )
+
+
+def format_metrics(records):
+    """Return metrics aggregated over run log records in the Prometheus text
+    exposition format."""
+    runs = defaultdict(int)
+    rows = defaultdict(int)
+    totals = defaultdict(lambda: defaultdict(float))
+    seconds = defaultdict(float)
+    last = {}
+
+    for record in records:
+        target = (record.get("dsn") or "", record.get("table") or "")
+        runs[target + (record.get("status", "ok"),)] += 1
+
+        for action in ("staged", "updated", "inserted", "unmatched"):
+            count = record.get("rows_" + action, -1)
+            if count is not None and count > 0:
+                rows[target + (action,)] += count
+
+        totals["chunks"][target] += record.get("chunks", 0)
+        totals["bytes_sent"][target] += record.get("bytes_sent", 0)
+        for phase, duration in record.get("durations", {}).items():
+            seconds[target + (phase,)] += duration
+
+        started = record.get("started")
+        if started:
+            timestamp = datetime.datetime.fromisoformat(started).timestamp()
+            last[target] = max(last.get(target, timestamp), timestamp)
+
+    lines = []
+
+    def add(name, kind, description, samples):
+        lines.append("# HELP %s %s" % (name, description))
+        lines.append("# TYPE %s %s" % (name, kind))
+        for labels, value in sorted(samples):
+            lines.append("%s{%s} %s" % (name, labels, repr(float(value))))
+
+    add(
+        "dbimport_runs_total",
+        "counter",
+        "Number of import runs.",
+        [
+            (_labels(dsn=dsn, table=table, status=status), count)
+            for (dsn, table, status), count in runs.items()
+        ],
+    )
+    add(
+        "dbimport_rows_total",
+        "counter",
+        "Number of rows staged, updated, inserted and unmatched.",
+        [
+            (_labels(dsn=dsn, table=table, action=action), count)
+            for (dsn, table, action), count in rows.items()
+        ],
+    )
+    add(
+        "dbimport_chunks_total",
+        "counter",
+        "Number of chunks sent to the database.",
+        [
+            (_labels(dsn=dsn, table=table), count)
+            for (dsn, table), count in totals["chunks"].items()
+        ],
+    )
+    add(
+        "dbimport_sent_bytes_total",
+        "counter",
+        "Approximate size of data sent to the database.",
+        [
+            (_labels(dsn=dsn, table=table), count)
+            for (dsn, table), count in totals["bytes_sent"].items()
+        ],
+    )
+    add(
+        "dbimport_phase_seconds_total",
+        "counter",
+        "Time spent in each import phase.",
+        [
+            (_labels(dsn=dsn, table=table, phase=phase), duration)
+            for (dsn, table, phase), duration in seconds.items()
+        ],
+    )
+    add(
+        "dbimport_last_run_timestamp_seconds",
+        "gauge",
+        "Start time of the last import run.",
+        [
+            (_labels(dsn=dsn, table=table), timestamp)
+            for (dsn, table), timestamp in last.items()
+        ],
+    )
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path, records):
+    """Write metrics of run log records to a file, e.g. for the node
+    exporter textfile collector. The file is replaced atomically."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(format_metrics(records))
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m dbimport.runlog",
+        description="Export import run log metrics in the Prometheus text "
+        "format.",
+    )
+    parser.add_argument("--log", help="run log path")
+    parser.add_argument(
+        "--output", help="metrics file path, standard output if omitted"
+    )
+    args = parser.parse_args(argv)
+
+    records = RunLog(args.log).read()
+    if args.output:
+        write_metrics(args.output, records)
+    else:
+        sys.stdout.write(format_metrics(records))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
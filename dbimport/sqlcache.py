@@ -0,0 +1,86 @@
+import threading
+import time
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+class SqlCache:
+    """Thread-safe cache of table metadata and statements generated for
+    imports into a single database.
+
+    Entries expire `ttl` seconds after they are added, so changes of table
+    definitions are picked up eventually; call `invalidate` to pick them up
+    right away. Keys are tuples of the entry kind, dialect, schema and table
+    followed by anything else the entry depends on.
+    """
+
+    def __init__(self, ttl: float = 300.0, clock=time.monotonic):
+        self._ttl = ttl
+        self._clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def ttl(self):
+        return self._ttl
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    def get(self, key: tuple, factory):
+        """Return the entry of a key, `factory` is called to create the
+        entry if it is missing or expired."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._hits += 1
+                return entry[1]
+
+        # the lock is not held while the factory queries the database, so
+        # concurrent misses of the same key may both create the entry
+        value = factory()
+        with self._lock:
+            self._misses += 1
+            self._entries = {
+                k: entry
+                for k, entry in self._entries.items()
+                if entry[0] > now
+            }
+            self._entries[key] = (now + self._ttl, value)
+        return value
+
+    def invalidate(self, schema=None, table=None):
+        """Remove entries of a table, all tables of a schema or all entries
+        if neither is given."""
+        with self._lock:
+            self._entries = {
+                key: entry
+                for key, entry in self._entries.items()
+                if (schema is not None and key[2] != schema)
+                or (table is not None and key[3] != table)
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+
+
+def get_cache(database: str, ttl: float = 300.0) -> SqlCache:
+    """Return the process-wide cache of a database, e.g. of a data source
+    name, creating it with `ttl` on first use."""
+    with _CACHES_LOCK:
+        if database not in _CACHES:
+            _CACHES[database] = SqlCache(ttl)
+        return _CACHES[database]
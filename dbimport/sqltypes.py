@@ -0,0 +1,224 @@
+import datetime
+import decimal
+import functools
+import re
+
+import numpy as np
+import pandas as pd
+
+# ODBC SQL data type codes
+SQL_CHAR = 1
+SQL_NUMERIC = 2
+SQL_DECIMAL = 3
+SQL_INTEGER = 4
+SQL_SMALLINT = 5
+SQL_REAL = 7
+SQL_DOUBLE = 8
+SQL_VARCHAR = 12
+SQL_TYPE_DATE = 91
+SQL_TYPE_TIMESTAMP = 93
+SQL_BIGINT = -5
+SQL_TINYINT = -6
+SQL_BIT = -7
+SQL_WCHAR = -8
+SQL_WVARCHAR = -9
+SQL_SS_TIME2 = -154
+
+_TYPE_PATTERN = re.compile(r"^(\w+)(?:\((-?\d+)(?:,\s*(\d+))?\))?$")
+
+_TEXT_TYPES = {
+    "char": SQL_CHAR,
+    "varchar": SQL_VARCHAR,
+    "nchar": SQL_WCHAR,
+    "nvarchar": SQL_WVARCHAR,
+}
+
+_INT_TYPES = {
+    "tinyint": SQL_TINYINT,
+    "smallint": SQL_SMALLINT,
+    "int": SQL_INTEGER,
+    "bigint": SQL_BIGINT,
+}
+
+_FLOAT_TYPES = {"real": SQL_REAL, "float": SQL_DOUBLE}
+
+_DECIMAL_TYPES = {
+    "decimal": SQL_DECIMAL,
+    "numeric": SQL_NUMERIC,
+}
+
+_MONEY_TYPES = {"smallmoney": (10, 4), "money": (19, 4)}
+
+_DATETIME_TYPES = {"datetime", "datetime2", "smalldatetime"}
+
+# pandas >= 2.0 infers a single datetime format from the first value
+if int(pd.__version__.split(".")[0]) >= 2:
+    TO_DATETIME_KWARGS = {"format": "mixed"}
+else:
+    TO_DATETIME_KWARGS = {}
+
+
+def parse_type(type_name):
+    """Return a tuple of base type name, size and scale of a column type
+    name formatted by `util.get_column_metadata`."""
+    m = _TYPE_PATTERN.match(type_name.strip().lower())
+    if not m:
+        return type_name.lower(), None, None
+
+    base, size, scale = m.groups()
+    return (
+        base,
+        int(size) if size is not None else None,
+        int(scale) if scale is not None else None,
+    )
+
+
+def get_input_size(type_name, size=None, scale=None):
+    """Return a tuple of ODBC SQL type, column size and decimal digits used
+    to bind parameters of a SQL Server column type.
+
+    `size` and `scale` are the values of character maximum length / numeric
+    or datetime precision and numeric scale from the information schema.
+    Return None if the type isn't supported.
+    """
+    base = type_name.lower()
+    if base in _TEXT_TYPES:
+        # zero size binds (max) columns
+        return _TEXT_TYPES[base], max(size or 0, 0), 0
+    elif base in _INT_TYPES:
+        return _INT_TYPES[base], 0, 0
+    elif base == "bit":
+        return SQL_BIT, 0, 0
+    elif base in _FLOAT_TYPES:
+        return _FLOAT_TYPES[base], 0, 0
+    elif base in _DECIMAL_TYPES:
+        return _DECIMAL_TYPES[base], size or 18, scale or 0
+    elif base in _MONEY_TYPES:
+        return (SQL_DECIMAL,) + _MONEY_TYPES[base]
+    elif base == "date":
+        return SQL_TYPE_DATE, 10, 0
+    elif base == "time":
+        digits = 7 if size is None else size
+        return SQL_SS_TIME2, 8 + (digits + 1 if digits else 0), digits
+    elif base == "smalldatetime":
+        return SQL_TYPE_TIMESTAMP, 16, 0
+    elif base in _DATETIME_TYPES:
+        # legacy datetime has fixed fractional seconds precision
+        digits = 3 if base == "datetime" else 7 if size is None else size
+        return SQL_TYPE_TIMESTAMP, 19 + (digits + 1 if digits else 0), digits
+    return None
+
+
+def _objects(values, converted):
+    objects = np.array(converted, dtype=object)
+    objects[values.isna().to_numpy(dtype=bool)] = None
+    return objects.tolist()
+
+
+def _cast_int(values):
+    return (
+        pd.to_numeric(values)
+        .astype("Int64")
+        .to_numpy(dtype=object, na_value=None)
+        .tolist()
+    )
+
+
+def _cast_bool(values):
+    return (
+        pd.to_numeric(values)
+        .astype("boolean")
+        .to_numpy(dtype=object, na_value=None)
+        .tolist()
+    )
+
+
+def _cast_float(values):
+    return (
+        pd.to_numeric(values)
+        .astype("Float64")
+        .to_numpy(dtype=object, na_value=None)
+        .tolist()
+    )
+
+
+def _cast_decimal(values, scale):
+    quantum = decimal.Decimal(1).scaleb(-(scale or 0))
+
+    def to_decimal(value):
+        if not isinstance(value, (str, int, decimal.Decimal)):
+            value = repr(float(value))
+        return decimal.Decimal(value).quantize(
+            quantum, rounding=decimal.ROUND_HALF_UP
+        )
+
+    objects = np.array(values, dtype=object)
+    present = values.notna().to_numpy(dtype=bool)
+    objects[present] = [to_decimal(value) for value in objects[present]]
+    objects[~present] = None
+    return objects.tolist()
+
+
+def _cast_str(values):
+    return (
+        values.astype("string").to_numpy(dtype=object, na_value=None).tolist()
+    )
+
+
+def _is_native_datetime(value):
+    return isinstance(
+        value, (datetime.date, datetime.time)
+    ) and not isinstance(value, pd.Timestamp)
+
+
+def _cast_datetimes(values, convert):
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return _objects(values, convert(values.dt))
+
+    # time and date objects, e.g. of time or date formatted Excel cells,
+    # are passed as is, the rest is parsed
+    values = values.astype(object)
+    native = values.map(_is_native_datetime).to_numpy(dtype=bool)
+    parsed = pd.to_datetime(values.where(~native), **TO_DATETIME_KWARGS)
+    objects = np.array(_objects(values, convert(parsed.dt)), dtype=object)
+    objects[native] = values.to_numpy(dtype=object)[native]
+    return objects.tolist()
+
+
+def _cast_datetime(values):
+    return _cast_datetimes(values, lambda dt: dt.to_pydatetime())
+
+
+def _cast_date(values):
+    return _cast_datetimes(values, lambda dt: dt.date)
+
+
+def _cast_time(values):
+    return _cast_datetimes(values, lambda dt: dt.time)
+
+
+def get_cast(type_name, scale=None):
+    """Return a function converting a Series into a list of Python objects
+    matching a SQL Server column type, nulls are converted to None.
+
+    Decimal values are rounded to the column `scale`. Return None if the
+    type isn't supported.
+    """
+    base = type_name.lower()
+    if base in _TEXT_TYPES:
+        return _cast_str
+    elif base in _INT_TYPES:
+        return _cast_int
+    elif base == "bit":
+        return _cast_bool
+    elif base in _FLOAT_TYPES:
+        return _cast_float
+    elif base in _DECIMAL_TYPES or base in _MONEY_TYPES:
+        return functools.partial(_cast_decimal, scale=scale)
+    elif base == "date":
+        return _cast_date
+    elif base == "time":
+        return _cast_time
+    elif base in _DATETIME_TYPES:
+        return _cast_datetime
+    return None
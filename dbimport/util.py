@@ -76,6 +76,29 @@ def get_column_metadata(cursor):
     return columns
 
 
+def get_primary_keys(cursor):
+    """Return primary key columns of each table that can be accessed in the
+    current database."""
+    pk_query = """SELECT KCU.TABLE_SCHEMA
+        , KCU.TABLE_NAME
+        , KCU.COLUMN_NAME
+    FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS AS TC
+    INNER JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE AS KCU
+        ON KCU.CONSTRAINT_SCHEMA = TC.CONSTRAINT_SCHEMA
+        AND KCU.CONSTRAINT_NAME = TC.CONSTRAINT_NAME
+    WHERE TC.CONSTRAINT_TYPE = 'PRIMARY KEY'
+    ORDER BY KCU.TABLE_SCHEMA
+        , KCU.TABLE_NAME
+        , KCU.ORDINAL_POSITION
+    """
+
+    primary_keys = defaultdict(list)
+    for table_schema, table_name, column_name in cursor.execute(pk_query):
+        primary_keys[(table_schema, table_name)].append(column_name)
+
+    return primary_keys
+
+
 def qualify_name(schema, table):
     """Return qualified table name from a pair of schema, table values."""
     if schema:
@@ -85,9 +108,15 @@ def qualify_name(schema, table):
 
 
 def translate_dtype(name):
-    """Return common data type name instead of pandas' / numpy's type name."""
+    """Return common data type name instead of pandas' / numpy's / Arrow's
+    type name."""
     name_l = name.lower()
-    if name_l == "object" or name_l.startswith("str"):
+    if (
+        name_l == "object"
+        or name_l.startswith("str")
+        or name_l.startswith("large_str")
+        or name_l.startswith("utf8")
+    ):
         return "text"
     elif (
         name_l.startswith("int")
@@ -96,9 +125,14 @@ def translate_dtype(name):
         or name_l.startswith("ulonglong")
     ):
         return "number"
-    elif name_l.startswith("float"):
+    elif (
+        name_l.startswith("float")
+        or name_l.startswith("double")
+        or name_l.startswith("halffloat")
+        or name_l.startswith("decimal")
+    ):
         return "decimal"
-    elif name_l.startswith("datetime"):
+    elif name_l.startswith("date") or name_l.startswith("timestamp"):
         return "datetime"
     else:
         return name
@@ -0,0 +1,289 @@
+import datetime
+import decimal
+import numbers
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .importer import ImporterError
+from .sqltypes import TO_DATETIME_KWARGS, parse_type
+
+_INT_RANGES = {
+    "bit": (0, 1),
+    "tinyint": (0, 2**8 - 1),
+    "smallint": (-(2**15), 2**15 - 1),
+    "int": (-(2**31), 2**31 - 1),
+    "bigint": (-(2**63), 2**63 - 1),
+}
+
+# floats hold integers exactly only up to this magnitude
+_MAX_EXACT_FLOAT_INT = 2**53
+
+_FLOAT_RANGES = {
+    "real": (-3.40e38, 3.40e38),
+    "float": (-1.79e308, 1.79e308),
+    "smallmoney": (-214748.3648, 214748.3647),
+    "money": (-922337203685477.5808, 922337203685477.5807),
+}
+
+_DATETIME_RANGES = {
+    "date": (None, None),
+    "time": (None, None),
+    "datetime": ("1753-01-01", "9999-12-31 23:59:59.997"),
+    "datetime2": (None, None),
+    "datetimeoffset": (None, None),
+    "smalldatetime": ("1900-01-01", "2079-06-06 23:59"),
+}
+
+_TEXT_TYPES = {"char", "varchar", "nchar", "nvarchar"}
+
+_UUID_PATTERN = (
+    r"\{?[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-"
+    r"[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\}?"
+)
+
+
+class ValidationError(ImporterError):
+    def __init__(self, failures: pd.DataFrame, limit=10):
+        self.failures = failures
+
+        lines = [
+            "'%s', row %d: %r %s" % (column, row + 1, value, error)
+            for column, row, value, error in failures.head(limit).itertuples(
+                index=False
+            )
+        ]
+        if len(failures) > limit:
+            lines.append("and %d more" % (len(failures) - limit))
+
+        super().__init__(
+            "data contains %d value%s that cannot be converted to the "
+            "column type%s:\n%s"
+            % (
+                len(failures),
+                "s" if len(failures) > 1 else "",
+                "s" if failures["column"].nunique() > 1 else "",
+                "\n".join(lines),
+            )
+        )
+
+
+def _check_large_integer(value, base):
+    low, high = _INT_RANGES[base]
+    if isinstance(value, numbers.Integral):
+        value = int(value)
+    elif isinstance(value, numbers.Real):
+        value = float(value)
+    elif isinstance(value, str):
+        value = value.strip()
+    try:
+        number = decimal.Decimal(value)
+    except (decimal.InvalidOperation, TypeError, ValueError):
+        return "is not a number"
+
+    if number != number.to_integral_value():
+        return "is not an integer"
+    if not low <= number <= high:
+        return "is out of %s range" % base
+    return None
+
+
+def _check_numbers(values, present, base, size, scale):
+    numbers = pd.to_numeric(values, errors="coerce")
+    numbers = pd.Series(numbers).to_numpy(dtype="float64", na_value=np.nan)
+
+    errors = np.full(len(values), None, dtype=object)
+    errors[present & np.isnan(numbers)] = "is not a number"
+
+    valid = present & ~np.isnan(numbers)
+    if base in _INT_RANGES:
+        low, high = _INT_RANGES[base]
+        errors[valid & (numbers != np.floor(numbers))] = "is not an integer"
+        # high + 1 is a power of two, so both bounds are exact as floats
+        errors[valid & ((numbers < low) | (numbers >= high + 1))] = (
+            "is out of %s range" % base
+        )
+        # values too large to be exact as floats are checked one by one
+        for i in np.flatnonzero(
+            valid & (np.abs(numbers) >= _MAX_EXACT_FLOAT_INT)
+        ):
+            errors[i] = _check_large_integer(values.iat[i], base)
+    elif base in _FLOAT_RANGES:
+        low, high = _FLOAT_RANGES[base]
+        errors[valid & ((numbers < low) | (numbers > high))] = (
+            "is out of %s range" % base
+        )
+    elif size is not None:  # decimal, numeric
+        scale = scale or 0
+        limit = 10.0 ** (size - scale)
+        errors[valid & (np.round(np.abs(numbers), scale) >= limit)] = (
+            "is out of %s(%d, %d) range" % (base, size, scale)
+        )
+    return errors
+
+
+def _check_native_datetime(value, base):
+    low, high = _DATETIME_RANGES[base]
+    if low is None or isinstance(value, datetime.time):
+        return None
+
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    value = value.replace(tzinfo=None)
+    if not (
+        pd.Timestamp(low).to_pydatetime()
+        <= value
+        <= pd.Timestamp(high).to_pydatetime()
+    ):
+        return "is out of %s range" % base
+    return None
+
+
+def _check_datetimes(values, present, base):
+    native = np.zeros(len(values), dtype=bool)
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        datetimes = values
+    else:
+        values = values.astype(object)
+        # time and date objects, e.g. of time or date formatted Excel cells,
+        # are sent as is, parsing would fail for times or dates outside of
+        # the range of Timestamp
+        native = values.map(
+            lambda value: isinstance(value, (datetime.date, datetime.time))
+            and not isinstance(value, pd.Timestamp)
+        ).to_numpy(dtype=bool)
+        datetimes = pd.to_datetime(
+            values.where(~native), errors="coerce", **TO_DATETIME_KWARGS
+        )
+    datetimes = pd.Series(datetimes)
+    parsed = present & ~native
+
+    errors = np.full(len(values), None, dtype=object)
+    errors[parsed & datetimes.isna().to_numpy()] = "is not a date / time"
+
+    low, high = _DATETIME_RANGES[base]
+    if low is not None:
+        outside = (datetimes < pd.Timestamp(low)) | (
+            datetimes > pd.Timestamp(high)
+        )
+        errors[parsed & outside.fillna(False).to_numpy(dtype=bool)] = (
+            "is out of %s range" % base
+        )
+    for i in np.flatnonzero(native):
+        errors[i] = _check_native_datetime(values.iat[i], base)
+    return errors
+
+
+def _check_text(values, present, size):
+    errors = np.full(len(values), None, dtype=object)
+    if size is None or size < 0:  # max
+        return errors
+
+    lengths = values.astype("string").str.len().fillna(0).to_numpy()
+    errors[present & (lengths > size)] = "is longer than %d character%s" % (
+        size,
+        "s" if size > 1 else "",
+    )
+    return errors
+
+
+def _check_uuids(values, present):
+    matches = values.astype("string").str.fullmatch(_UUID_PATTERN)
+    errors = np.full(len(values), None, dtype=object)
+    errors[present & ~matches.fillna(False).to_numpy(dtype=bool)] = (
+        "is not a uniqueidentifier"
+    )
+    return errors
+
+
+def check_column(values: pd.Series, type_name: str) -> np.ndarray:
+    """Return an array of error messages of values that cannot be converted
+    to the column type, None for values that can.
+
+    Null values are always valid. Types unknown to the validator are not
+    checked.
+    """
+    values = values.reset_index(drop=True)
+    present = values.notna().to_numpy(dtype=bool)
+    base, size, scale = parse_type(type_name)
+
+    if (
+        base in _INT_RANGES
+        or base in _FLOAT_RANGES
+        or base in ("decimal", "numeric")
+    ):
+        return _check_numbers(values, present, base, size, scale)
+    elif base in _DATETIME_RANGES:
+        return _check_datetimes(values, present, base)
+    elif base in _TEXT_TYPES:
+        return _check_text(values, present, size)
+    elif base == "uniqueidentifier":
+        return _check_uuids(values, present)
+    return np.full(len(values), None, dtype=object)
+
+
+def find_invalid_values(data, column_types: Dict[str, str]) -> pd.DataFrame:
+    """Return column, row position, value and error message of each data
+    value that cannot be converted to the type of its column.
+
+    `column_types` is a mapping of data column to the column type name
+    formatted by `util.get_column_metadata`, columns without a type are not
+    checked.
+    """
+    failures = []
+    for column, type_name in column_types.items():
+        if isinstance(data, pa.Table):
+            if column not in data.column_names:
+                continue
+            values = data[column].to_pandas()
+        else:
+            if column not in data.columns:
+                continue
+            values = data[column]
+
+        errors = check_column(values, type_name)
+        rows = np.flatnonzero(pd.notna(errors))
+        if len(rows):
+            failures.append(
+                pd.DataFrame(
+                    {
+                        "column": column,
+                        "row": rows,
+                        "value": values.iloc[rows].to_numpy(dtype=object),
+                        "error": errors[rows],
+                    }
+                )
+            )
+
+    if not failures:
+        return pd.DataFrame(columns=["column", "row", "value", "error"])
+    return pd.concat(failures, ignore_index=True).sort_values(
+        ["row", "column"], kind="mergesort", ignore_index=True
+    )
+
+
+def validate(data, column_types: Dict[str, str]) -> None:
+    """Raise ValidationError if any data value cannot be converted to the
+    type of its column, see `find_invalid_values`."""
+    failures = find_invalid_values(data, column_types)
+    if not failures.empty:
+        raise ValidationError(failures)
+
+
+def validate_chunks(chunks, column_types: Dict[str, str]):
+    """Return an iterator of data chunks, each validated as it is read, see
+    `validate`.
+
+    Rows are numbered across chunks, ValidationError is raised by the first
+    chunk containing invalid values.
+    """
+    offset = 0
+    for chunk in chunks:
+        failures = find_invalid_values(chunk, column_types)
+        if not failures.empty:
+            failures["row"] += offset
+            raise ValidationError(failures)
+        offset += len(chunk)
+        yield chunk
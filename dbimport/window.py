@@ -1,7 +1,11 @@
+import datetime
 import os.path
+import time
 from collections import OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from contextlib import nullcontext
 
-import pandas as pd
+import pyarrow as pa
 import pyodbc
 from PySide2 import QtCore, QtGui, QtWidgets
 from PySide2.QtCore import Qt
@@ -16,20 +20,44 @@ from PySide2.QtWidgets import (
     QLabel,
     QLineEdit,
     QPushButton,
-    QTableWidget,
-    QTableWidgetItem,
+    QSplitter,
+    QTableView,
+    QTabWidget,
     QVBoxLayout,
     QWidget,
 )
 
+from .cache import FileCache
+from .delta import DeltaStore
 from .importer import Importer
+from .matcher import ColumnMatcher, suggest_join_on
+from .models import (
+    ColumnMappingModel,
+    ColumnStatsModel,
+    DataPreviewModel,
+    FileColumnDelegate,
+)
+from .preview import DataPreview
+from .profiler import Profiler
+from .reader import (
+    FILE_FORMATS,
+    PREVIEW_ROWS,
+    get_file_format,
+    get_memory_usage,
+    iter_csv,
+    read_sheet,
+    read_sheet_names,
+    select_columns,
+)
+from .runlog import RunLog, make_record
+from .sqlcache import get_cache
 from .util import (
     get_column_metadata,
-    is_cast_explicit,
+    get_primary_keys,
     message_box,
     qualify_name,
-    translate_dtype,
 )
+from .validator import validate, validate_chunks
 
 
 class QLineEditClick(QLineEdit):
@@ -44,17 +72,34 @@ class QLineEditClick(QLineEdit):
 
 
 class Window(QWidget):
-    def __init__(self):
+    TAB_COLUMNS = 0
+    TAB_PREVIEW = 1
+
+    def __init__(self, profile_dir=None):
         # noinspection PyArgumentList
         super().__init__()
 
+        self._profile_dir = profile_dir
+
         self._dsns = OrderedDict()
+        self._dsns_primary_keys = OrderedDict()
         self._dsns_schema_table_map = OrderedDict()
 
         self._file = OrderedDict()
+        self._file_path = None
+        self._file_cache = FileCache()
+        # complete sheets parsed into the cache in the background, by sheet
+        self._parse_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="dbimport-parse"
+        )
+        self._parse_jobs = {}
+        # bytes taken by complete sheets once read and compacted, by sheet
+        self._sheet_memory = {}
+        self._preview_sheet = None
+        self._run_log = RunLog()
 
-        self._cols_join_on = {}
-        self._cols_subset = {}
+        self._matcher = None
+        self._primary_key = []
 
         self._current_dsn = None
 
@@ -114,37 +159,81 @@ class Window(QWidget):
         # noinspection PyArgumentList
         self.cmb_sht = QComboBox()
         # noinspection PyUnresolvedReferences
-        self.cmb_sht.currentTextChanged.connect(
-            self.update_file_details_clear_content
-        )
+        self.cmb_sht.currentTextChanged.connect(self.update_file_details)
+
+        self.mdl_cols = ColumnMappingModel(self)
+        # noinspection PyUnresolvedReferences
+        self.mdl_cols.mappingChanged.connect(self.update_mapping_state)
 
-        self.tbl_cols = QTableWidget(0, 5, self)
-        self.tbl_cols.setHorizontalHeaderLabels(
-            [
-                "Table Column Name",
-                "Table Data Type",
-                "File Column Name",
-                "File Data Type",
-                "Join",
-            ]
+        self.tbl_cols = QTableView(self)
+        self.tbl_cols.setModel(self.mdl_cols)
+        self.tbl_cols.setItemDelegateForColumn(
+            ColumnMappingModel.COL_FILE, FileColumnDelegate(self.tbl_cols)
         )
+        # sized once per reset, not on every data change
         self.tbl_cols.horizontalHeader().setSectionResizeMode(
-            QtWidgets.QHeaderView.ResizeToContents
+            QtWidgets.QHeaderView.Interactive
         )
         self.tbl_cols.verticalHeader().setSectionResizeMode(
             QtWidgets.QHeaderView.Fixed
         )
         self.tbl_cols.setEditTriggers(
-            QtWidgets.QAbstractItemView.NoEditTriggers
+            QtWidgets.QAbstractItemView.AllEditTriggers
         )
         self.tbl_cols.setSelectionMode(QtWidgets.QAbstractItemView.NoSelection)
 
+        # the whole sheet is previewed, cells are read from the data only as
+        # they are displayed, rows being of fixed height
+        self.mdl_preview = DataPreviewModel(self)
+        self.tbl_preview = QTableView(self)
+        self.tbl_preview.setModel(self.mdl_preview)
+        self.tbl_preview.horizontalHeader().setSectionResizeMode(
+            QtWidgets.QHeaderView.Interactive
+        )
+        self.tbl_preview.verticalHeader().setSectionResizeMode(
+            QtWidgets.QHeaderView.Fixed
+        )
+        self.tbl_preview.setEditTriggers(
+            QtWidgets.QAbstractItemView.NoEditTriggers
+        )
+
+        self.mdl_stats = ColumnStatsModel(self)
+        self.tbl_stats = QTableView(self)
+        self.tbl_stats.setModel(self.mdl_stats)
+        self.tbl_stats.horizontalHeader().setSectionResizeMode(
+            QtWidgets.QHeaderView.Interactive
+        )
+        self.tbl_stats.verticalHeader().setSectionResizeMode(
+            QtWidgets.QHeaderView.Fixed
+        )
+        self.tbl_stats.setEditTriggers(
+            QtWidgets.QAbstractItemView.NoEditTriggers
+        )
+
+        spl_preview = QSplitter(Qt.Vertical, self)
+        spl_preview.addWidget(self.tbl_preview)
+        spl_preview.addWidget(self.tbl_stats)
+
+        self.tab_sheet = QTabWidget(self)
+        self.tab_sheet.addTab(self.tbl_cols, "Columns")
+        self.tab_sheet.addTab(spl_preview, "Preview")
+        # noinspection PyUnresolvedReferences
+        self.tab_sheet.currentChanged.connect(self.update_preview)
+
         # noinspection PyArgumentList
         self.btn_update = QPushButton()
         self.btn_update.setText("Update")
         # noinspection PyUnresolvedReferences
         self.btn_update.clicked.connect(self.import_data)
 
+        # noinspection PyArgumentList
+        self.chk_delta = QCheckBox()
+        self.chk_delta.setText("Changed rows only")
+        self.chk_delta.setToolTip(
+            "Skip rows unchanged since the last successful update of the "
+            "table with the same columns"
+        )
+
         layout_dsn = QHBoxLayout()
         layout_dsn.addWidget(self.lbl_dsn, stretch=0)
         layout_dsn.addWidget(self.cmb_dsn, stretch=1)
@@ -162,11 +251,12 @@ class Window(QWidget):
         layout_sheet.addWidget(self.cmb_sht, stretch=1)
 
         layout_columns = QVBoxLayout()
-        layout_columns.addWidget(self.tbl_cols, stretch=1)
+        layout_columns.addWidget(self.tab_sheet, stretch=1)
 
         layout_download = QHBoxLayout()
         layout_download.addStretch()
         layout_download.addWidget(self.btn_update)
+        layout_download.addWidget(self.chk_delta)
         layout_download.addStretch()
 
         layout_main = QVBoxLayout()
@@ -189,6 +279,11 @@ class Window(QWidget):
         frame_geometry.moveCenter(center)
         self.move(frame_geometry.topLeft())
 
+    def closeEvent(self, event):
+        self._cancel_parse_jobs()
+        self._parse_executor.shutdown(wait=False)
+        super().closeEvent(event)
+
     def disable_all(self):
         self.cmb_dsn.setEnabled(False)
         self.cmb_tbl.setEnabled(False)
@@ -196,6 +291,7 @@ class Window(QWidget):
         self.cmb_sht.setEnabled(False)
         self.tbl_cols.setEnabled(False)
         self.btn_update.setEnabled(False)
+        self.chk_delta.setEnabled(False)
 
     def populate_dsn_cmb(self):
         data_sources = sorted(pyodbc.dataSources())
@@ -208,8 +304,9 @@ class Window(QWidget):
         else:
             self.disable_all()
 
-    def _update_dsns(self, name, columns):
+    def _update_dsns(self, name, columns, primary_keys):
         self._dsns[name] = columns
+        self._dsns_primary_keys[name] = primary_keys
         self._dsns_schema_table_map[name] = OrderedDict()
 
         for pair in columns:
@@ -225,6 +322,10 @@ class Window(QWidget):
     def _get_columns(self, dsn, table):
         return self._dsns[dsn][self._get_schema_table_pair(dsn, table)]
 
+    def _get_primary_key(self, dsn, table):
+        pair = self._get_schema_table_pair(dsn, table)
+        return self._dsns_primary_keys[dsn].get(pair, [])
+
     def populate_tables(self):
         if self.cmb_dsn.currentIndex() == -1:
             return
@@ -235,7 +336,11 @@ class Window(QWidget):
                 connection = pyodbc.connect("DSN=%s;" % dsn)
                 cursor = connection.cursor()
 
-                self._update_dsns(dsn, get_column_metadata(cursor))
+                self._update_dsns(
+                    dsn,
+                    get_column_metadata(cursor),
+                    get_primary_keys(cursor),
+                )
 
             except pyodbc.Error as e:
                 if not self._current_dsn:
@@ -276,8 +381,15 @@ class Window(QWidget):
             self.cmb_sht.setEnabled(False)
 
     def browse_file(self):
+        patterns = OrderedDict(
+            (name, " ".join("*" + ext for ext in extensions))
+            for name, extensions in FILE_FORMATS.values()
+        )
+        filters = ["Supported Files (%s)" % " ".join(patterns.values())]
+        filters += ["%s (%s)" % pair for pair in patterns.items()]
+
         fp, _ = QFileDialog.getOpenFileName(
-            self, "Open", "", "Excel Workbook (*.xlsx)"
+            self, "Open", "", ";;".join(filters)
         )
 
         if fp:
@@ -293,22 +405,119 @@ class Window(QWidget):
 
     def load_file(self, fp):
         try:
-            spreadsheet = pd.read_excel(fp, sheet_name=None, dtype=object)
+            sheets = read_sheet_names(fp)
         except Exception as e:
             message_box(e, parent=self, exit_app=False)
             return False
         else:
+            # sheets are read on demand, see `get_sheet_preview`
             self._file.clear()
+            self._file.update((sheet, None) for sheet in sheets)
+            self._file_path = fp
+            self._clear_preview()
+            self._cancel_parse_jobs()
+            self._sheet_memory.clear()
+            return True
+
+    def _cancel_parse_jobs(self):
+        # a running job cannot be stopped, it still stores its sheet
+        for job in self._parse_jobs.values():
+            job.cancel()
+        self._parse_jobs.clear()
+
+    def _parse_sheet_in_background(self, sheet):
+        # the selected workbook sheet is parsed into the cache while its
+        # mapping is edited, so it is cached by the time it is previewed or
+        # updated; other sheets are parsed only once selected
+        if (
+            get_file_format(self._file_path) != "excel"
+            or sheet in self._parse_jobs
+        ):
+            return
 
-            for sheet, data in spreadsheet.items():
-                data = data.convert_dtypes()
+        self._parse_jobs[sheet] = self._parse_executor.submit(
+            read_sheet,
+            self._file_path,
+            sheet,
+            cache=self._file_cache,
+            memory=self._new_sheet_memory(sheet),
+        )
 
-                columns = []
-                for col, dtype in data.dtypes.iteritems():
-                    columns.append((col, translate_dtype(dtype.name)))
+    def _new_sheet_memory(self, sheet):
+        memory = self._sheet_memory[sheet] = OrderedDict()
+        return memory
 
-                self._file[sheet] = (OrderedDict(columns), data)
-            return True
+    def _read_sheet(self, sheet):
+        # waits for the background job of the sheet, raising its error
+        job = self._parse_jobs.pop(sheet, None)
+        if job is not None:
+            try:
+                return job.result()
+            except CancelledError:
+                pass
+        return read_sheet(
+            self._file_path,
+            sheet,
+            cache=self._file_cache,
+            memory=self._new_sheet_memory(sheet),
+        )
+
+    def get_sheet_preview(self, sheet):
+        if self._file.get(sheet) is None:
+            # noinspection PyArgumentList
+            QApplication.setOverrideCursor(QtGui.QCursor(QtCore.Qt.WaitCursor))
+            try:
+                self._file[sheet] = read_sheet(
+                    self._file_path,
+                    sheet,
+                    nrows=PREVIEW_ROWS,
+                    cache=self._file_cache,
+                )
+            except Exception as e:
+                # noinspection PyArgumentList
+                QApplication.restoreOverrideCursor()
+                message_box(e, parent=self, exit_app=False)
+            else:
+                # noinspection PyArgumentList
+                QApplication.restoreOverrideCursor()
+        return self._file.get(sheet)
+
+    def _clear_preview(self):
+        self._preview_sheet = None
+        self.mdl_preview.set_preview(None)
+        self.mdl_stats.set_preview(None, None)
+
+    def update_preview(self):
+        # the sheet is read in full only once the preview is shown
+        sheet = self.cmb_sht.currentText()
+        if (
+            self.tab_sheet.currentIndex() != self.TAB_PREVIEW
+            or not sheet
+            or sheet == self._preview_sheet
+        ):
+            return
+
+        # noinspection PyArgumentList
+        QApplication.setOverrideCursor(QtGui.QCursor(QtCore.Qt.WaitCursor))
+        try:
+            types, data = self._read_sheet(sheet)
+        except Exception as e:
+            self._clear_preview()
+            # noinspection PyArgumentList
+            QApplication.restoreOverrideCursor()
+            message_box(e, parent=self, exit_app=False)
+            return
+
+        preview = DataPreview(data)
+        self._preview_sheet = sheet
+        self.mdl_preview.set_preview(preview)
+        self.mdl_stats.set_preview(preview, types)
+        # sized by the visible rows, statistics are computed on display
+        self.tbl_preview.resizeColumnsToContents()
+        self.tbl_stats.resizeColumnToContents(ColumnStatsModel.COL_NAME)
+        self.tbl_stats.resizeColumnToContents(ColumnStatsModel.COL_TYPE)
+        # noinspection PyArgumentList
+        QApplication.restoreOverrideCursor()
 
     def update_table_attributes(self):
         dsn = self.cmb_dsn.currentText()
@@ -317,138 +526,44 @@ class Window(QWidget):
             return
 
         columns = self._get_columns(dsn, table)
+        self._matcher = ColumnMatcher(columns)
+        self._primary_key = self._get_primary_key(dsn, table)
 
-        self.tbl_cols.setRowCount(len(columns))
-        for i, (table_col, table_col_type) in enumerate(columns.items()):
-            # noinspection PyArgumentList
-            file_col_widget = QWidget()
-            # noinspection PyArgumentList
-            file_col_cmb = QComboBox()
-            file_col_cmb.setMinimumWidth(100)
-            # noinspection PyUnresolvedReferences
-            file_col_cmb.activated.connect(
-                self.update_file_details_keep_content
-            )
-            # noinspection PyArgumentList
-            file_col_cmb_layout = QHBoxLayout(file_col_widget)
-            file_col_cmb_layout.addWidget(file_col_cmb)
-            file_col_cmb_layout.setAlignment(Qt.AlignCenter)
-            file_col_cmb_layout.setContentsMargins(10, 0, 10, 0)
+        self.mdl_cols.set_table_columns(columns)
+        self.update_file_details()
 
-            # noinspection PyArgumentList
-            file_join_widget = QWidget()
-            # noinspection PyArgumentList
-            file_join_ckb = QCheckBox()
-            file_join_ckb.setEnabled(False)
-            file_join_ckb.setVisible(False)
-            # noinspection PyUnresolvedReferences
-            file_join_ckb.clicked.connect(
-                self.update_file_details_keep_content
-            )
-            # noinspection PyArgumentList
-            file_join_ckb_layout = QHBoxLayout(file_join_widget)
-            file_join_ckb_layout.addWidget(file_join_ckb)
-            file_join_ckb_layout.setAlignment(Qt.AlignCenter)
-            file_join_ckb_layout.setContentsMargins(0, 0, 0, 0)
-
-            # noinspection PyArgumentList
-            self.tbl_cols.setItem(i, 0, QTableWidgetItem(table_col))
-            # noinspection PyArgumentList
-            self.tbl_cols.setItem(i, 1, QTableWidgetItem(table_col_type))
-            self.tbl_cols.setCellWidget(i, 2, file_col_widget)
-            self.tbl_cols.setCellWidget(i, 4, file_join_widget)
-
-        self.update_file_details_clear_content()
-
-    def update_file_details(self, keep_content):
+    def update_file_details(self):
         sheet = self.cmb_sht.currentText()
         if not sheet:
             return
 
-        sheet_data = self._file.get(sheet)
+        sheet_data = self.get_sheet_preview(sheet)
         if not sheet_data:
             return
 
-        rows_num = self.tbl_cols.rowCount()
         columns, _ = sheet_data
+        self._parse_sheet_in_background(sheet)
+        self.mdl_cols.set_file_columns(columns)
+        self.update_preview()
+        if self._matcher is not None:
+            mapping = self._matcher.match(columns)
+            self.mdl_cols.apply_mapping(
+                mapping, suggest_join_on(mapping, self._primary_key)
+            )
+        self.resize_mapping_columns()
 
-        available = list(columns)
-        if keep_content:
-            for i in range(rows_num):
-                file_col_cmb = self.tbl_cols.cellWidget(i, 2).findChild(
-                    QComboBox
-                )
-                # noinspection PyUnresolvedReferences
-                col = file_col_cmb.currentText()
-                if col and col in available:
-                    available.remove(col)
-
-        self._cols_join_on.clear()
-        self._cols_subset.clear()
-
-        default = [""] + available
-        for i in range(rows_num):
-            table_col = self.tbl_cols.item(i, 0).text()
-            file_col_cmb = self.tbl_cols.cellWidget(i, 2).findChild(QComboBox)
-            file_join_ckb = self.tbl_cols.cellWidget(i, 4).findChild(QCheckBox)
-
-            # noinspection PyUnresolvedReferences
-            selected = file_col_cmb.currentText()
-            if selected and keep_content:
-                table_col_type = self.tbl_cols.item(i, 1).text()
-
-                # noinspection PyUnresolvedReferences
-                file_col_cmb.clear()
-                # noinspection PyUnresolvedReferences
-                file_col_cmb.addItems(
-                    [""]
-                    + [c for c in columns if c in available or c == selected]
-                )
-                # noinspection PyUnresolvedReferences
-                file_col_cmb.setCurrentIndex(file_col_cmb.findText(selected))
-
-                file_col_type = columns[selected]
-                # noinspection PyArgumentList
-                file_col_type_item = QTableWidgetItem(file_col_type)
-                if is_cast_explicit(file_col_type, table_col_type):
-                    file_col_type_item.setBackground(Qt.yellow)
-                self.tbl_cols.setItem(i, 3, file_col_type_item)
-
-                # noinspection PyUnresolvedReferences
-                file_join_ckb.setEnabled(True)
-                # noinspection PyUnresolvedReferences
-                file_join_ckb.setVisible(True)
-
-                # noinspection PyUnresolvedReferences
-                if file_join_ckb.isChecked():
-                    self._cols_join_on[selected] = table_col
-                else:
-                    self._cols_subset[selected] = table_col
-            else:
-                # noinspection PyUnresolvedReferences
-                file_col_cmb.clear()
-                # noinspection PyUnresolvedReferences
-                file_col_cmb.addItems(default)
-
-                self.tbl_cols.takeItem(i, 3)
-
-                # noinspection PyUnresolvedReferences
-                file_join_ckb.setChecked(False)
-                # noinspection PyUnresolvedReferences
-                file_join_ckb.setEnabled(False)
-                # noinspection PyUnresolvedReferences
-                file_join_ckb.setVisible(False)
-
-        if len(self._cols_join_on) > 0 and len(self._cols_subset) > 0:
-            self.btn_update.setEnabled(True)
-        else:
-            self.btn_update.setEnabled(False)
-
-    def update_file_details_keep_content(self):
-        self.update_file_details(keep_content=True)
+    def resize_mapping_columns(self):
+        self.tbl_cols.resizeColumnsToContents()
+        # leave room for the drop-down list of file columns
+        if self.tbl_cols.columnWidth(ColumnMappingModel.COL_FILE) < 120:
+            self.tbl_cols.setColumnWidth(ColumnMappingModel.COL_FILE, 120)
 
-    def update_file_details_clear_content(self):
-        self.update_file_details(keep_content=False)
+    def update_mapping_state(self):
+        enabled = (
+            self.mdl_cols.join_count > 0 and self.mdl_cols.subset_count > 0
+        )
+        self.btn_update.setEnabled(enabled)
+        self.chk_delta.setEnabled(enabled)
 
     def import_data(self):
         # noinspection PyArgumentList
@@ -458,26 +573,79 @@ class Window(QWidget):
         table_qualified = self.cmb_tbl.currentText()
         schema, table = self._get_schema_table_pair(dsn, table_qualified)
         sheet = self.cmb_sht.currentText()
-        columns, data = self._file[sheet]
 
-        data = data.copy()[
-            list(self._cols_join_on) + list(self._cols_subset)
-        ].rename(columns={**self._cols_join_on, **self._cols_subset})
+        started = datetime.datetime.now(datetime.timezone.utc)
+        durations = OrderedDict()
+        memory = OrderedDict()
+        unmatched_file = None
+        error = None
+
+        profiler = None
+        if self._profile_dir:
+            profiler = Profiler(
+                os.path.join(
+                    self._profile_dir, started.strftime("%Y%m%d-%H%M%S-%f")
+                )
+            )
 
-        conn = pyodbc.connect("DSN=%s;" % dsn)
+        conn = None
+        importer = None
         try:
+            join_on = self.mdl_cols.join_on()
+            subset = self.mdl_cols.subset()
+            columns = {**join_on, **subset}
+            column_types = self._get_columns(dsn, table_qualified)
+
+            if get_file_format(self._file_path) == "csv":
+                # delimited text is streamed, each batch is validated as it
+                # is read, before the staged rows update the table
+                data = validate_chunks(
+                    (
+                        select_columns(pa.Table.from_batches([batch]), columns)
+                        for batch in iter_csv(self._file_path)
+                    ),
+                    column_types,
+                )
+            else:
+                start = time.perf_counter()
+                with self._profile(profiler, "read"):
+                    _, data = self._read_sheet(sheet)
+                    data = select_columns(data, columns)
+
+                    # sheets are compacted once read, only mapped columns
+                    # are kept
+                    memory[sheet] = OrderedDict(
+                        self._sheet_memory.get(sheet, {})
+                    )
+                    memory[sheet]["mapped"] = get_memory_usage(data)
+                durations["read"] = time.perf_counter() - start
+
+                # fail fast on values the database cannot convert
+                start = time.perf_counter()
+                with self._profile(profiler, "validate"):
+                    validate(data, column_types)
+                durations["validate"] = time.perf_counter() - start
+
+            conn = pyodbc.connect("DSN=%s;" % dsn)
             importer = Importer(
                 connection=conn,
                 data=data,
                 table=table,
                 schema=schema,
-                join_on=list(self._cols_join_on.values()),
-                subset=list(self._cols_subset.values()),
+                join_on=list(join_on.values()),
+                subset=list(subset.values()),
+                cache=get_cache(dsn),
+            )
+            importer.run(
+                update=True,
+                profiler=profiler,
+                delta=DeltaStore(dsn) if self.chk_delta.isChecked() else None,
+                collect_unmatched=True,
             )
-            importer.run(update=True)
         except Exception as e:
             if isinstance(e, pyodbc.Error):
                 e = e.args[1] if len(e.args) > 1 else e
+            error = e
             # noinspection PyArgumentList
             QApplication.restoreOverrideCursor()
 
@@ -494,9 +662,63 @@ class Window(QWidget):
             else:
                 msg = "Successfully updated %d rows" % rows
 
+            keys = importer.unmatched_keys
+            if keys is not None and len(keys) > 0:
+                msg += "\n%d row%s not found in table" % (
+                    len(keys),
+                    "" if len(keys) == 1 else "s",
+                )
+                unmatched_file = self._export_unmatched_keys(
+                    keys, table_qualified, started
+                )
+                if unmatched_file is not None:
+                    msg += ", keys saved to\n%s" % unmatched_file
+
             # noinspection PyArgumentList
             QApplication.restoreOverrideCursor()
 
             message_box(msg, parent=self, error=False, exit_app=False)
         finally:
-            conn.close()
+            if conn is not None:
+                conn.close()
+
+            self._write_run_log(
+                make_record(
+                    dsn,
+                    table_qualified,
+                    stats=importer.stats if importer is not None else None,
+                    error=error,
+                    started=started,
+                    file=self._file_path,
+                    sheet=sheet,
+                    durations=durations,
+                    memory=memory,
+                    unmatched_file=unmatched_file,
+                    profile=profiler.directory if profiler else None,
+                )
+            )
+
+    @staticmethod
+    def _profile(profiler, phase):
+        return profiler.phase(phase) if profiler is not None else nullcontext()
+
+    def _export_unmatched_keys(self, keys, table, started):
+        # kept next to the run log for follow-up, one file per run
+        path = os.path.join(
+            os.path.dirname(self._run_log.path),
+            "unmatched",
+            "%s-%s.csv" % (started.strftime("%Y%m%d-%H%M%S"), table),
+        )
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            keys.to_csv(path, index=False)
+        except OSError:
+            return None
+        return path
+
+    def _write_run_log(self, record):
+        try:
+            self._run_log.write(record)
+        except OSError:
+            # an unwritable log must not fail the import
+            pass
@@ -0,0 +1,155 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from dbimport.asyncimporter import AsyncImporter, ImportCancelled
+from dbimport.importer import Importer
+
+
+class TestAsyncImporter(unittest.IsolatedAsyncioTestCase):
+    rows = 5
+
+    def setUp(self):
+        patcher = mock.patch.object(Importer, "_chunk_size", 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "test.db")
+
+        conn = sqlite3.connect(self.path)
+        for table in ("a", "b"):
+            conn.execute(
+                "create table %s (id int primary key, value int)" % table
+            )
+            conn.executemany(
+                "insert into %s values (?, 0)" % table,
+                [(i,) for i in range(self.rows)],
+            )
+        conn.commit()
+        conn.close()
+
+        self.data = pd.DataFrame(
+            {"id": range(self.rows), "value": [1] * self.rows}
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def fetch_sum(self, table):
+        conn = self.connect()
+        try:
+            return conn.execute(
+                "select sum(value) from %s" % table
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    async def test_events(self):
+        async with AsyncImporter() as importer:
+            job = importer.submit(
+                self.connect, data=self.data, table="a", dialect="sqlite"
+            )
+            events = [event async for event in job]
+
+        self.assertEqual(
+            ["stage", "stage", "stage", "stage", "update", "cleanup", "done"],
+            [e.phase for e in events],
+        )
+        self.assertEqual([0, 2, 4, 5], [e.rows_staged for e in events[:4]])
+        self.assertEqual({self.rows}, {e.rows_total for e in events})
+        self.assertEqual(self.rows, job.stats["rows_updated"])
+        self.assertEqual(self.rows, self.fetch_sum("a"))
+
+    async def test_concurrent(self):
+        threads = set()
+
+        def connect():
+            threads.add(threading.current_thread().name)
+            return self.connect()
+
+        async with AsyncImporter(max_workers=2) as importer:
+            stats = await asyncio.gather(
+                importer.submit(
+                    connect, data=self.data, table="a", dialect="sqlite"
+                ),
+                importer.submit(
+                    connect, data=self.data, table="b", dialect="sqlite"
+                ),
+            )
+
+        self.assertEqual(
+            [self.rows, self.rows], [s["rows_staged"] for s in stats]
+        )
+        self.assertEqual(self.rows, self.fetch_sum("a"))
+        self.assertEqual(self.rows, self.fetch_sum("b"))
+        self.assertTrue(all(t.startswith("dbimport") for t in threads))
+
+    async def test_error(self):
+        async with AsyncImporter() as importer:
+            with self.assertRaisesRegex(ValueError, "no columns provided"):
+                await importer.submit(
+                    self.connect,
+                    data=self.data[["id"]],
+                    table="a",
+                    dialect="sqlite",
+                )
+
+    def blocking_chunks(self, resume):
+        # staging waits after the first chunk until resumed
+        yield self.data.iloc[:2]
+        resume.wait(10)
+        yield self.data.iloc[2:]
+
+    async def test_cancel(self):
+        resume = threading.Event()
+
+        async with AsyncImporter() as importer:
+            job = importer.submit(
+                self.connect,
+                data=self.blocking_chunks(resume),
+                table="a",
+                dialect="sqlite",
+            )
+            with self.assertRaisesRegex(ImportCancelled, "cancelled"):
+                async for event in job:
+                    if event.rows_staged > 0:
+                        job.cancel()
+                        resume.set()
+
+        self.assertEqual(0, self.fetch_sum("a"))
+
+    async def test_cancel_task(self):
+        resume = threading.Event()
+        staged = asyncio.Event()
+
+        async def consume(job):
+            async for event in job:
+                if event.rows_staged > 0:
+                    staged.set()
+
+        async with AsyncImporter() as importer:
+            job = importer.submit(
+                self.connect,
+                data=self.blocking_chunks(resume),
+                table="a",
+                dialect="sqlite",
+            )
+            task = asyncio.ensure_future(consume(job))
+            await staged.wait()
+            task.cancel()
+
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            resume.set()
+
+        self.assertEqual(0, self.fetch_sum("a"))
@@ -0,0 +1,91 @@
+import threading
+import unittest
+
+from dbimport.batching import ChunkSizer, estimate_chunk_size, prefetch
+
+
+class TestBatching(unittest.TestCase):
+    def test_estimate_chunk_size(self):
+        self.assertEqual(1024, estimate_chunk_size(4096))
+        self.assertEqual(100, estimate_chunk_size(10**6))
+        self.assertEqual(100000, estimate_chunk_size(1))
+        self.assertEqual(100000, estimate_chunk_size(0))
+
+    def test_grows_while_throughput_improves(self):
+        sizer = ChunkSizer(1000)
+        sizer.record(1000, 1.0)
+        self.assertEqual(1500, sizer.size)
+        sizer.record(1500, 1.0)
+        self.assertEqual(2250, sizer.size)
+
+    def test_turns_back_when_throughput_drops(self):
+        sizer = ChunkSizer(1000)
+        sizer.record(1000, 1.0)
+        sizer.record(1500, 3.0)
+        self.assertEqual(1000, sizer.size)
+
+    def test_bounds(self):
+        sizer = ChunkSizer(1000, minimum=500, maximum=1200)
+        self.assertEqual(1000, sizer.initial_size)
+        sizer.record(1000, 1.0)
+        self.assertEqual(1200, sizer.size)
+        sizer.record(1200, 1.0)
+        self.assertEqual(1200, sizer.size)
+        # the bound turns the search back
+        sizer.record(1200, 1.0)
+        self.assertEqual(800, sizer.size)
+
+    def test_partial_chunk_ignored(self):
+        sizer = ChunkSizer(1000)
+        sizer.record(10, 1.0)
+        self.assertEqual(1000, sizer.size)
+
+        # chunk cut before the size changed
+        sizer.record(1000, 1.0, size=1000)
+        sizer.record(1000, 1.0, size=1000)
+        self.assertEqual(2250, sizer.size)
+
+    def test_prefetch(self):
+        self.assertEqual(list(range(10)), list(prefetch(iter(range(10)))))
+
+    def test_prefetch_overlaps(self):
+        produced = []
+        second = threading.Event()
+
+        def items():
+            for i in range(3):
+                produced.append(i)
+                if i == 1:
+                    second.set()
+                yield i
+
+        it = prefetch(items(), depth=1)
+        self.assertEqual(0, next(it))
+        # the next item is produced while the first one is consumed
+        self.assertTrue(second.wait(5))
+        self.assertEqual([1, 2], list(it))
+
+    def test_prefetch_error(self):
+        def items():
+            yield 1
+            raise ValueError("conversion failed")
+
+        it = prefetch(items())
+        self.assertEqual(1, next(it))
+        with self.assertRaisesRegex(ValueError, "conversion failed"):
+            next(it)
+
+    def test_prefetch_close(self):
+        produced = []
+
+        def items():
+            for i in range(100):
+                produced.append(i)
+                yield i
+
+        it = prefetch(items(), depth=2)
+        next(it)
+        it.close()
+
+        # the producer stops, bounded by the queue
+        self.assertLess(len(produced), 10)
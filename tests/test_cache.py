@@ -0,0 +1,175 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pandas as pd
+import pyarrow as pa
+
+from dbimport.cache import FileCache
+from dbimport.reader import read_sheet
+
+
+class TestFileCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache = FileCache(os.path.join(self.dir.name, "cache"))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write_file(self, name, content):
+        fp = os.path.join(self.dir.name, name)
+        with open(fp, "wb") as f:
+            f.write(content)
+        return fp
+
+    def index(self):
+        with open(os.path.join(self.cache.directory, "index.json")) as f:
+            return json.load(f)
+
+    @staticmethod
+    def sheet(rows):
+        data = pd.DataFrame(
+            {"id": ["ID%06d" % i for i in range(rows)], "value": range(rows)}
+        ).convert_dtypes()
+        columns = OrderedDict([("id", "text"), ("value", "number")])
+        return columns, data
+
+    def test_get_put(self):
+        fp = self.write_file("a.bin", b"a")
+        exp_columns, exp_data = self.sheet(3)
+
+        self.assertIsNone(self.cache.get(fp, "Sheet1"))
+        self.assertTrue(self.cache.put(fp, "Sheet1", exp_columns, exp_data))
+        self.assertIsNone(self.cache.get(fp, "Sheet2"))
+
+        act_columns, act_data = self.cache.get(fp, "Sheet1")
+
+        self.assertEqual(exp_columns, act_columns)
+        self.assertIsInstance(act_data, pa.Table)
+        self.assertEqual(
+            pa.Table.from_pandas(exp_data).to_pylist(), act_data.to_pylist()
+        )
+
+        self.assertTrue(self.cache.put(fp, "Sheet2", *self.sheet(1)))
+        self.assertIsNotNone(self.cache.get(fp, "Sheet1"))
+        self.assertIsNotNone(self.cache.get(fp, "Sheet2"))
+
+    def test_get_unchanged_file_skips_hashing(self):
+        fp = self.write_file("a.bin", b"a")
+        self.cache.put(fp, "Sheet1", *self.sheet(3))
+
+        with mock.patch.object(FileCache, "_hash_file") as hash_file:
+            self.assertIsNotNone(self.cache.get(fp, "Sheet1"))
+            hash_file.assert_not_called()
+
+    def test_get_by_content(self):
+        fp = self.write_file("a.bin", b"a")
+        self.cache.put(fp, "Sheet1", *self.sheet(3))
+
+        fp_copy = os.path.join(self.dir.name, "b.bin")
+        shutil.copyfile(fp, fp_copy)
+
+        self.assertIsNotNone(self.cache.get(fp_copy, "Sheet1"))
+
+        self.write_file("a.bin", b"b")
+
+        self.assertIsNone(self.cache.get(fp, "Sheet1"))
+
+    def test_get_changed_file_replaces_index_key(self):
+        fp = self.write_file("a.bin", b"a")
+        self.cache.put(fp, "Sheet1", *self.sheet(3))
+        self.write_file("a.bin", b"bb")
+
+        self.assertIsNone(self.cache.get(fp, "Sheet1"))
+        self.assertEqual(
+            [self.cache._hash_file(fp)], list(self.index().values())
+        )
+
+    def test_get_evicted(self):
+        fp = self.write_file("a.bin", b"a")
+        self.cache.put(fp, "Sheet1", *self.sheet(3))
+
+        # entry removed after its manifest was read
+        with mock.patch("os.utime", side_effect=FileNotFoundError):
+            self.assertIsNone(self.cache.get(fp, "Sheet1"))
+
+    def test_put_unsupported(self):
+        fp = self.write_file("a.bin", b"a")
+        data = pd.DataFrame({"value": [1, "a"]})
+        columns = OrderedDict([("value", "object")])
+
+        self.assertFalse(self.cache.put(fp, "Sheet1", columns, data))
+        self.assertIsNone(self.cache.get(fp, "Sheet1"))
+
+    def test_put_concurrent(self):
+        fps = [self.write_file("%d.bin" % i, b"%d" % i) for i in range(2)]
+        sheets = ["Sheet%d" % i for i in range(8)]
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            stored = list(
+                executor.map(
+                    lambda args: self.cache.put(*args, *self.sheet(100)),
+                    [(fp, sheet) for fp in fps for sheet in sheets],
+                )
+            )
+
+        self.assertTrue(all(stored))
+        for fp in fps:
+            for sheet in sheets:
+                self.assertIsNotNone(self.cache.get(fp, sheet))
+
+    def test_evict_least_recently_used(self):
+        fps = [self.write_file("%d.bin" % i, b"%d" % i) for i in range(3)]
+
+        self.cache.put(fps[0], "Sheet1", *self.sheet(1000))
+        size = sum(
+            os.path.getsize(os.path.join(root, f))
+            for root, _, files in os.walk(self.cache.directory)
+            for f in files
+            if root != self.cache.directory
+        )
+        self.cache = FileCache(self.cache.directory, max_size=size * 2)
+
+        self.cache.put(fps[1], "Sheet1", *self.sheet(1000))
+        os.utime(
+            os.path.join(self.cache.directory, self.cache._get_digest(fps[0])),
+            (0, 0),
+        )
+        self.cache.get(fps[1], "Sheet1")
+        self.cache.put(fps[2], "Sheet1", *self.sheet(1000))
+
+        evicted = self.cache._get_digest(fps[0])
+        self.assertIsNone(self.cache.get(fps[0], "Sheet1"))
+        self.assertIsNotNone(self.cache.get(fps[1], "Sheet1"))
+        self.assertIsNotNone(self.cache.get(fps[2], "Sheet1"))
+
+        # index keys of evicted entries are dropped by the next put
+        self.cache.put(fps[2], "Sheet2", *self.sheet(1))
+        self.assertNotIn(evicted, self.index().values())
+
+    def test_read_sheet(self):
+        fp = os.path.join(self.dir.name, "groceries.xlsx")
+        pd.DataFrame(
+            [("ID000001", "Apple", 15, 20.5), ("ID000002", None, 14, None)],
+            columns=["id", "item", "quantity", "price"],
+        ).to_excel(fp, index=False)
+
+        read_sheet(fp, "Sheet1", nrows=1, cache=self.cache)
+
+        self.assertIsNone(self.cache.get(fp, "Sheet1"))
+
+        exp_columns, exp_data = read_sheet(fp, "Sheet1", cache=self.cache)
+        act_columns, act_data = read_sheet(fp, "Sheet1", cache=self.cache)
+
+        self.assertIsInstance(exp_data, pd.DataFrame)
+        self.assertIsInstance(act_data, pa.Table)
+        self.assertEqual(exp_columns, act_columns)
+        self.assertEqual(
+            pa.Table.from_pandas(exp_data).to_pylist(), act_data.to_pylist()
+        )
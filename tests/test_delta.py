@@ -0,0 +1,171 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from dbimport.delta import DeltaState, DeltaStore, hash_rows
+from dbimport.importer import Importer
+
+
+class TestDelta(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.store = DeltaStore(
+            "test", path=os.path.join(self.dir.name, "delta.sqlite")
+        )
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_hash_rows_types(self):
+        df = pd.DataFrame({"id": [-1, 2], "price": [1.5, None]})
+        narrow = df.astype({"id": np.int8, "price": np.float32})
+
+        np.testing.assert_array_equal(
+            hash_rows(df, ["id", "price"]), hash_rows(narrow, ["id", "price"])
+        )
+        np.testing.assert_array_equal(
+            hash_rows(df, ["id", "price"]),
+            hash_rows(pa.Table.from_pandas(df), ["id", "price"]),
+        )
+
+    def test_hash_rows_nulls(self):
+        # e.g. a sheet read as a DataFrame and loaded from the file cache
+        df = pd.DataFrame(
+            {
+                "id": pd.array([1, None, 3], dtype="Int64"),
+                "name": pd.array(["a", None, "c"], dtype="string"),
+                "flag": pd.array([True, None, False], dtype="boolean"),
+                "updated": pd.to_datetime(["2021-05-01", None, "2021-05-03"]),
+            }
+        )
+        table = pa.table(
+            {
+                "id": pa.array([1, None, 3]),
+                "name": pa.array(["a", None, "c"]),
+                "flag": pa.array([True, None, False]),
+                "updated": pa.array(
+                    [
+                        pd.Timestamp("2021-05-01"),
+                        None,
+                        pd.Timestamp("2021-05-03"),
+                    ],
+                    pa.timestamp("us"),
+                ),
+            }
+        )
+        columns = ["id", "name", "flag", "updated"]
+
+        exp = hash_rows(df, columns)
+        np.testing.assert_array_equal(exp, hash_rows(table, columns))
+        np.testing.assert_array_equal(
+            exp, hash_rows(table.to_pandas(), columns)
+        )
+        np.testing.assert_array_equal(
+            exp, hash_rows(pa.Table.from_pandas(df), columns)
+        )
+
+        # whole numbers hash alike whatever the other values of the column
+        mixed = pd.DataFrame({"id": [1.0, 2.5], "name": ["a", "b"]})
+        np.testing.assert_array_equal(
+            hash_rows(df, ["id", "name"])[:1],
+            hash_rows(mixed, ["id", "name"])[:1],
+        )
+
+    def test_changed(self):
+        df = pd.DataFrame({"id": ["a", "b"], "quantity": [1, 2]})
+        state = DeltaState()
+        self.assertEqual(
+            [True, True], list(state.changed(df, ["id"], ["quantity"]))
+        )
+        self.store.save("main", "groceries", ["id"], ["quantity"], state)
+
+        state = self.store.load("main", "groceries", ["id"], ["quantity"])
+        self.assertEqual(2, len(state))
+        df = pd.DataFrame({"id": ["a", "b", "c"], "quantity": [1, 3, 1]})
+        self.assertEqual(
+            [False, True, True],
+            list(state.changed(df, ["id"], ["quantity"])),
+        )
+
+    def test_load_other_target(self):
+        df = pd.DataFrame({"id": ["a"], "quantity": [1]})
+        state = DeltaState()
+        state.changed(df, ["id"], ["quantity"])
+        self.store.save("main", "groceries", ["id"], ["quantity"], state)
+
+        for args, actions in (
+            (("main", "groceries", ["id"], ["quantity", "price"]), None),
+            (("main", "groceries", ["id"], ["quantity"]), ("insert",)),
+            (("main", "fruit", ["id"], ["quantity"]), None),
+        ):
+            kwargs = {"actions": actions} if actions else {}
+            self.assertEqual(0, len(self.store.load(*args, **kwargs)))
+        other = DeltaStore("other", path=self.store.path)
+        self.assertEqual(
+            0, len(other.load("main", "groceries", ["id"], ["quantity"]))
+        )
+
+    def test_clear(self):
+        state = DeltaState()
+        state.changed(
+            pd.DataFrame({"id": ["a"], "quantity": [1]}), ["id"], ["quantity"]
+        )
+        for table in ("groceries", "fruit"):
+            self.store.save("main", table, ["id"], ["quantity"], state)
+
+        self.store.clear(table="fruit")
+        self.assertEqual(
+            1, len(self.store.load("main", "groceries", ["id"], ["quantity"]))
+        )
+        self.assertEqual(
+            0, len(self.store.load("main", "fruit", ["id"], ["quantity"]))
+        )
+
+        self.store.clear()
+        self.assertEqual(
+            0, len(self.store.load("main", "groceries", ["id"], ["quantity"]))
+        )
+
+    def test_import(self):
+        conn = sqlite3.connect(":memory:")
+        self.addCleanup(conn.close)
+        conn.execute(
+            "create table groceries (id text primary key, quantity int)"
+        )
+        values = [("ID%06d" % i, i) for i in range(100)]
+        conn.executemany("insert into groceries values (?, ?)", values)
+
+        def run_import(df):
+            imp = Importer(
+                connection=conn, data=df, table="groceries", dialect="sqlite"
+            )
+            imp.run(update=True, delta=self.store)
+            return imp.stats
+
+        df = pd.DataFrame(values, columns=["id", "quantity"])
+        df["quantity"] += 1
+        stats = run_import(df)
+        self.assertEqual(100, stats["rows_staged"])
+        self.assertEqual(0, stats["rows_unchanged"])
+        self.assertIn("delta", stats["durations"])
+
+        df.loc[[3, 7], "quantity"] = 0
+        stats = run_import(pa.Table.from_pandas(df))
+        self.assertEqual(2, stats["rows_staged"])
+        self.assertEqual(98, stats["rows_unchanged"])
+        self.assertEqual(2, stats["rows_updated"])
+        self.assertEqual(
+            [("ID000003", 0), ("ID000004", 5)],
+            conn.execute(
+                "select * from groceries where id in ('ID000003', 'ID000004')"
+            ).fetchall(),
+        )
+
+        stats = run_import(df)
+        self.assertEqual(0, stats["rows_staged"])
+        self.assertEqual(0, stats["rows_updated"])
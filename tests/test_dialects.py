@@ -0,0 +1,213 @@
+import sqlite3
+import unittest
+
+import pandas as pd
+
+from dbimport import dialects
+from dbimport.dialects import (
+    Dialect,
+    MssqlDialect,
+    SqliteDialect,
+    get_dialect,
+    get_dialect_names,
+    register_dialect,
+)
+from dbimport.importer import Importer
+
+
+class TestDialects(unittest.TestCase):
+    def test_get_dialect(self):
+        self.assertIsInstance(get_dialect("mssql"), MssqlDialect)
+        self.assertIsInstance(get_dialect("sqlite"), SqliteDialect)
+        self.assertEqual(["mssql", "sqlite"], get_dialect_names()[:2])
+
+        with self.assertRaisesRegex(
+            ValueError, "unsupported dialect, use available: 'mssql'"
+        ):
+            get_dialect("mysql")
+
+    def test_get_dialect_shared(self):
+        self.assertIs(get_dialect("sqlite"), get_dialect("sqlite"))
+
+    def test_register_dialect(self):
+        @register_dialect
+        class TestDialect(SqliteDialect):
+            name = "test"
+
+        self.addCleanup(dialects._DIALECTS.pop, "test")
+
+        self.assertIsInstance(get_dialect("test"), TestDialect)
+
+    def test_quote(self):
+        self.assertEqual("[a]]b]", MssqlDialect().quote("a]b"))
+        self.assertEqual('"a""b"', SqliteDialect().quote('a"b'))
+        self.assertEqual(
+            "[dbo].[Table]", MssqlDialect().table_name("dbo", "Table")
+        )
+        self.assertEqual('"Table"', SqliteDialect().table_name(None, "Table"))
+
+    def test_update_query_mssql(self):
+        query = MssqlDialect().update_query(
+            "[dbo].[t]", ["id", "line"], ["value"]
+        )
+
+        self.assertIn("set a.[value] = b.[value]", query)
+        self.assertIn("from [dbo].[t] as a", query)
+        self.assertIn("inner join #dbimport as b", query)
+        self.assertIn("on a.[id] = b.[id] and a.[line] = b.[line]", query)
+
+    def test_changes_query_mssql(self):
+        query = MssqlDialect().changes_query(
+            "[dbo].[t]",
+            ["id"],
+            ["name", "value"],
+            [("nvarchar", 10, None), ("int", 10, 0)],
+        )
+
+        self.assertIn("update b\n        set b.[dbimport_changes] = ", query)
+        self.assertIn(
+            "case when (a.[name] <> b.[name] collate Latin1_General_BIN2",
+            query,
+        )
+        self.assertIn("then 2 else 0 end", query)
+        self.assertIn("inner join #dbimport as b", query)
+
+    def test_differs_mssql_nulls(self):
+        backend = MssqlDialect()
+        conn = sqlite3.connect(":memory:")
+        self.addCleanup(conn.close)
+
+        def differs(type_name, left, right):
+            # the SQL Server predicate, evaluated by sqlite with equivalent
+            # binary collation and length functions
+            pred = (
+                backend.differs("?1", "?2", type_name)
+                .replace("collate Latin1_General_BIN2", "collate binary")
+                .replace("datalength", "length")
+            )
+            (value,) = conn.execute(
+                "select case when %s then 1 else 0 end" % pred, (left, right)
+            ).fetchone()
+            return bool(value)
+
+        for type_name, value, other in (
+            ("int", 1, 2),
+            ("nvarchar", "a", "A"),
+            ("nvarchar", "a", "a "),
+        ):
+            self.assertTrue(differs(type_name, value, None))
+            self.assertTrue(differs(type_name, None, value))
+            self.assertTrue(differs(type_name, value, other))
+            self.assertFalse(differs(type_name, value, value))
+            self.assertFalse(differs(type_name, None, None))
+
+    def test_update_query_changes(self):
+        query = MssqlDialect().update_query(
+            "[dbo].[t]", ["id"], ["value"], changes=2
+        )
+
+        self.assertTrue(query.endswith("where b.[dbimport_changes] = 2"))
+
+    def test_update_query_matched(self):
+        backend = MssqlDialect()
+        query = backend.update_query(
+            "[dbo].[t]", ["id", "line"], ["value"], matched=True
+        )
+
+        self.assertIn(
+            "set a.[value] = b.[value]\n"
+            "        output inserted.[id], inserted.[line]\n"
+            "        into #dbimport_matched\n"
+            "        from [dbo].[t] as a",
+            query,
+        )
+        self.assertIn(
+            "from #dbimport as b\n"
+            "        where not exists (select * from #dbimport_matched as a "
+            "where a.[id] = b.[id] and a.[line] = b.[line])",
+            backend.unmatched_keys_query("[dbo].[t]", ["id", "line"]),
+        )
+
+    def test_insert_staging_query(self):
+        self.assertEqual(
+            'insert into dbimport ("a", "b") values (?, ?), (?, ?)',
+            SqliteDialect().insert_staging_query(["a", "b"], 2),
+        )
+
+    def test_rows_per_statement(self):
+        self.assertEqual(699, MssqlDialect().rows_per_statement(3))
+        self.assertEqual(1000, MssqlDialect().rows_per_statement(2))
+        self.assertEqual(1, MssqlDialect().rows_per_statement(3000))
+
+    def test_bulk_load_multirow(self):
+        executed = []
+
+        class Cursor:
+            def execute(self, query, params):
+                executed.append((query, params))
+
+        dialect = MssqlDialect()
+        dialect.max_statement_rows = 2
+        chunks = [[(1, "a"), (2, "b"), (3, "c")]]
+        sent = list(
+            dialect.bulk_load(
+                Cursor(), ["id", "v"], [("int",), ("nvarchar",)], chunks
+            )
+        )
+
+        self.assertEqual(chunks, sent)
+        self.assertEqual(
+            [
+                (
+                    "insert into #dbimport ([id], [v]) values (?, ?), (?, ?)",
+                    [1, "a", 2, "b"],
+                ),
+                ("insert into #dbimport ([id], [v]) values (?, ?)", [3, "c"]),
+            ],
+            executed,
+        )
+
+    def test_sqlite_primary_key(self):
+        conn = sqlite3.connect(":memory:")
+        conn.execute(
+            "create table t (b int, a int, v text, primary key (a, b))"
+        )
+
+        self.assertEqual(
+            ["a", "b"],
+            SqliteDialect().get_primary_key(conn.cursor(), None, "t"),
+        )
+        conn.close()
+
+    def test_custom_dialect(self):
+        class QuotedSqliteDialect(SqliteDialect):
+            name = "quoted_sqlite"
+
+        conn = sqlite3.connect(":memory:")
+        conn.execute(
+            'create table "my table" ("my id" int primary key, v int)'
+        )
+        conn.execute('insert into "my table" values (1, 0)')
+
+        imp = Importer(
+            connection=conn,
+            data=pd.DataFrame({"my id": [1, 2], "v": [10, 20]}),
+            table="my table",
+            dialect=QuotedSqliteDialect(),
+        )
+        imp.run(update=True, insert=True)
+
+        self.assertEqual("quoted_sqlite", imp._dialect)
+        self.assertEqual(
+            [(1, 10), (2, 20)],
+            conn.execute('select * from "my table" order by 1').fetchall(),
+        )
+        conn.close()
+
+    def test_base_dialect(self):
+        with self.assertRaises(NotImplementedError):
+            Dialect().update_query('"t"', ["id"], ["v"])
+        # keys of updated rows are output only by dialects supporting it
+        self.assertFalse(SqliteDialect.output_matched)
+        with self.assertRaises(NotImplementedError):
+            SqliteDialect().create_matched_query(["id"])
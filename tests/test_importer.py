@@ -1,9 +1,62 @@
+import decimal
 import sqlite3
 import unittest
+from unittest import mock
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 
 from dbimport.importer import Importer, ImporterError
+from dbimport.sqlcache import SqlCache
+
+
+class FakeMssqlCursor:
+    fast_executemany = False
+    pk = [("id",)]
+    columns = [
+        ("id", "nvarchar", 8, None),
+        ("quantity", "int", 10, 0),
+        ("price", "decimal", 10, 2),
+    ]
+
+    def __init__(self):
+        self.rows = []
+        self.rowcount = -1
+        self.input_sizes = []
+        self.params = []
+
+    def execute(self, query, *args):
+        if "key_column_usage" in query:
+            self.rows = self.pk
+        elif "information_schema.columns" in query:
+            self.rows = self.columns
+        else:
+            self.rows = []
+        return self
+
+    def executemany(self, query, params):
+        self.params.extend(params)
+
+    def fetchall(self):
+        return self.rows
+
+    def setinputsizes(self, sizes):
+        self.input_sizes.append(sizes)
+
+    def close(self):
+        pass
+
+
+class FakeMssqlConnection:
+    def __init__(self):
+        self.cur = FakeMssqlCursor()
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        pass
 
 
 class TestImporter(unittest.TestCase):
@@ -116,6 +169,70 @@ class TestImporter(unittest.TestCase):
         self.assertEqual(exp_table_cols, act_table_cols)
         self.assertEqual(exp_table_cols, act_table_cols_getter)
 
+    def test_table_column_types(self):
+        df = pd.DataFrame(
+            [("ID000001", "Apple", 15, 20.0)],
+            columns=["id", "item", "quantity", "price"],
+        )
+
+        imp = Importer(
+            connection=self.conn, data=df, table="groceries", dialect="sqlite"
+        )
+
+        exp = {
+            "id": ("TEXT", None, None),
+            "item": ("TEXT", None, None),
+            "quantity": ("INT", None, None),
+            "price": ("REAL", None, None),
+        }
+
+        self.assertEqual(exp, dict(imp.table_column_types))
+
+    def test_fill_temp_table_typed_mssql(self):
+        conn = FakeMssqlConnection()
+        df = pd.DataFrame(
+            [("ID000001", 15, 20.005), ("ID000002", None, 19.0)],
+            columns=["id", "quantity", "price"],
+        )
+
+        imp = Importer(connection=conn, data=df, table="groceries")
+        imp.run(update=True)
+
+        exp_input_sizes = [[(-9, 8, 0), (4, 0, 0), (3, 10, 2)], None]
+        exp_params = [
+            ("ID000001", 15, decimal.Decimal("20.01")),
+            ("ID000002", None, decimal.Decimal("19.00")),
+        ]
+
+        self.assertEqual(exp_input_sizes, conn.cur.input_sizes)
+        self.assertEqual(exp_params, conn.cur.params)
+        self.assertEqual(
+            [str, int, decimal.Decimal], [type(v) for v in conn.cur.params[0]]
+        )
+
+    def test_update_unmatched_mssql(self):
+        conn = FakeMssqlConnection()
+        queries = []
+        execute = conn.cur.execute
+        conn.cur.execute = lambda query, *args: (
+            queries.append(query) or execute(query, *args)
+        )
+        df = pd.DataFrame(
+            [("ID000001", 15, 20.0), ("ID000002", 14, 19.0)],
+            columns=["id", "quantity", "price"],
+        )
+
+        imp = Importer(connection=conn, data=df, table="groceries")
+        imp.run(update=True, collect_unmatched=True)
+
+        # matched keys are output by the update, the table isn't joined again
+        self.assertTrue(any("into #dbimport_matched\n" in q for q in queries))
+        (unmatched,) = [q for q in queries if "not exists" in q]
+        self.assertNotIn("[dbo].[groceries]", unmatched)
+        self.assertEqual(0, len(imp.unmatched_keys))
+        # row count not reported by the driver
+        self.assertEqual(2, imp.row_count_updated)
+
     def test_init_empty(self):
         df = pd.DataFrame([], columns=["id", "item", "quantity", "price"])
 
@@ -163,6 +280,216 @@ class TestImporter(unittest.TestCase):
 
         self.assertEqual(exp, act)
 
+    def test_update_arrow(self):
+        values = [
+            ("ID000001", "Apple", 15, 20.0),
+            (None, "Pear", 14, 19.0),
+            ("ID000003", "Orange", 13, None),
+            ("ID000004", "Lemon", 16, 17.0),
+        ]
+
+        table = pa.Table.from_pandas(
+            pd.DataFrame(values, columns=["id", "item", "quantity", "price"])
+        )
+
+        imp = Importer(
+            connection=self.conn,
+            data=table,
+            table="groceries",
+            dialect="sqlite",
+        )
+        imp._chunk_size = 2
+        imp.run(update=True)
+
+        exp = [
+            ("ID000001", "Apple", 15, 20.0),
+            ("ID000002", "Pear", 4, 9.0),
+            ("ID000003", "Orange", 13, None),
+            ("ID000004", "Lemon", 16, 17.0),
+        ]
+        act = list(self.fetchall("groceries"))
+
+        self.assertEqual(exp, act)
+
+    def test_update_changed_only(self):
+        values = [
+            ("ID000001", "Apple", 15, 10.0),
+            ("ID000002", "Pear", 4, 9.0),
+            ("ID000003", "orange", 13, None),
+            ("ID000005", "Lime", 1, 1.0),
+        ]
+        df = pd.DataFrame(values, columns=["id", "item", "quantity", "price"])
+        queries = []
+        self.conn.set_trace_callback(queries.append)
+
+        imp = Importer(
+            connection=self.conn, data=df, table="groceries", dialect="sqlite"
+        )
+        imp.run(update=True, insert=True, changed_only=True)
+
+        exp = [
+            ("ID000001", "Apple", 15, 10.0),
+            ("ID000002", "Pear", 4, 9.0),
+            ("ID000003", "orange", 13, None),
+            ("ID000004", "Lemon", 6, 7.0),
+            ("ID000005", "Lime", 1, 1.0),
+        ]
+        act = list(self.fetchall("groceries"))
+
+        self.assertEqual(exp, act)
+        self.assertEqual(2, imp.row_count_updated)
+        self.assertEqual(1, imp.row_count_inserted)
+
+        # one update per set of changed columns, setting only those
+        updates = [q for q in queries if q.startswith('update "groceries"')]
+        self.assertEqual(2, len(updates))
+        self.assertTrue(
+            any('set "quantity" = ' in q and "price" not in q for q in updates)
+        )
+
+    def test_update_changed_only_many_groups(self):
+        values = [
+            ("ID000001", "Apple", 15, 10.0),
+            ("ID000002", "Pear", 4, 19.0),
+            ("ID000003", "Orange", 13, 18.0),
+            ("ID000004", "Lemon", 6, 7.0),
+        ]
+        df = pd.DataFrame(values, columns=["id", "item", "quantity", "price"])
+
+        imp = Importer(
+            connection=self.conn, data=df, table="groceries", dialect="sqlite"
+        )
+        imp._max_update_groups = 1
+        imp.run(update=True, changed_only=True)
+
+        self.assertEqual(values, list(self.fetchall("groceries")))
+        self.assertEqual(3, imp.row_count_updated)
+
+    def test_update_unmatched(self):
+        values = [
+            ("ID000001", "Apple", 15, 20.0),
+            ("ID000005", "Lime", 1, 1.0),
+            ("ID000003", "Orange", 13, 18.0),
+            ("ID000006", "Kiwi", 2, 2.0),
+        ]
+        df = pd.DataFrame(values, columns=["id", "item", "quantity", "price"])
+
+        for changed_only, insert in ((False, False), (True, True)):
+            imp = Importer(
+                connection=self.conn,
+                data=df,
+                table="groceries",
+                dialect="sqlite",
+            )
+            imp.run(
+                update=True,
+                insert=insert,
+                changed_only=changed_only,
+                collect_unmatched=True,
+            )
+
+            # keys are collected before the insert
+            self.assertEqual(
+                ["ID000005", "ID000006"],
+                sorted(imp.unmatched_keys["id"]),
+            )
+            self.assertEqual(["id"], list(imp.unmatched_keys.columns))
+            self.assertEqual(2, imp.row_count_matched)
+            self.assertEqual(2, imp.stats["rows_unmatched"])
+            self.assertIn("unmatched", imp.stats["durations"])
+
+        self.assertEqual(0, imp.row_count_updated)
+        self.assertEqual(2, imp.row_count_inserted)
+
+    def test_update_unmatched_not_collected(self):
+        df = pd.DataFrame(
+            [("ID000001", "Apple", 15, 20.0)],
+            columns=["id", "item", "quantity", "price"],
+        )
+        imp = Importer(
+            connection=self.conn, data=df, table="groceries", dialect="sqlite"
+        )
+        imp.run(update=True)
+
+        self.assertIsNone(imp.unmatched_keys)
+        self.assertEqual(-1, imp.row_count_matched)
+        self.assertEqual(-1, imp.stats["rows_unmatched"])
+
+    def test_update_cached(self):
+        df = pd.DataFrame(
+            [("ID000001", "Apple", 15, 20.0)],
+            columns=["id", "item", "quantity", "price"],
+        )
+        cache = SqlCache()
+
+        for quantity in (15, 25):
+            df["quantity"] = quantity
+            imp = Importer(
+                connection=self.conn,
+                data=df,
+                table="groceries",
+                dialect="sqlite",
+                cache=cache,
+            )
+            imp.run(update=True)
+
+        # metadata and statements are cached by the first import
+        self.assertEqual(3, cache.misses)
+        self.assertEqual(3, cache.hits)
+        self.assertEqual(["id"], imp.table_primary_key)
+        self.assertEqual(
+            ("ID000001", "Apple", 25, 20.0),
+            next(self.fetchall("groceries")),
+        )
+
+    def test_stats(self):
+        values = [
+            ("ID000001", "Apple", 15, 20.0),
+            ("ID000002", "Pear", 14, 19.0),
+            ("ID000003", "Orange", 13, 18.0),
+        ]
+
+        df = pd.DataFrame(values, columns=["id", "item", "quantity", "price"])
+
+        imp = Importer(
+            connection=self.conn, data=df, table="groceries", dialect="sqlite"
+        )
+        imp._chunk_size = 2
+        imp.run(update=True)
+
+        stats = imp.stats
+        self.assertEqual(3, stats["rows_staged"])
+        self.assertEqual(2, stats["chunks"])
+        self.assertEqual(3, stats["rows_updated"])
+        self.assertEqual(-1, stats["rows_inserted"])
+        self.assertGreater(stats["bytes_sent"], 0)
+        self.assertEqual(2, stats["chunk_size_initial"])
+        self.assertEqual(2, stats["chunk_size"])
+        self.assertEqual(
+            ["stage", "update", "cleanup"], list(stats["durations"])
+        )
+
+    def test_chunk_size_estimated(self):
+        df = pd.DataFrame(
+            {
+                "id": ["ID%06d" % i for i in range(1, 251)],
+                "item": "x" * 1000,
+                "quantity": 1,
+            }
+        )
+
+        imp = Importer(
+            connection=self.conn, data=df, table="groceries", dialect="sqlite"
+        )
+        imp._target_chunk_bytes = 100 * 1024
+        imp.run(update=True, insert=True)
+
+        # rows take over 1 KB each
+        stats = imp.stats
+        self.assertEqual(100, stats["chunk_size_initial"])
+        self.assertEqual(250, stats["rows_staged"])
+        self.assertEqual(250, len(list(self.fetchall("groceries"))))
+
     def test_join_on_column_contains_nulls(self):
         values = [
             ("ID000001", "Apple", 15, 20.0),
@@ -324,3 +651,190 @@ class TestImporter(unittest.TestCase):
                 table="groceries",
                 dialect="sqlite",
             )
+
+    def test_update_chunks(self):
+        values = [
+            ("ID000001", "Apple", 15, 20.0),
+            ("ID000002", "Pear", 14, 19.0),
+            (None, "Orange", 13, 18.0),
+            ("ID000004", "Lemon", 16, 17.0),
+        ]
+
+        df = pd.DataFrame(values, columns=["id", "item", "quantity", "price"])
+        chunks = [
+            df.iloc[:0],
+            df.iloc[:2],
+            pa.Table.from_pandas(df.iloc[2:3], preserve_index=False),
+            pa.RecordBatch.from_pandas(df.iloc[3:], preserve_index=False),
+        ]
+
+        imp = Importer(
+            connection=self.conn,
+            data=iter(chunks),
+            table="groceries",
+            dialect="sqlite",
+        )
+        imp.run(update=True)
+
+        exp = [
+            ("ID000001", "Apple", 15, 20.0),
+            ("ID000002", "Pear", 14, 19.0),
+            ("ID000003", "Orange", 3, 8.0),
+            ("ID000004", "Lemon", 16, 17.0),
+        ]
+        act = list(self.fetchall("groceries"))
+
+        self.assertEqual(exp, act)
+        self.assertEqual(3, imp.stats["rows_staged"])
+
+        with self.assertRaisesRegex(
+            ImporterError, "data chunks can only be imported once"
+        ):
+            imp.run(update=True)
+
+    def test_update_chunks_sql_reader(self):
+        source = sqlite3.connect(":memory:")
+        self.addCleanup(source.close)
+        source.execute("create table source (id text, quantity int)")
+        source.executemany(
+            "insert into source values (?, ?)",
+            [("ID%06d" % i, 20 + i) for i in range(1, 5)],
+        )
+
+        # sqlite objects can only be used by the thread that created them
+        imp = Importer(
+            connection=self.conn,
+            data=pd.read_sql_query(
+                "select * from source", source, chunksize=2
+            ),
+            table="groceries",
+            dialect="sqlite",
+        )
+        imp.run(update=True)
+
+        self.assertEqual(
+            [21, 22, 23, 24],
+            [
+                quantity
+                for quantity, in self.fetchall(
+                    "groceries", "select quantity from {table} order by id"
+                )
+            ],
+        )
+        self.assertEqual(4, imp.stats["rows_staged"])
+
+    def test_update_chunks_empty(self):
+        df = pd.DataFrame(columns=["id", "item", "quantity", "price"])
+
+        with self.assertRaisesRegex(ValueError, "data contains no records"):
+            Importer(
+                connection=self.conn,
+                data=iter([df, df]),
+                table="groceries",
+                dialect="sqlite",
+            )
+
+    def test_update_chunks_duplicate_values(self):
+        chunks = [
+            pd.DataFrame({"id": ["ID000001", "ID000002"], "quantity": [1, 2]}),
+            pd.DataFrame({"id": ["ID000003", "ID000001"], "quantity": [3, 4]}),
+        ]
+
+        imp = Importer(
+            connection=self.conn,
+            data=iter(chunks),
+            table="groceries",
+            dialect="sqlite",
+        )
+
+        with self.assertRaisesRegex(
+            ImporterError,
+            "data contains duplicate values in join on column: 'id'",
+        ):
+            imp.run(update=True)
+
+        exp = [5, 4, 3, 6]
+        act = [
+            r[0]
+            for r in self.fetchall("groceries", "select quantity from {table}")
+        ]
+        self.assertEqual(exp, act)
+
+    def test_update_chunks_hash_collisions(self):
+        chunks = [
+            pd.DataFrame({"id": ["ID000001", "ID000002"], "quantity": [1, 2]}),
+            pd.DataFrame({"id": ["ID000003", "ID000004"], "quantity": [3, 4]}),
+        ]
+
+        # every key has the same hash, keys are told apart by value
+        with mock.patch(
+            "dbimport.keys.hash_keys",
+            lambda keys: np.zeros(len(keys), dtype=np.uint64),
+        ):
+            imp = Importer(
+                connection=self.conn,
+                data=iter(chunks),
+                table="groceries",
+                dialect="sqlite",
+            )
+            imp.run(update=True)
+
+        self.assertEqual(4, imp.row_count_updated)
+
+    def test_update_chunks_widened_keys(self):
+        """schema_number_pk"""
+        # key column types widen mid-stream, as read by `iter_csv`
+        chunks = [
+            pa.table({"number": [1, 2], "quantity": [11, 12]}),
+            pa.table({"number": [2.5, 3.0], "quantity": [13, 14]}),
+            pa.table({"number": ["X1"], "quantity": [15]}),
+        ]
+
+        imp = Importer(
+            connection=self.conn,
+            data=iter(chunks),
+            table="groceries",
+            dialect="sqlite",
+        )
+        imp.run(update=True)
+
+        self.assertEqual(
+            [11, 12, 14, 6],
+            [
+                r[0]
+                for r in self.fetchall(
+                    "groceries", "select quantity from {table} order by number"
+                )
+            ],
+        )
+
+        chunks[2] = pa.table({"number": [1.0], "quantity": [15]})
+        imp = Importer(
+            connection=self.conn,
+            data=iter(chunks),
+            table="groceries",
+            dialect="sqlite",
+        )
+        with self.assertRaisesRegex(
+            ImporterError,
+            "data contains duplicate values in join on column: 'number'",
+        ):
+            imp.run(update=True)
+
+    def test_update_chunks_different_columns(self):
+        chunks = [
+            pd.DataFrame({"id": ["ID000001"], "quantity": [1]}),
+            pd.DataFrame({"id": ["ID000002"], "price": [2.0]}),
+        ]
+
+        imp = Importer(
+            connection=self.conn,
+            data=iter(chunks),
+            table="groceries",
+            dialect="sqlite",
+        )
+
+        with self.assertRaisesRegex(
+            ImporterError, "data chunks must contain the same columns"
+        ):
+            imp.run(update=True)
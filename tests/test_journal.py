@@ -0,0 +1,90 @@
+import sqlite3
+import unittest
+
+import pandas as pd
+
+from dbimport import journal
+from dbimport.importer import Importer, ImporterError
+
+
+class TestJournal(unittest.TestCase):
+    schema = """create table groceries (
+        id text not null primary key,
+        item text,
+        quantity int,
+        price real
+        );
+
+    insert into groceries values ('ID000001', 'Apple', 5, 10.0);
+    insert into groceries values ('ID000002', 'Pear', 4, 9.0);
+    insert into groceries values ('ID000003', 'Orange', 3, 8.0);
+    """
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.executescript(self.schema)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def fetchall(self):
+        return self.conn.execute(
+            "select * from groceries order by id"
+        ).fetchall()
+
+    def run_import(self, values, **kwargs):
+        imp = Importer(
+            connection=self.conn,
+            data=pd.DataFrame(values, columns=["id", "quantity", "price"]),
+            table="groceries",
+            dialect="sqlite",
+        )
+        imp.run(update=True, **kwargs)
+        return imp
+
+    def test_run_without_journal(self):
+        imp = self.run_import([("ID000001", 15, 20.0)])
+
+        self.assertIsNone(imp.run_id)
+        self.assertEqual([], journal.get_runs(self.conn, "sqlite"))
+
+    def test_undo(self):
+        before = self.fetchall()
+        imp = self.run_import(
+            [("ID000001", 15, 20.0), ("ID000003", 13, None)], journal=True
+        )
+
+        self.assertIn("journal", imp.stats["durations"])
+        (run,) = journal.get_runs(self.conn, "sqlite")
+        self.assertEqual(imp.run_id, run["run_id"])
+        self.assertEqual("groceries", run["table_name"])
+        self.assertEqual(["id"], run["join_on"])
+        self.assertEqual(["quantity", "price"], run["subset"])
+
+        # only the matched rows are journaled
+        self.assertEqual(
+            [("ID000001", 5, 10.0), ("ID000003", 3, 8.0)],
+            self.conn.execute(
+                "select * from dbimport_undo_%s order by id" % imp.run_id
+            ).fetchall(),
+        )
+
+        self.assertEqual(2, journal.undo(self.conn, imp.run_id, "sqlite"))
+        self.assertEqual(before, self.fetchall())
+        self.assertEqual([], journal.get_runs(self.conn, "sqlite"))
+
+    def test_undo_unknown_run(self):
+        with self.assertRaisesRegex(
+            ImporterError, "import run 'abc' not found in journal"
+        ):
+            journal.undo(self.conn, "abc", "sqlite")
+
+    def test_discard(self):
+        imp = self.run_import([("ID000001", 15, 20.0)], journal=True)
+
+        journal.discard(self.conn, imp.run_id, "sqlite")
+
+        self.assertEqual([], journal.get_runs(self.conn, "sqlite"))
+        self.assertEqual(("ID000001", "Apple", 15, 20.0), self.fetchall()[0])
+        with self.assertRaises(ImporterError):
+            journal.undo(self.conn, imp.run_id, "sqlite")
@@ -0,0 +1,118 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from dbimport.keys import KeyIndex, duplicated_keys, encode_keys, hash_keys
+
+
+class TestKeys(unittest.TestCase):
+    keys = pd.DataFrame(
+        {
+            "a": ["x", "y", "x", "x", None, None],
+            "b": [1, 1, 1, 2, 1, 1],
+            "c": ["p", "q", "p", "p", "r", "r"],
+        }
+    )
+
+    def test_encode_keys(self):
+        codes = encode_keys(self.keys)
+
+        self.assertEqual(np.int64, codes.dtype)
+        self.assertEqual(codes[0], codes[2])
+        self.assertEqual(codes[4], codes[5])
+        self.assertEqual(4, len(set(codes)))
+
+    def test_encode_keys_arrow(self):
+        table = pa.Table.from_batches(
+            pa.Table.from_pandas(self.keys).to_batches(max_chunksize=2)
+        )
+
+        np.testing.assert_array_equal(
+            pd.factorize(encode_keys(self.keys))[0],
+            pd.factorize(encode_keys(table))[0],
+        )
+
+    def test_encode_keys_wide(self):
+        # combined cardinality of the columns overflows int64
+        rng = np.random.default_rng(0)
+        keys = pd.DataFrame(
+            {"c%d" % i: rng.integers(0, 1000, 500) for i in range(10)}
+        )
+        keys = pd.concat([keys, keys.iloc[[7, 3]]], ignore_index=True)
+
+        np.testing.assert_array_equal(
+            keys.duplicated().to_numpy(), duplicated_keys(keys)
+        )
+
+    def test_duplicated_keys(self):
+        np.testing.assert_array_equal(
+            [False, False, True, False, False, True],
+            duplicated_keys(self.keys),
+        )
+        np.testing.assert_array_equal(
+            [False, False, True, False, False, True],
+            duplicated_keys(pa.Table.from_pandas(self.keys)),
+        )
+
+    def test_hash_keys(self):
+        keys = pd.DataFrame({"a": ["x", "y", "x"], "b": [1, 1, 1]})
+
+        hashes = hash_keys(keys)
+
+        self.assertEqual(np.uint64, hashes.dtype)
+        self.assertEqual(hashes[0], hashes[2])
+        self.assertNotEqual(hashes[0], hashes[1])
+
+    def test_key_index(self):
+        index = KeyIndex()
+
+        np.testing.assert_array_equal(
+            [False, False, True], index.add(pd.DataFrame({"k": [5, 3, 5]}))
+        )
+        np.testing.assert_array_equal(
+            [True, False, False, True],
+            index.add(pd.DataFrame({"k": [3, 9, 1, 9]})),
+        )
+        self.assertEqual(4, len(index))
+        # hashes and key values
+        self.assertEqual(64, index.nbytes)
+        np.testing.assert_array_equal(
+            [False], index.add(pd.DataFrame({"k": [2]}))
+        )
+
+    def test_key_index_collisions(self):
+        index = KeyIndex()
+        hashes = np.zeros(2, dtype=np.uint64)
+
+        np.testing.assert_array_equal(
+            [False, False],
+            index.add(pd.DataFrame({"k": ["a", "b"]}), hashes),
+        )
+        np.testing.assert_array_equal(
+            [False, True],
+            index.add(pd.DataFrame({"k": ["c", "a"]}), hashes),
+        )
+        # null keys are equal to each other only
+        nulls = pd.DataFrame({"k": [None, "d"]})
+        np.testing.assert_array_equal([False, False], index.add(nulls, hashes))
+        np.testing.assert_array_equal([True, True], index.add(nulls, hashes))
+        self.assertEqual(5, len(index))
+
+    def test_key_index_many_chunks(self):
+        # keys spread over several sorted runs are all found
+        rng = np.random.default_rng(0)
+        index = KeyIndex()
+        seen = set()
+        for _ in range(50):
+            keys = rng.integers(0, 5000, 200)
+            exp = []
+            for value in keys.tolist():
+                exp.append(value in seen)
+                seen.add(value)
+
+            np.testing.assert_array_equal(
+                exp, index.add(pd.DataFrame({"k": keys}))
+            )
+        self.assertEqual(len(seen), len(index))
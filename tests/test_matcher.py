@@ -0,0 +1,133 @@
+import unittest
+from collections import OrderedDict
+
+from dbimport.matcher import (
+    ColumnMatcher,
+    edit_distance,
+    match_columns,
+    normalize_name,
+    suggest_join_on,
+)
+
+
+class TestMatcher(unittest.TestCase):
+    def test_normalize_name(self):
+        cases = {
+            "Order ID": "orderid",
+            "order_id": "orderid",
+            "OrderId": "orderid",
+            "ORDER-ID": "orderid",
+            " Qty. ": "qty",
+            "Цена за ед.": "ценазаед",
+            "Straße": "strasse",
+            "Prix_unitaire_€": "prixunitaire",
+            "--": "",
+        }
+
+        for name, exp in cases.items():
+            self.assertEqual(exp, normalize_name(name))
+
+    def test_edit_distance(self):
+        self.assertEqual(0, edit_distance("price", "price"))
+        self.assertEqual(1, edit_distance("price", "prices"))
+        self.assertEqual(3, edit_distance("kitten", "sitting"))
+        self.assertEqual(5, edit_distance("", "price"))
+        self.assertEqual(2, edit_distance("kitten", "sitting", limit=1))
+
+    def test_match_columns(self):
+        table_columns = OrderedDict(
+            [
+                ("OrderId", "int"),
+                ("CustomerName", "nvarchar(100)"),
+                ("UnitPrice", "decimal(10, 2)"),
+                ("Quantity", "int"),
+                ("Comment", "nvarchar(max)"),
+            ]
+        )
+        file_columns = OrderedDict(
+            [
+                ("order_id", "number"),
+                ("Customer Name", "text"),
+                ("unit prices", "decimal"),
+                ("Qty", "number"),
+                ("Notes", "text"),
+            ]
+        )
+
+        self.assertEqual(
+            OrderedDict(
+                [
+                    ("order_id", "OrderId"),
+                    ("Customer Name", "CustomerName"),
+                    ("unit prices", "UnitPrice"),
+                ]
+            ),
+            match_columns(file_columns, table_columns),
+        )
+
+    def test_match_columns_non_ascii(self):
+        table_columns = OrderedDict(
+            [("Цена", "decimal(10, 2)"), ("Код", "int"), ("--", "int")]
+        )
+
+        self.assertEqual(
+            {}, match_columns({"Итого": "decimal", "__": "int"}, table_columns)
+        )
+        self.assertEqual(
+            {"цена": "Цена", "КОД": "Код"},
+            match_columns({"цена": "decimal", "КОД": "int"}, table_columns),
+        )
+
+    def test_match_columns_one_to_one(self):
+        table_columns = {"Name": "nvarchar(50)"}
+        file_columns = OrderedDict([("name", "text"), ("NAME", "text")])
+
+        self.assertEqual(
+            {"name": "Name"}, match_columns(file_columns, table_columns)
+        )
+
+    def test_match_columns_exact_name_first(self):
+        table_columns = OrderedDict([("Name", "nvarchar(50)")])
+        file_columns = OrderedDict([("name", "text"), ("Name", "text")])
+
+        self.assertEqual(
+            {"Name": "Name"}, match_columns(file_columns, table_columns)
+        )
+
+    def test_match_columns_data_type(self):
+        table_columns = OrderedDict(
+            [("Amount1", "nvarchar(10)"), ("Amount2", "int")]
+        )
+        matcher = ColumnMatcher(table_columns)
+
+        # same name similarity, implicit cast wins
+        self.assertEqual(
+            ["Amount2", "Amount1"],
+            [c for _, c in matcher.scores("Amount", "number")],
+        )
+
+        self.assertEqual({}, match_columns({"Amount1": "bool"}, {"X": "int"}))
+
+    def test_match_columns_wide_table(self):
+        table_columns = OrderedDict(
+            ("Measure%04d" % i, "float") for i in range(5000)
+        )
+        file_columns = OrderedDict(
+            ("measure_%04d" % i, "decimal") for i in range(0, 5000, 7)
+        )
+
+        mapping = match_columns(file_columns, table_columns)
+        self.assertEqual(len(file_columns), len(mapping))
+        for file_col, table_col in mapping.items():
+            self.assertEqual(normalize_name(file_col), table_col.lower())
+
+    def test_suggest_join_on(self):
+        mapping = OrderedDict([("order_id", "OrderId"), ("line", "LineNo")])
+
+        self.assertEqual(["order_id"], suggest_join_on(mapping, ["OrderId"]))
+        self.assertEqual(
+            ["line", "order_id"],
+            suggest_join_on(mapping, ["LineNo", "OrderId"]),
+        )
+        self.assertEqual([], suggest_join_on(mapping, ["OrderId", "Other"]))
+        self.assertEqual([], suggest_join_on(mapping, []))
@@ -0,0 +1,169 @@
+import unittest
+from collections import OrderedDict
+
+from PySide2.QtCore import QCoreApplication, Qt
+
+from dbimport.models import ColumnMappingModel
+
+
+class TestColumnMappingModel(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def setUp(self):
+        self.model = ColumnMappingModel()
+        self.model.set_table_columns(
+            OrderedDict(
+                [
+                    ("id", "nvarchar"),
+                    ("quantity", "int"),
+                    ("price", "decimal"),
+                ]
+            )
+        )
+        self.model.set_file_columns(
+            OrderedDict(
+                [("ID", "text"), ("Qty", "number"), ("Price", "decimal")]
+            )
+        )
+
+        self.changes = 0
+        self.model.mappingChanged.connect(self._mapping_changed)
+
+    def _mapping_changed(self):
+        self.changes += 1
+
+    def test_set_mapping(self):
+        self.model.set_mapping(0, "ID")
+        self.model.set_mapping(1, "Qty")
+
+        self.assertEqual(
+            OrderedDict([("ID", "id"), ("Qty", "quantity")]),
+            self.model.subset(),
+        )
+        self.assertEqual(2, self.model.subset_count)
+        self.assertEqual(2, self.changes)
+        self.assertEqual(
+            "Qty", self.model.data(self.model.index(1, 2), Qt.DisplayRole)
+        )
+        self.assertEqual(
+            ["", "Qty", "Price"], self.model.available_file_columns(1)
+        )
+
+        with self.assertRaisesRegex(ValueError, "unknown file column 'X'"):
+            self.model.set_mapping(2, "X")
+
+    def test_set_mapping_move(self):
+        self.model.set_mapping(0, "ID")
+        self.model.set_join(0, True)
+
+        # a file column mapped to another row is moved with its join flag
+        # cleared
+        self.model.set_mapping(2, "ID")
+
+        self.assertEqual(OrderedDict([("ID", "price")]), self.model.subset())
+        self.assertEqual(OrderedDict(), self.model.join_on())
+        self.assertEqual(0, self.model.join_count)
+        self.assertEqual(1, self.model.subset_count)
+        self.assertEqual(
+            "", self.model.data(self.model.index(0, 2), Qt.DisplayRole)
+        )
+        self.assertEqual(
+            Qt.Unchecked,
+            self.model.data(self.model.index(2, 4), Qt.CheckStateRole),
+        )
+
+    def test_unmap(self):
+        self.model.set_mapping(0, "ID")
+        self.model.set_mapping(1, "Qty")
+        self.model.set_join(0, True)
+        self.model.set_join(1, True)
+        self.assertEqual(2, self.model.join_count)
+        self.assertEqual(0, self.model.subset_count)
+
+        self.model.set_mapping(0, None)
+
+        self.assertEqual(1, self.model.join_count)
+        self.assertEqual(0, self.model.subset_count)
+        self.assertEqual(
+            OrderedDict([("Qty", "quantity")]), self.model.join_on()
+        )
+
+        # unmapped rows can't be joined on
+        self.model.set_join(0, True)
+        self.assertEqual(1, self.model.join_count)
+
+        # unmapping a row that isn't mapped changes nothing
+        changes = self.changes
+        self.model.set_mapping(0, None)
+        self.assertEqual(changes, self.changes)
+        self.assertEqual(1, self.model.join_count)
+
+    def test_set_data(self):
+        self.assertTrue(
+            self.model.setData(self.model.index(0, 2), "ID", Qt.EditRole)
+        )
+        self.assertTrue(
+            self.model.setData(
+                self.model.index(0, 4), Qt.Checked, Qt.CheckStateRole
+            )
+        )
+
+        self.assertEqual(OrderedDict([("ID", "id")]), self.model.join_on())
+        self.assertEqual(1, self.model.join_count)
+
+        self.assertTrue(
+            self.model.setData(self.model.index(0, 2), "", Qt.EditRole)
+        )
+        self.assertEqual(0, self.model.join_count)
+        self.assertEqual(0, self.model.subset_count)
+
+    def test_apply_mapping(self):
+        self.model.set_mapping(2, "Price")
+
+        self.model.apply_mapping(
+            OrderedDict(
+                [
+                    ("ID", "id"),
+                    # table column already mapped
+                    ("Qty", "id"),
+                    # unknown columns
+                    ("Price", "cost"),
+                    ("Total", "quantity"),
+                ]
+            ),
+            join_on=["ID", "Qty"],
+        )
+
+        self.assertEqual(OrderedDict([("ID", "id")]), self.model.join_on())
+        self.assertEqual(OrderedDict(), self.model.subset())
+        self.assertEqual(1, self.model.join_count)
+        self.assertEqual(0, self.model.subset_count)
+
+        # the current mapping is replaced
+        self.model.apply_mapping(
+            OrderedDict([("Qty", "quantity"), ("Price", "price")]),
+            join_on=["Price"],
+        )
+
+        self.assertEqual(
+            OrderedDict([("Qty", "quantity")]), self.model.subset()
+        )
+        self.assertEqual(
+            OrderedDict([("Price", "price")]), self.model.join_on()
+        )
+        self.assertEqual(1, self.model.join_count)
+        self.assertEqual(1, self.model.subset_count)
+
+    def test_reset(self):
+        self.model.set_mapping(0, "ID")
+        self.model.set_join(0, True)
+
+        self.model.set_file_columns(OrderedDict([("ID", "text")]))
+
+        self.assertEqual(0, self.model.join_count)
+        self.assertEqual(0, self.model.subset_count)
+        self.assertEqual(
+            Qt.ItemIsEnabled, self.model.flags(self.model.index(0, 4))
+        )
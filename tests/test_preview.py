@@ -0,0 +1,87 @@
+import datetime
+import unittest
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from dbimport.preview import ColumnStats, DataPreview, format_value
+
+
+class TestPreview(unittest.TestCase):
+    frame = pd.DataFrame(
+        {
+            "id": ["ID000001", "ID000002", None, "ID000002"],
+            "quantity": [15, 14, 13, 14],
+            "price": [20.5, np.nan, 18.0, 17.0],
+            "item": pd.Categorical(["Pear", "Apple", "Pear", None]),
+            "mixed": [1, "a", None, 2.5],
+        }
+    )
+
+    def test_format_value(self):
+        self.assertEqual("", format_value(None))
+        self.assertEqual("", format_value(np.nan))
+        self.assertEqual("", format_value(pd.NaT))
+        self.assertEqual("1.5", format_value(1.5))
+        self.assertEqual(
+            "2020-01-02", format_value(pd.Timestamp("2020-01-02"))
+        )
+        self.assertEqual(
+            "2020-01-02 03:04:00",
+            format_value(pd.Timestamp("2020-01-02 03:04")),
+        )
+        self.assertEqual("[1, 2]", format_value([1, 2]))
+
+    def test_frame(self):
+        preview = DataPreview(self.frame)
+
+        self.assertEqual(4, preview.row_count)
+        self.assertEqual(list(self.frame.columns), preview.columns)
+        self.assertEqual("ID000002", preview.text(1, 0))
+        self.assertEqual("", preview.text(2, 0))
+        self.assertEqual("", preview.text(1, 2))
+
+        self.assertEqual(
+            ColumnStats(1, 2, "ID000001", "ID000002"), preview.column_stats(0)
+        )
+        self.assertEqual(ColumnStats(0, 3, 13, 15), preview.column_stats(1))
+        self.assertEqual(
+            ColumnStats(1, 3, 17.0, 20.5), preview.column_stats(2)
+        )
+        self.assertEqual(
+            ColumnStats(1, 2, "Apple", "Pear"), preview.column_stats(3)
+        )
+        self.assertEqual(ColumnStats(1, 3, "1", "a"), preview.column_stats(4))
+
+    def test_arrow(self):
+        table = pa.Table.from_pandas(
+            self.frame.drop(columns="mixed"), preserve_index=False
+        )
+        preview = DataPreview(table)
+
+        self.assertEqual(4, preview.row_count)
+        self.assertEqual("ID000002", preview.text(1, 0))
+        self.assertEqual("", preview.text(2, 0))
+        self.assertEqual(
+            ColumnStats(1, 2, "ID000001", "ID000002"), preview.column_stats(0)
+        )
+        self.assertEqual(ColumnStats(0, 3, 13, 15), preview.column_stats(1))
+        self.assertEqual(
+            ColumnStats(1, 3, 17.0, 20.5), preview.column_stats(2)
+        )
+        self.assertEqual(
+            ColumnStats(1, 2, "Apple", "Pear"), preview.column_stats(3)
+        )
+
+    def test_stats_empty_and_cached(self):
+        preview = DataPreview(
+            pd.DataFrame({"a": [None, None]}, dtype=object).assign(
+                b=[datetime.date(2020, 1, 1)] * 2
+            )
+        )
+
+        self.assertEqual(
+            ColumnStats(2, 0, None, None), preview.column_stats(0)
+        )
+        self.assertIs(preview.column_stats(1), preview.column_stats(1))
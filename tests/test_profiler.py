@@ -0,0 +1,97 @@
+import json
+import os
+import pstats
+import sqlite3
+import tempfile
+import tracemalloc
+import unittest
+
+import pandas as pd
+
+from dbimport.importer import Importer
+from dbimport.profiler import Profiler
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = os.path.join(self.tmp_dir.name, "profile")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_phase(self):
+        profiler = Profiler(self.dir)
+
+        with profiler.phase("allocate"):
+            blocks = [bytearray(1024) for _ in range(1000)]
+
+        self.assertEqual(1000, len(blocks))
+        self.assertFalse(tracemalloc.is_tracing())
+
+        (phase,) = profiler.phases
+        self.assertEqual("allocate", phase["name"])
+        self.assertGreaterEqual(phase["memory_peak"], 1000 * 1024)
+        self.assertEqual("01-allocate.pstats", phase["stats"])
+
+        stats = pstats.Stats(os.path.join(self.dir, phase["stats"]))
+        self.assertGreater(stats.total_calls, 0)
+
+        with open(os.path.join(self.dir, phase["allocations"])) as f:
+            self.assertIn("test_profiler.py", f.read())
+
+        with open(os.path.join(self.dir, "summary.json")) as f:
+            self.assertEqual(
+                ["allocate"], [p["name"] for p in json.load(f)["phases"]]
+            )
+
+    def test_phase_error(self):
+        profiler = Profiler(self.dir)
+
+        with self.assertRaises(ValueError):
+            with profiler.phase("fail"):
+                raise ValueError
+
+        self.assertEqual(["fail"], [p["name"] for p in profiler.phases])
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_importer_run(self):
+        conn = sqlite3.connect(":memory:")
+        conn.execute("create table t (id int primary key, value text)")
+        conn.execute("insert into t values (1, 'a')")
+
+        imp = Importer(
+            connection=conn,
+            data=pd.DataFrame({"id": [1], "value": ["b"]}),
+            table="t",
+            dialect="sqlite",
+        )
+        profiler = Profiler(self.dir)
+        imp.run(update=True, profiler=profiler)
+        conn.close()
+
+        self.assertEqual(
+            ["stage", "update", "cleanup"],
+            [p["name"] for p in profiler.phases],
+        )
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.dir, "03-cleanup.pstats"))
+        )
+
+    def test_importer_profile_conversion(self):
+        conn = sqlite3.connect(":memory:")
+        conn.execute("create table t (id int primary key, value text)")
+
+        imp = Importer(
+            connection=conn,
+            data=pd.DataFrame({"id": range(100), "value": "b"}),
+            table="t",
+            dialect="sqlite",
+        )
+        profiler = Profiler(self.dir)
+        imp.run(update=True, profiler=profiler)
+        conn.close()
+
+        # chunks are converted on the profiled thread
+        stats = pstats.Stats(os.path.join(self.dir, "01-stage.pstats"))
+        self.assertIn("_iter_chunks", [func for _, _, func in stats.stats])
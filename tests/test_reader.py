@@ -0,0 +1,364 @@
+import datetime
+import os.path
+import tempfile
+import unittest
+from collections import OrderedDict
+
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather
+import pyarrow.ipc
+import pyarrow.parquet
+
+from dbimport.reader import (
+    compact_frame,
+    compact_table,
+    get_arrow_columns,
+    get_file_format,
+    get_frame_columns,
+    get_memory_usage,
+    infer_csv_schema,
+    iter_csv,
+    read_csv,
+    read_excel,
+    read_sheet,
+    read_sheet_names,
+    select_columns,
+)
+
+
+class TestReader(unittest.TestCase):
+    table = pa.table(
+        {
+            "id": pa.array(["ID000001", "ID000002"]),
+            "quantity": pa.array([15, 14], pa.int32()),
+            "price": pa.array([20.0, None]),
+            "updated": pa.array([0, 1], pa.timestamp("ms")),
+        }
+    )
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.dir.name, name)
+
+    def test_get_file_format(self):
+        cases = {
+            "file.xlsx": "excel",
+            "file.XLSX": "excel",
+            "file.parquet": "parquet",
+            "file.feather": "arrow",
+            "file.arrow": "arrow",
+            "file.ipc": "arrow",
+            "file.csv": "csv",
+            "file.tsv": "csv",
+        }
+
+        for fp, exp in cases.items():
+            self.assertEqual(exp, get_file_format(fp))
+
+        with self.assertRaisesRegex(
+            ValueError, "unsupported file format '.xls'"
+        ):
+            get_file_format("file.xls")
+
+    def test_get_arrow_columns(self):
+        exp = OrderedDict(
+            [
+                ("id", "text"),
+                ("quantity", "number"),
+                ("price", "decimal"),
+                ("updated", "datetime"),
+            ]
+        )
+
+        self.assertEqual(exp, get_arrow_columns(self.table))
+
+    def test_read_sheet_arrow(self):
+        fp_parquet = self.path("groceries.parquet")
+        pyarrow.parquet.write_table(self.table, fp_parquet)
+
+        fp_feather = self.path("groceries.feather")
+        pyarrow.feather.write_feather(self.table, fp_feather)
+
+        fp_stream = self.path("groceries.arrow")
+        with pa.OSFile(fp_stream, "wb") as sink:
+            with pyarrow.ipc.new_stream(sink, self.table.schema) as writer:
+                writer.write_table(self.table)
+
+        for fp in (fp_parquet, fp_feather, fp_stream):
+            columns, data = read_sheet(fp, "groceries")
+
+            self.assertEqual(get_arrow_columns(self.table), columns)
+            # compacted, with the same values
+            self.assertEqual(pa.int8(), data.schema.field("quantity").type)
+            self.assertEqual(self.table.to_pylist(), data.to_pylist())
+
+    def test_read_sheet_csv(self):
+        text = (
+            "id;item;quantity;price;updated\n"
+            "ID000001;Apple;15;20.5;2021-05-01 10:00:00\n"
+            "ID000002;;14;;2021-05-02\n"
+            "ID000003;Orange;;18;\n"
+        )
+        fp = self.path("groceries.csv")
+        with open(fp, "w") as f:
+            f.write(text)
+
+        columns, data = read_sheet(fp, "groceries")
+
+        exp_columns = OrderedDict(
+            [
+                ("id", "text"),
+                ("item", "text"),
+                ("quantity", "number"),
+                ("price", "decimal"),
+                ("updated", "datetime"),
+            ]
+        )
+        exp_data = [
+            ("ID000001", "Apple", 15, 20.5, pd.Timestamp("2021-05-01 10:00")),
+            ("ID000002", None, 14, None, pd.Timestamp("2021-05-02")),
+            ("ID000003", "Orange", None, 18.0, None),
+        ]
+
+        self.assertEqual(exp_columns, columns)
+        self.assertEqual(
+            exp_data, list(zip(*(c.to_pylist() for c in data.columns)))
+        )
+
+    def test_infer_csv_schema_sample(self):
+        fp = self.path("codes.tsv")
+        with open(fp, "w") as f:
+            f.write("code\tname\n1\tOne\n2\tTwo\nA3\tThree\n")
+
+        self.assertEqual(
+            pa.schema([("code", pa.int64()), ("name", pa.string())]),
+            infer_csv_schema(fp, "\t", sample_rows=2),
+        )
+        self.assertEqual(
+            pa.schema([("code", pa.string()), ("name", pa.string())]),
+            infer_csv_schema(fp, "\t"),
+        )
+
+        # values outside of the sample widen the column
+        columns, data = read_sheet(fp, "codes", sample_rows=2)
+
+        self.assertEqual("text", columns["code"])
+        self.assertEqual(["1", "2", "A3"], data["code"].to_pylist())
+
+    def test_read_csv_widen(self):
+        fp = self.path("amounts.csv")
+        with open(fp, "w") as f:
+            f.write("id,amount,code\n")
+            f.writelines("%d,%d,%d\n" % (i, i, i) for i in range(2000))
+            f.write("2000,3.5,X1\n")
+
+        table = read_csv(fp)
+
+        self.assertEqual(
+            pa.schema(
+                [
+                    ("id", pa.int64()),
+                    ("amount", pa.float64()),
+                    ("code", pa.string()),
+                ]
+            ),
+            table.schema,
+        )
+        self.assertEqual(3.5, table["amount"][2000].as_py())
+        self.assertEqual(
+            ["0", "X1"], table["code"].take([0, 2000]).to_pylist()
+        )
+        self.assertEqual(100, read_csv(fp, nrows=100).num_rows)
+
+    def test_read_csv_invalid(self):
+        fp = self.path("amounts.csv")
+        with open(fp, "w") as f:
+            f.write("id,amount\n")
+            f.writelines("%d,%d\n" % (i, i) for i in range(2000))
+            f.write("2000,1,2\n")
+
+        # errors not naming a column don't widen columns
+        with self.assertRaisesRegex(pa.ArrowInvalid, "Expected 2 columns"):
+            read_csv(fp)
+        with self.assertRaisesRegex(pa.ArrowInvalid, "Expected 2 columns"):
+            list(iter_csv(fp))
+
+    def test_iter_csv(self):
+        # larger than a single block, so batches are read before the
+        # value that doesn't fit the sampled column type
+        rows = 200000
+        fp = self.path("amounts.csv")
+        with open(fp, "w") as f:
+            f.write("id,amount\n")
+            f.writelines("%d,%d\n" % (i, i) for i in range(rows))
+            f.write("%d,3.5\n" % rows)
+
+        batches = list(iter_csv(fp))
+
+        self.assertGreater(len(batches), 1)
+        self.assertEqual(pa.int64(), batches[0].schema.field("amount").type)
+        self.assertEqual(pa.float64(), batches[-1].schema.field("amount").type)
+        self.assertEqual(
+            list(range(rows + 1)),
+            [v for b in batches for v in b.column(0).to_pylist()],
+        )
+        self.assertEqual(3.5, batches[-1].column(1)[-1].as_py())
+
+    def test_read_sheet_names(self):
+        fp = self.path("groceries.xlsx")
+        with pd.ExcelWriter(fp) as writer:
+            for sheet in ("Data", "Lookup", "Notes"):
+                pd.DataFrame({"a": [1]}).to_excel(
+                    writer, sheet_name=sheet, index=False
+                )
+
+        self.assertEqual(["Data", "Lookup", "Notes"], read_sheet_names(fp))
+        self.assertEqual(
+            ["groceries"], read_sheet_names(self.path("groceries.csv"))
+        )
+        self.assertEqual(
+            ["groceries"], read_sheet_names(self.path("groceries.parquet"))
+        )
+
+    def test_read_sheet_preview(self):
+        table = pa.table({"id": ["ID%06d" % i for i in range(10)]})
+        paths = {
+            "xlsx": self.path("groceries.xlsx"),
+            "parquet": self.path("groceries.parquet"),
+            "feather": self.path("groceries.feather"),
+            "csv": self.path("groceries.csv"),
+        }
+        table.to_pandas().to_excel(paths["xlsx"], index=False)
+        pyarrow.parquet.write_table(table, paths["parquet"], row_group_size=3)
+        pyarrow.feather.write_feather(table, paths["feather"])
+        table.to_pandas().to_csv(paths["csv"], index=False)
+
+        for fp in paths.values():
+            sheet = read_sheet_names(fp)[0]
+            _, head = read_sheet(fp, sheet, nrows=4)
+            _, data = read_sheet(fp, sheet)
+
+            if isinstance(head, pa.Table):
+                head = head.to_pandas()
+
+            self.assertEqual(10, len(data))
+            self.assertEqual(
+                ["ID%06d" % i for i in range(4)], head["id"].tolist()
+            )
+
+    def test_read_excel_preview(self):
+        fp = self.path("groceries.xlsx")
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.title = "Data"
+        # blank header cells, duplicate names and trailing empty columns
+        sheet.append(["id", None, "name", "name", 2021, None])
+        sheet.append([1, 2.5, "Apple", None, datetime.datetime(2021, 5, 1)])
+        sheet.append([])
+        sheet.append([2.0, "#N/A", "Pear", "x", None])
+        for i in range(3, 10):
+            sheet.append([i, i / 2, "Item %d" % i])
+        workbook.save(fp)
+
+        for nrows in (1, 2, 3, 20):
+            exp = pd.read_excel(
+                fp, sheet_name="Data", nrows=nrows, dtype=object
+            ).convert_dtypes()
+            columns, data = read_excel(fp, "Data", nrows=nrows)
+
+            self.assertEqual(get_frame_columns(exp), columns)
+            pd.testing.assert_frame_equal(exp, data)
+
+    def test_select_columns(self):
+        columns = {"id": "key", "price": "value"}
+
+        act_table = select_columns(self.table, columns)
+        act_frame = select_columns(self.table.to_pandas(), columns)
+
+        self.assertEqual(["key", "value"], act_table.column_names)
+        self.assertEqual(["key", "value"], list(act_frame.columns))
+        pd.testing.assert_frame_equal(act_table.to_pandas(), act_frame)
+
+    def test_compact_frame(self):
+        df = pd.DataFrame(
+            {
+                "id": ["ID%06d" % i for i in range(8)],
+                "color": ["red", "blue", None, "red"] * 2,
+                "quantity": [1, 2, None, 300] * 2,
+                "price": [0.5, 1.25, None, 2.0] * 2,
+                "rate": [0.1, 0.2, 0.3, None] * 2,
+                "active": [True, False, None, True] * 2,
+            },
+            dtype=object,
+        ).convert_dtypes()
+
+        compact = compact_frame(df)
+
+        self.assertEqual("category", compact["color"].dtype.name)
+        self.assertEqual("Int16", compact["quantity"].dtype.name)
+        self.assertEqual("Float32", compact["price"].dtype.name)
+        # not exactly representable in single precision
+        self.assertEqual("Float64", compact["rate"].dtype.name)
+        self.assertEqual("boolean", compact["active"].dtype.name)
+        self.assertLess(get_memory_usage(compact), get_memory_usage(df))
+        pd.testing.assert_frame_equal(
+            df.astype(object), compact.astype(object)
+        )
+
+    def test_compact_table(self):
+        table = pa.table(
+            {
+                "id": ["ID%06d" % i for i in range(8)],
+                "color": ["red", "blue", None, "red"] * 2,
+                "quantity": [1, 2, None, 300] * 2,
+                "price": [0.5, 1.25, None, 2.0] * 2,
+                "rate": [0.1, 0.2, 0.3, None] * 2,
+            }
+        )
+
+        compact = compact_table(table)
+
+        self.assertEqual(
+            [
+                pa.string(),
+                pa.dictionary(pa.int32(), pa.string()),
+                pa.int16(),
+                pa.float32(),
+                # not exactly representable in single precision
+                pa.float64(),
+            ],
+            compact.schema.types,
+        )
+        # unchanged columns aren't copied
+        self.assertEqual(
+            table["id"].chunk(0).buffers()[2].address,
+            compact["id"].chunk(0).buffers()[2].address,
+        )
+        self.assertLess(get_memory_usage(compact), get_memory_usage(table))
+        self.assertEqual(table.to_pylist(), compact.to_pylist())
+
+    def test_read_sheet_memory(self):
+        fp = self.path("groceries.xlsx")
+        pd.DataFrame(
+            {"item": ["Apple", "Pear"] * 50, "quantity": range(100)}
+        ).to_excel(fp, index=False)
+
+        memory = {}
+        _, data = read_sheet(fp, "Sheet1", memory=memory)
+
+        self.assertEqual("category", data["item"].dtype.name)
+        self.assertEqual("Int8", data["quantity"].dtype.name)
+        self.assertEqual(get_memory_usage(data), memory["after"])
+        self.assertLess(memory["after"], memory["before"])
+
+        # previews aren't compacted
+        memory = {}
+        _, data = read_sheet(fp, "Sheet1", nrows=10, memory=memory)
+        self.assertEqual({}, memory)
@@ -0,0 +1,116 @@
+import datetime
+import os
+import tempfile
+import unittest
+
+from dbimport.runlog import RunLog, format_metrics, make_record, write_metrics
+
+
+class TestRunLog(unittest.TestCase):
+    started = datetime.datetime(2021, 5, 11, tzinfo=datetime.timezone.utc)
+
+    stats = {
+        "rows_staged": 10,
+        "rows_updated": 8,
+        "rows_inserted": -1,
+        "chunks": 2,
+        "bytes_sent": 1024,
+        "durations": {"stage": 1.5, "update": 0.5},
+    }
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "logs", "runs.jsonl")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_make_record(self):
+        record = make_record(
+            "DSN",
+            "dbo.Table",
+            stats=self.stats,
+            started=self.started,
+            durations={"read": 1.0},
+            sheet="Sheet1",
+        )
+
+        self.assertEqual("2021-05-11T00:00:00+00:00", record["started"])
+        self.assertEqual("ok", record["status"])
+        self.assertIsNone(record["error"])
+        self.assertEqual(8, record["rows_updated"])
+        self.assertEqual(
+            {"read": 1.0, "stage": 1.5, "update": 0.5}, record["durations"]
+        )
+        self.assertEqual(3.0, record["duration"])
+        self.assertEqual("Sheet1", record["sheet"])
+
+    def test_make_record_error(self):
+        record = make_record("DSN", "dbo.Table", error=ValueError("failed"))
+
+        self.assertEqual("error", record["status"])
+        self.assertEqual("failed", record["error"])
+        self.assertEqual(0, record["rows_staged"])
+        self.assertEqual(-1, record["rows_updated"])
+
+    def test_write_read(self):
+        log = RunLog(self.path)
+        self.assertEqual([], log.read())
+
+        first = make_record("DSN", "dbo.A", started=self.started)
+        second = make_record("DSN", "dbo.B", started=self.started)
+        log.write(first)
+        log.write(second)
+        with open(self.path, "a") as f:
+            f.write("{truncated\n")
+
+        self.assertEqual(["dbo.A", "dbo.B"], [r["table"] for r in log.read()])
+
+    def test_format_metrics(self):
+        records = [
+            make_record("DSN", "dbo.A", self.stats, started=self.started),
+            make_record("DSN", "dbo.A", self.stats, started=self.started),
+            make_record("DSN", "dbo.A", error="failed", started=self.started),
+        ]
+
+        lines = format_metrics(records).splitlines()
+
+        self.assertIn("# TYPE dbimport_runs_total counter", lines)
+        self.assertIn(
+            'dbimport_runs_total{dsn="DSN",table="dbo.A",status="ok"} 2.0',
+            lines,
+        )
+        self.assertIn(
+            'dbimport_runs_total{dsn="DSN",table="dbo.A",status="error"} 1.0',
+            lines,
+        )
+        self.assertIn(
+            'dbimport_rows_total{dsn="DSN",table="dbo.A",action="updated"} '
+            "16.0",
+            lines,
+        )
+        self.assertIn(
+            'dbimport_sent_bytes_total{dsn="DSN",table="dbo.A"} 2048.0', lines
+        )
+        self.assertIn(
+            'dbimport_phase_seconds_total{dsn="DSN",table="dbo.A",'
+            'phase="stage"} 3.0',
+            lines,
+        )
+        self.assertIn(
+            'dbimport_last_run_timestamp_seconds{dsn="DSN",table="dbo.A"} '
+            "1620691200.0",
+            lines,
+        )
+
+    def test_format_metrics_escape(self):
+        records = [make_record('D"S\\N', "dbo.A", started=self.started)]
+
+        self.assertIn('dsn="D\\"S\\\\N"', format_metrics(records))
+
+    def test_write_metrics(self):
+        path = os.path.join(self.tmp_dir.name, "dbimport.prom")
+        write_metrics(path, [make_record("DSN", "dbo.A")])
+
+        with open(path) as f:
+            self.assertIn("dbimport_runs_total", f.read())
@@ -0,0 +1,58 @@
+import unittest
+
+from dbimport.sqlcache import SqlCache, get_cache
+
+
+class TestSqlCache(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.cache = SqlCache(ttl=10, clock=lambda: self.now)
+
+    def test_get(self):
+        calls = []
+
+        def factory():
+            calls.append(1)
+            return "select 1"
+
+        key = ("update", "mssql", "dbo", "groceries")
+        self.assertEqual("select 1", self.cache.get(key, factory))
+        self.assertEqual("select 1", self.cache.get(key, factory))
+
+        self.assertEqual(1, len(calls))
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(1, self.cache.misses)
+
+    def test_get_expired(self):
+        key = ("update", "mssql", "dbo", "groceries")
+        self.cache.get(key, lambda: "old")
+
+        self.now = 9.9
+        self.assertEqual("old", self.cache.get(key, lambda: "new"))
+
+        self.now = 10
+        self.assertEqual("new", self.cache.get(key, lambda: "new"))
+
+    def test_expired_entries_removed(self):
+        self.cache.get(("update", "mssql", "dbo", "a"), lambda: 1)
+        self.now = 20
+        self.cache.get(("update", "mssql", "dbo", "b"), lambda: 2)
+
+        self.assertEqual(1, len(self.cache))
+
+    def test_invalidate(self):
+        for schema, table in (("dbo", "a"), ("dbo", "b"), ("sales", "a")):
+            self.cache.get(("metadata", "mssql", schema, table), lambda: 1)
+
+        self.cache.invalidate("dbo", "a")
+        self.assertEqual(2, len(self.cache))
+
+        self.cache.invalidate(table="a")
+        self.assertEqual(1, len(self.cache))
+
+        self.cache.invalidate(schema="dbo")
+        self.assertEqual(0, len(self.cache))
+
+    def test_get_cache(self):
+        self.assertIs(get_cache("test"), get_cache("test"))
+        self.assertIsNot(get_cache("test"), get_cache("other"))
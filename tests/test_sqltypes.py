@@ -0,0 +1,92 @@
+import datetime
+import decimal
+import unittest
+
+import pandas as pd
+
+from dbimport.sqltypes import (
+    SQL_BIGINT,
+    SQL_DECIMAL,
+    SQL_TYPE_TIMESTAMP,
+    SQL_WVARCHAR,
+    get_cast,
+    get_input_size,
+    parse_type,
+)
+
+
+class TestSqlTypes(unittest.TestCase):
+    def test_parse_type(self):
+        cases = {
+            "int": ("int", None, None),
+            "nvarchar(10)": ("nvarchar", 10, None),
+            "nvarchar(-1)": ("nvarchar", -1, None),
+            "decimal(10, 2)": ("decimal", 10, 2),
+            "DATETIME2": ("datetime2", None, None),
+        }
+
+        for type_name, exp in cases.items():
+            self.assertEqual(exp, parse_type(type_name))
+
+    def test_get_input_size(self):
+        cases = {
+            ("nvarchar", 10, None): (SQL_WVARCHAR, 10, 0),
+            ("nvarchar", -1, None): (SQL_WVARCHAR, 0, 0),
+            ("bigint", 19, 0): (SQL_BIGINT, 0, 0),
+            ("decimal", 10, 2): (SQL_DECIMAL, 10, 2),
+            ("money", 19, 4): (SQL_DECIMAL, 19, 4),
+            ("datetime", 3, None): (SQL_TYPE_TIMESTAMP, 23, 3),
+            ("datetime2", 7, None): (SQL_TYPE_TIMESTAMP, 27, 7),
+            ("datetime2", 0, None): (SQL_TYPE_TIMESTAMP, 19, 0),
+            ("smalldatetime", 0, None): (SQL_TYPE_TIMESTAMP, 16, 0),
+            ("varbinary", 10, None): None,
+        }
+
+        for args, exp in cases.items():
+            self.assertEqual(exp, get_input_size(*args), args)
+
+    def test_get_cast(self):
+        cases = [
+            (("int",), [1, "2", None], [1, 2, None]),
+            (("bit",), [1, 0, None], [True, False, None]),
+            (("float",), ["1.5", 2, None], [1.5, 2.0, None]),
+            (
+                ("decimal", 2),
+                [1.005, "2.1", None],
+                [decimal.Decimal("1.01"), decimal.Decimal("2.10"), None],
+            ),
+            (("nvarchar",), ["a", 1, None], ["a", "1", None]),
+            (
+                ("datetime",),
+                ["2021-05-11 10:00", None],
+                [datetime.datetime(2021, 5, 11, 10), None],
+            ),
+            (
+                ("date",),
+                ["2021-05-11", None],
+                [datetime.date(2021, 5, 11), None],
+            ),
+            # openpyxl returns time and date objects for Excel time and date
+            # formatted cells, they are passed as is
+            (
+                ("time",),
+                [datetime.time(10, 30), "11:45", None],
+                [datetime.time(10, 30), datetime.time(11, 45), None],
+            ),
+            (
+                ("date",),
+                [datetime.date(1500, 1, 1), "2021-05-11", None],
+                [datetime.date(1500, 1, 1), datetime.date(2021, 5, 11), None],
+            ),
+            (("time",), [datetime.time(0, 0, 1)], [datetime.time(0, 0, 1)]),
+        ]
+
+        for args, values, exp in cases:
+            act = get_cast(*args)(pd.Series(values, dtype=object))
+
+            self.assertEqual(exp, act, args)
+            self.assertEqual(
+                [type(v) for v in exp], [type(v) for v in act], args
+            )
+
+        self.assertIsNone(get_cast("varbinary"))
@@ -26,6 +26,11 @@ class TestUtil(unittest.TestCase):
             "float64": "decimal",
             "datetime64[ns]": "datetime",
             "bool": "bool",
+            "large_string": "text",
+            "double": "decimal",
+            "decimal128(10, 2)": "decimal",
+            "timestamp[ns]": "datetime",
+            "date32[day]": "datetime",
         }
 
         for name, exp in cases.items():
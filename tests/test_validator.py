@@ -0,0 +1,170 @@
+import datetime
+import unittest
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from dbimport.importer import ImporterError
+from dbimport.validator import (
+    check_column,
+    find_invalid_values,
+    validate,
+    validate_chunks,
+)
+
+
+class TestValidator(unittest.TestCase):
+    def assertErrors(self, exp, values, type_name):
+        act = check_column(pd.Series(values, dtype=object), type_name)
+        self.assertEqual(exp, list(act), type_name)
+
+    def test_check_column_numbers(self):
+        self.assertErrors(
+            [None, None, "is not a number", "is not an integer", None],
+            [1, "2", "a", 2.5, None],
+            "int",
+        )
+        self.assertErrors(
+            [None, "is out of tinyint range", "is out of tinyint range"],
+            [255, 256, -1],
+            "tinyint",
+        )
+        self.assertErrors(
+            [None, None, "is out of decimal(5, 2) range", None],
+            [999.99, "-999.99", 1000, 0.001],
+            "decimal(5, 2)",
+        )
+        self.assertErrors([None, None], [1e300, "2.5"], "float")
+
+    def test_check_column_large_integers(self):
+        self.assertEqual(
+            ["is out of bigint range"],
+            list(check_column(pd.Series([2**63]), "bigint")),
+        )
+        self.assertEqual(
+            [None, None],
+            list(check_column(pd.Series([2**63 - 1, -(2**63)]), "bigint")),
+        )
+        self.assertErrors(
+            [
+                None,
+                "is out of bigint range",
+                "is out of bigint range",
+                "is not an integer",
+                None,
+            ],
+            [
+                "9223372036854775807",
+                "9223372036854775808",
+                float(2**63),
+                "9007199254740993.5",
+                2**53 + 1,
+            ],
+            "bigint",
+        )
+
+    def test_check_column_text(self):
+        self.assertErrors(
+            [None, "is longer than 3 characters", None, None],
+            ["abc", "abcd", 123, None],
+            "nvarchar(3)",
+        )
+        self.assertErrors([None], ["a" * 10000], "nvarchar(-1)")
+
+    def test_check_column_datetimes(self):
+        self.assertErrors(
+            [None, None, "is not a date / time", None],
+            ["2021-05-11", pd.Timestamp("2021-05-11 10:00"), "tomorrow", None],
+            "datetime",
+        )
+        self.assertErrors(
+            ["is out of smalldatetime range", None],
+            ["1899-12-31", "2000-01-01"],
+            "smalldatetime",
+        )
+
+    def test_check_column_native_datetimes(self):
+        # openpyxl returns time and date objects for Excel time and date
+        # formatted cells
+        self.assertErrors(
+            [None, None, "is not a date / time"],
+            [datetime.time(10, 30), datetime.time(23, 59, 59, 999999), "x"],
+            "time",
+        )
+        self.assertErrors(
+            [None, None],
+            [datetime.date(2021, 5, 11), datetime.datetime(1500, 1, 1)],
+            "datetime2",
+        )
+        self.assertErrors(
+            [None, "is out of datetime range"],
+            [datetime.date(2021, 5, 11), datetime.date(1500, 1, 1)],
+            "datetime",
+        )
+
+    def test_check_column_unknown_type(self):
+        self.assertErrors([None, None], ["a", 1], "varbinary(10)")
+
+    def test_find_invalid_values(self):
+        df = pd.DataFrame(
+            {
+                "id": ["ID000001", "ID000002", "ID0000003"],
+                "quantity": pd.array([15, None, 13], dtype="Int64"),
+                "price": ["20.0", "n/a", "18.0"],
+            }
+        )
+        column_types = {
+            "id": "nvarchar(8)",
+            "quantity": "smallint",
+            "price": "decimal(10, 2)",
+            "missing": "int",
+        }
+
+        exp = pd.DataFrame(
+            {
+                "column": ["price", "id"],
+                "row": [1, 2],
+                "value": np.array(["n/a", "ID0000003"], dtype=object),
+                "error": ["is not a number", "is longer than 8 characters"],
+            }
+        )
+
+        pd.testing.assert_frame_equal(
+            exp, find_invalid_values(df, column_types), check_dtype=False
+        )
+        pd.testing.assert_frame_equal(
+            exp,
+            find_invalid_values(pa.Table.from_pandas(df), column_types),
+            check_dtype=False,
+        )
+
+    def test_validate(self):
+        df = pd.DataFrame({"quantity": ["1", "a", "b"]})
+
+        validate(df, {"quantity": "nvarchar(1)"})
+
+        with self.assertRaisesRegex(
+            ImporterError,
+            "data contains 2 values that cannot be converted to the column "
+            "type:\n'quantity', row 2: 'a' is not a number\n"
+            "'quantity', row 3: 'b' is not a number",
+        ):
+            validate(df, {"quantity": "int"})
+
+    def test_validate_chunks(self):
+        chunks = [
+            pd.DataFrame({"quantity": ["1", "2"]}),
+            pa.table({"quantity": ["3", "a"]}),
+            pd.DataFrame({"quantity": ["b"]}),
+        ]
+
+        validated = validate_chunks(iter(chunks), {"quantity": "int"})
+
+        self.assertIs(chunks[0], next(validated))
+        with self.assertRaisesRegex(
+            ImporterError,
+            "data contains 1 value that cannot be converted to the column "
+            "type:\n'quantity', row 4: 'a' is not a number",
+        ):
+            next(validated)